@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Boutique, User, Produit, PrixProduit, Partenaire, Facture, CommandeClient, CommandePartenaire, Versement, HistoriqueStock
+from .models import Boutique, User, Produit, PrixProduit, Partenaire, Facture, CommandeClient, CommandePartenaire, Versement, HistoriqueStock, Transfert, VenteJournaliere
 
 # Enregistrement simple
 admin.site.register(Boutique)
@@ -11,4 +11,6 @@ admin.site.register(Facture)
 admin.site.register(CommandeClient)
 admin.site.register(CommandePartenaire)
 admin.site.register(Versement)
-admin.site.register(HistoriqueStock)
\ No newline at end of file
+admin.site.register(HistoriqueStock)
+admin.site.register(Transfert)
+admin.site.register(VenteJournaliere)
@@ -0,0 +1,168 @@
+"""
+Rétention et archivage du journal d'activité.
+
+Chaque type d'opération a sa durée de conservation dans la table Journal
+(RETENTION_JOURS, None = jamais archivé). Au-delà, `manage.py archiver_journal`
+déplace les entrées dans un fichier JSON Lines compressé par mois
+(journal-AAAA-MM.jsonl.gz dans REPERTOIRE) puis les supprime de la table, qui
+reste ainsi de taille bornée.
+
+Les archives d'un même mois peuvent être complétées par plusieurs passages (les
+connexions partent avant les ventes) : chaque passage ajoute un membre gzip au
+fichier, que gzip relit comme un seul flux. ArchiveJournal sert d'index (mois,
+fichier, nombre d'entrées, première et dernière opération) et permet de relire
+un mois à la demande (/api/journaux/archives/AAAA-MM/).
+
+Le fichier est écrit avant la suppression des lignes : après une interruption,
+des entrées peuvent être archivées deux fois. La lecture les dédoublonne par id.
+"""
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ArchiveJournal, Journal
+
+CONFIGURATION_PAR_DEFAUT = {
+    'REPERTOIRE': os.path.join(settings.BASE_DIR, 'archives', 'journal'),
+    'RETENTION_JOURS': {},
+    'RETENTION_PAR_DEFAUT': 365,
+}
+
+# Entrées lues, écrites puis supprimées par requête
+TAILLE_PAQUET = 5000
+
+CHAMPS = (
+    'id', 'date_operation', 'type_operation', 'description', 'details', 'ip_address',
+    'utilisateur_id', 'utilisateur__username', 'boutique_id', 'boutique__nom',
+)
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'ARCHIVES_JOURNAL', {})}
+
+
+def chemin(mois):
+    return os.path.join(configuration()['REPERTOIRE'], f'journal-{mois}.jsonl.gz')
+
+
+def a_archiver(maintenant=None):
+    """Entrées du journal dont la durée de conservation est dépassée."""
+    maintenant = maintenant or timezone.now()
+    config = configuration()
+    retentions = config['RETENTION_JOURS']
+    conditions = Q(pk__in=[])
+    for type_operation, jours in retentions.items():
+        if jours is not None:
+            conditions |= Q(type_operation=type_operation, date_operation__lt=maintenant - timedelta(days=jours))
+    if config['RETENTION_PAR_DEFAUT'] is not None:
+        conditions |= Q(date_operation__lt=maintenant - timedelta(days=config['RETENTION_PAR_DEFAUT'])) & ~Q(
+            type_operation__in=list(retentions)
+        )
+    return Journal.objects.filter(conditions)
+
+
+def mois_de(date):
+    return timezone.localtime(date).strftime('%Y-%m')
+
+
+def ecrire(mois, entrees):
+    fichier = chemin(mois)
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    with open(fichier, 'ab') as brut:
+        with gzip.GzipFile(fileobj=brut, mode='wb') as compresse:
+            for entree in entrees:
+                compresse.write(json.dumps(entree, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n')
+        brut.flush()
+        os.fsync(brut.fileno())
+
+
+@transaction.atomic
+def indexer(mois, entrees):
+    archive, _ = ArchiveJournal.objects.select_for_update().get_or_create(
+        mois=mois, defaults={'fichier': os.path.basename(chemin(mois))}
+    )
+    dates = [entree['date_operation'] for entree in entrees]
+    archive.nombre += len(entrees)
+    archive.premiere_operation = min(filter(None, [archive.premiere_operation, *dates]))
+    archive.derniere_operation = max(filter(None, [archive.derniere_operation, *dates]))
+    archive.save()
+
+
+def archiver(maintenant=None, simulation=False, taille_paquet=TAILLE_PAQUET):
+    """
+    Archive les entrées échues et renvoie le nombre d'entrées par mois. En
+    `simulation`, les entrées sont seulement comptées.
+    """
+    queryset = a_archiver(maintenant)
+    if simulation:
+        return {
+            mois_de(ligne['mois']): ligne['nombre']
+            for ligne in queryset.annotate(mois=TruncMonth('date_operation'))
+            .values('mois').annotate(nombre=Count('id')).order_by('mois')
+        }
+
+    rapport = defaultdict(int)
+    while True:
+        entrees = list(queryset.order_by('date_operation', 'id').values(*CHAMPS)[:taille_paquet])
+        if not entrees:
+            break
+        par_mois = defaultdict(list)
+        for entree in entrees:
+            par_mois[mois_de(entree['date_operation'])].append(entree)
+        for mois, lot in par_mois.items():
+            ecrire(mois, lot)
+            indexer(mois, lot)
+            rapport[mois] += len(lot)
+        Journal.objects.filter(id__in=[entree['id'] for entree in entrees]).delete()
+    return dict(rapport)
+
+
+def borne(valeur, fin=False):
+    """Date (AAAA-MM-JJ) ou date et heure ISO des filtres date_debut / date_fin."""
+    date_heure = parse_datetime(valeur)
+    if date_heure is None:
+        jour = parse_date(valeur)
+        if jour is None:
+            raise ValueError(valeur)
+        date_heure = datetime.combine(jour, time.max if fin else time.min)
+    if timezone.is_naive(date_heure):
+        date_heure = timezone.make_aware(date_heure)
+    return date_heure
+
+
+def lire(mois, boutique=None, type_operation=None, utilisateur=None, date_debut=None, date_fin=None):
+    """
+    Itère sur les entrées archivées de `mois` (AAAA-MM) répondant aux filtres,
+    mêmes paramètres que la liste du journal.
+    """
+    fichier = chemin(mois)
+    if not os.path.exists(fichier):
+        return
+    vues = set()
+    with gzip.open(fichier, 'rt', encoding='utf-8') as flux:
+        for ligne in flux:
+            entree = json.loads(ligne)
+            if entree['id'] in vues:
+                continue
+            vues.add(entree['id'])
+            if boutique and str(entree['boutique_id']) != str(boutique):
+                continue
+            if type_operation and entree['type_operation'] != type_operation:
+                continue
+            if utilisateur and str(entree['utilisateur_id']) != str(utilisateur):
+                continue
+            if date_debut or date_fin:
+                date = parse_datetime(entree['date_operation'])
+                if (date_debut and date < date_debut) or (date_fin and date > date_fin):
+                    continue
+            yield entree
@@ -0,0 +1,74 @@
+"""
+Authentification JWT sans lecture de l'utilisateur à chaque appel.
+
+Le jeton d'accès porte, signés avec lui, le rôle et la boutique de
+l'utilisateur (claims `role` et `boutique`, voir
+storage/views.CustomTokenObtainPairSerializer) : le client les lit sans appel
+supplémentaire.
+
+Côté serveur, `JWTAuthentificationCache` garde en mémoire du processus
+l'utilisateur du jeton, boutique comprise, pendant DUREE_CACHE secondes : les
+appels suivants ne lisent plus ni User ni Boutique, et les permissions
+(role, boutique) et le journal s'appuient sur cet objet. Chaque requête reçoit
+sa propre copie. Une modification ou suppression d'utilisateur ou de boutique
+vide le cache du processus courant (core/signals.py) ; les autres processus
+la voient au plus tard après DUREE_CACHE (0 désactive le cache).
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+CONFIGURATION_PAR_DEFAUT = {
+    'DUREE_CACHE': 60,
+    'TAILLE_CACHE': 10000,
+}
+
+# id utilisateur -> (échéance, utilisateur)
+_utilisateurs = {}
+_verrou = threading.Lock()
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'AUTHENTIFICATION', {})}
+
+
+def ajouter_claims(token, user):
+    token['role'] = user.role
+    token['boutique'] = user.boutique_id
+    return token
+
+
+def oublier(user_id=None):
+    """Retire un utilisateur du cache, ou tous sans argument."""
+    with _verrou:
+        if user_id is None:
+            _utilisateurs.clear()
+        else:
+            _utilisateurs.pop(str(user_id), None)
+
+
+class JWTAuthentificationCache(JWTAuthentication):
+    def get_user(self, validated_token):
+        config = configuration()
+        if not config['DUREE_CACHE']:
+            return super().get_user(validated_token)
+
+        cle = str(validated_token.get(api_settings.USER_ID_CLAIM))
+        maintenant = time.monotonic()
+        entree = _utilisateurs.get(cle)
+        if entree is not None and entree[0] > maintenant:
+            return copy.copy(entree[1])
+
+        # Vérifications de simplejwt (utilisateur actif, jeton révoqué) au chargement
+        user = super().get_user(validated_token)
+        if user.boutique_id is not None:
+            user.boutique  # chargée une fois, gardée avec l'utilisateur
+        with _verrou:
+            if len(_utilisateurs) >= config['TAILLE_CACHE']:
+                _utilisateurs.clear()
+            _utilisateurs[cle] = (maintenant + config['DUREE_CACHE'], user)
+        return copy.copy(user)
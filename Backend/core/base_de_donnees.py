@@ -0,0 +1,18 @@
+"""
+Réglages appliqués à chaque nouvelle connexion SQLite (settings.SQLITE_PRAGMAS).
+
+journal_mode=WAL est mémorisé dans le fichier de base ; les autres PRAGMA valent
+pour la connexion seulement et sont donc repris à chaque ouverture.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configurer_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nom, valeur in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {nom} = {valeur}')
@@ -0,0 +1,89 @@
+"""
+Cache en lecture des listes et fiches peu changeantes (produits, boutiques,
+partenaires, utilisateurs).
+
+Une réponse est mise en cache sous une clé composée de la ressource, de la
+boutique demandée, du rôle et de la boutique de l'appelant, du chemin et des
+paramètres de requête, et du numéro de version de (ressource, boutique).
+Toute écriture incrémente ce numéro : les anciennes entrées ne sont plus
+jamais lues et disparaissent à expiration ou par éviction.
+
+Les signaux post_save / post_delete couvrent les écritures unitaires ; les
+écritures en masse (update, bulk_create, bulk_update) appellent `invalider`.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import urlencode
+
+CONFIGURATION_PAR_DEFAUT = {
+    'ACTIF': True,
+    'ALIAS': 'default',
+    'DUREE': 300,
+}
+
+# Toutes boutiques confondues (requêtes sans ?boutique=, ressources globales)
+TOUTES = '*'
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'CACHE_API', {})}
+
+
+def cache():
+    return caches[configuration()['ALIAS']]
+
+
+def cle_version(ressource, boutique):
+    return f'api:version:{ressource}:{boutique}'
+
+
+def version(ressource, boutique):
+    """
+    Numéro de version courant de (ressource, boutique). Une version absente (jamais
+    créée ou évincée) repart d'une valeur horaire, jamais d'une valeur déjà servie.
+    """
+    cle = cle_version(ressource, boutique)
+    numero = cache().get(cle)
+    if numero is None:
+        numero = time.time_ns()
+        if not cache().add(cle, numero, None):
+            numero = cache().get(cle, numero)
+    return numero
+
+
+def incrementer(ressource, boutique):
+    cle = cle_version(ressource, boutique)
+    try:
+        cache().incr(cle)
+    except ValueError:
+        cache().set(cle, time.time_ns(), None)
+
+
+def invalider(ressource, boutiques=()):
+    """
+    Invalide `ressource` pour les boutiques données et pour les listes toutes boutiques.
+    Répété après le commit : une lecture faite pendant la transaction a pu remettre
+    en cache l'état d'avant.
+    """
+    cibles = {TOUTES, *boutiques}
+
+    def incrementer_tout():
+        for boutique in cibles:
+            incrementer(ressource, boutique)
+
+    incrementer_tout()
+    transaction.on_commit(incrementer_tout)
+
+
+def cle_reponse(request, ressource, boutique):
+    utilisateur = request.user
+    parametres = urlencode(sorted(request.query_params.lists()), doseq=True)
+    empreinte = hashlib.md5(f'{request.path}?{parametres}'.encode()).hexdigest()
+    return 'api:reponse:%s:%s:%s:%s:%s:%s' % (
+        ressource, boutique, version(ressource, boutique),
+        getattr(utilisateur, 'role', ''), getattr(utilisateur, 'boutique_id', ''), empreinte,
+    )
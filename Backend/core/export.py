@@ -0,0 +1,101 @@
+"""
+Exports CSV / XLSX en flux : les lignes sont lues par paquets (`.iterator()`) sous
+forme de tuples (`.values_list()`) et écrites au fil de l'eau, sans jamais charger
+le jeu complet en mémoire.
+
+Le format est choisi par ?fichier=csv|xlsx (`format` est réservé par DRF).
+XLSX nécessite openpyxl, facultatif : le classeur est écrit en mode write_only
+dans un fichier temporaire puis envoyé par blocs.
+"""
+import csv
+import json
+import tempfile
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Lignes lues par requête (curseur serveur sur PostgreSQL)
+TAILLE_PAQUET = 2000
+# Lignes CSV regroupées par morceau envoyé au client
+LIGNES_PAR_MORCEAU = 500
+
+TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Tampon:
+    """
+    Pseudo-fichier pour csv.writer : renvoie la ligne écrite au lieu de la garder.
+    """
+
+    def write(self, valeur):
+        return valeur
+
+
+def valeur_cellule(valeur):
+    if isinstance(valeur, datetime):
+        # Heure locale sans fuseau : lisible dans un tableur, accepté par openpyxl
+        if timezone.is_aware(valeur):
+            valeur = timezone.localtime(valeur)
+        return valeur.replace(tzinfo=None, microsecond=0)
+    if isinstance(valeur, (dict, list)):
+        return json.dumps(valeur, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return valeur
+
+
+def flux_csv(entetes, lignes):
+    # Point-virgule et BOM UTF-8 : ouverture directe dans un Excel en français
+    ecrivain = csv.writer(Tampon(), delimiter=';')
+    yield '\ufeff' + ecrivain.writerow(entetes)
+    morceau = []
+    for ligne in lignes:
+        morceau.append(ecrivain.writerow([valeur_cellule(valeur) for valeur in ligne]))
+        if len(morceau) >= LIGNES_PAR_MORCEAU:
+            yield ''.join(morceau)
+            morceau = []
+    if morceau:
+        yield ''.join(morceau)
+
+
+def fichier_xlsx(titre, entetes, lignes):
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet(titre)
+    feuille.append(entetes)
+    for ligne in lignes:
+        feuille.append([valeur_cellule(valeur) for valeur in ligne])
+    fichier = tempfile.TemporaryFile()
+    classeur.save(fichier)
+    fichier.seek(0)
+    return fichier
+
+
+def reponse_export(request, nom, colonnes, queryset):
+    """
+    Réponse de téléchargement pour `queryset`, `colonnes` étant une liste de
+    (entête, champ) passés à values_list.
+    """
+    format_fichier = request.query_params.get('fichier', 'csv')
+    if format_fichier not in ('csv', 'xlsx'):
+        raise ValidationError({'fichier': "Format attendu : csv ou xlsx."})
+    if format_fichier == 'xlsx' and Workbook is None:
+        raise ValidationError({'fichier': "Export XLSX indisponible : openpyxl n'est pas installé."})
+
+    entetes = [entete for entete, _ in colonnes]
+    lignes = queryset.values_list(*[champ for _, champ in colonnes]).iterator(chunk_size=TAILLE_PAQUET)
+    nom_fichier = f"{nom}-{timezone.localtime().strftime('%Y%m%d-%H%M')}.{format_fichier}"
+
+    if format_fichier == 'xlsx':
+        return FileResponse(
+            fichier_xlsx(nom, entetes, lignes), as_attachment=True, filename=nom_fichier, content_type=TYPE_XLSX
+        )
+
+    reponse = StreamingHttpResponse(flux_csv(entetes, lignes), content_type='text/csv; charset=utf-8')
+    reponse['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return reponse
@@ -0,0 +1,159 @@
+"""
+Import de catalogue produits depuis un fichier CSV ou XLSX.
+
+La première ligne donne les noms des champs de Produit (reference, nom, category,
+quantite, prix_achat, prix, boutique, ...). Chaque ligne est validée comme par
+ProduitSerializer, puis les produits sont créés ou mis à jour par
+(boutique, reference) avec bulk_create / bulk_update par lots. Les lignes
+invalides ne bloquent pas les autres : elles sont listées dans le rapport.
+"""
+import csv
+import io
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import cache_api, stock
+from .models import Boutique, Produit
+from .serializers import ProduitImportSerializer
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+TAILLE_LOT = 500
+
+
+class FichierInvalide(Exception):
+    pass
+
+
+def lire_lignes(fichier, nom):
+    """
+    Itère sur les lignes de `fichier` (binaire) sous forme de dictionnaires, les
+    cellules vides étant omises.
+    """
+    if nom.lower().endswith('.xlsx'):
+        if load_workbook is None:
+            raise FichierInvalide("Import XLSX indisponible : openpyxl n'est pas installé.")
+        classeur = load_workbook(fichier, read_only=True, data_only=True)
+        lignes = classeur.active.iter_rows(values_only=True)
+    else:
+        texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+        debut = texte.read(4096)
+        texte.seek(0)
+        try:
+            dialecte = csv.Sniffer().sniff(debut, delimiters=';,\t')
+        except csv.Error:
+            dialecte = csv.excel
+        lignes = csv.reader(texte, dialecte)
+
+    entetes = next(lignes, None)
+    if not entetes:
+        raise FichierInvalide("Fichier vide.")
+    entetes = [str(entete or '').strip() for entete in entetes]
+
+    for cellules in lignes:
+        ligne = {}
+        for entete, valeur in zip(entetes, cellules):
+            if isinstance(valeur, str):
+                valeur = valeur.strip()
+            if entete and valeur not in (None, ''):
+                ligne[entete] = valeur
+        yield ligne
+
+
+def importer_produits(lignes, boutique=None, ajouter_quantite=False, simulation=False, user=None, motif='Import',
+                      perimetre=None):
+    """
+    Importe `lignes` et renvoie le rapport {lignes, crees, mis_a_jour, erreurs}.
+
+    `boutique` s'applique aux lignes sans colonne boutique. Avec `ajouter_quantite`,
+    la quantité d'un produit existant est augmentée (avec HistoriqueStock) au lieu
+    d'être remplacée. En `simulation`, tout est annulé après calcul du rapport.
+    Avec `perimetre` (utilisateur de l'API), une ligne hors de ses boutiques
+    interrompt l'import (PermissionDenied).
+    """
+    validateur = ProduitImportSerializer(context={
+        'boutiques': set(Boutique.objects.values_list('id', flat=True)),
+        'perimetre': perimetre,
+    })
+    rapport = {'lignes': 0, 'crees': 0, 'mis_a_jour': 0, 'erreurs': [], 'simulation': simulation}
+    cles_vues = {}
+    lot = []
+
+    with transaction.atomic():
+        # Ligne 1 : entêtes
+        for numero, ligne in enumerate(lignes, start=2):
+            rapport['lignes'] += 1
+            if boutique is not None:
+                ligne.setdefault('boutique', boutique)
+            try:
+                donnees = validateur.run_validation(ligne)
+            except serializers.ValidationError as e:
+                rapport['erreurs'].append({'ligne': numero, 'erreurs': e.detail})
+                continue
+            ProduitImportSerializer.normaliser_champs_ordinateur(donnees, donnees.get('category'))
+
+            if donnees.get('reference'):
+                cle = (donnees['boutique'], donnees['reference'])
+                if cle in cles_vues:
+                    rapport['erreurs'].append({
+                        'ligne': numero,
+                        'erreurs': {'reference': [f"Référence déjà présente ligne {cles_vues[cle]}."]},
+                    })
+                    continue
+                cles_vues[cle] = numero
+
+            lot.append(donnees)
+            if len(lot) >= TAILLE_LOT:
+                enregistrer_lot(lot, rapport, ajouter_quantite, user, motif)
+                lot = []
+        if lot:
+            enregistrer_lot(lot, rapport, ajouter_quantite, user, motif)
+
+        if simulation:
+            transaction.set_rollback(True)
+    return rapport
+
+
+def enregistrer_lot(lot, rapport, ajouter_quantite, user, motif):
+    # Produits existants du lot en une seule requête
+    existants = {}
+    references = {donnees['reference'] for donnees in lot if donnees.get('reference')}
+    if references:
+        for produit in Produit.objects.filter(
+            boutique_id__in={donnees['boutique'] for donnees in lot}, reference__in=references
+        ).order_by('id'):
+            existants.setdefault((produit.boutique_id, produit.reference), produit)
+
+    maintenant = timezone.now()
+    a_creer, a_modifier, variations = [], [], {}
+    for donnees in lot:
+        boutique_id = donnees.pop('boutique')
+        produit = existants.get((boutique_id, donnees.get('reference')))
+        if produit is None:
+            a_creer.append(Produit(boutique_id=boutique_id, created_at=maintenant, updated_at=maintenant, **donnees))
+            continue
+        if ajouter_quantite:
+            variations[produit.id] = donnees.pop('quantite')
+        for champ, valeur in donnees.items():
+            setattr(produit, champ, valeur)
+        produit.updated_at = maintenant
+        a_modifier.append(produit)
+
+    Produit.objects.bulk_create(a_creer)
+    if a_modifier:
+        champs = [
+            champ.name for champ in Produit._meta.concrete_fields
+            if champ.name not in ('id', 'boutique', 'created_at') and not (ajouter_quantite and champ.name == 'quantite')
+        ]
+        Produit.objects.bulk_update(a_modifier, champs)
+    if variations:
+        stock.appliquer_mouvements(variations, motif, user)
+    cache_api.invalider('produit', {produit.boutique_id for produit in a_creer + a_modifier})
+
+    rapport['crees'] += len(a_creer)
+    rapport['mis_a_jour'] += len(a_modifier)
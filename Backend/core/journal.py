@@ -0,0 +1,275 @@
+"""
+Écriture différée du journal d'activité.
+
+Les entrées sont placées dans une file bornée et insérées par lots (`bulk_create`)
+depuis un thread de fond, dès que le lot est plein ou que l'intervalle de vidage
+est écoulé. Les écritures sortent ainsi du temps de réponse des requêtes.
+
+Pendant une requête, `JournalMiddleware` ouvre un contexte : les entrées créées par
+les vues (`create_journal_entry`) y sont retenues puis complétées par le middleware
+(méthode, chemin, statut, IP), ce qui donne une seule ligne par opération.
+
+Configuration (`settings.JOURNAL`) :
+    ASYNCHRONE        False pour écrire directement (tests, scripts)
+    TAILLE_LOT        nombre maximal d'entrées par INSERT
+    INTERVALLE_VIDAGE délai maximal (secondes) avant l'écriture d'un lot incomplet
+    TAILLE_FILE       capacité de la file en mémoire
+    SATURATION        file pleine : 'synchrone' (la requête écrit elle-même)
+                      ou 'ignorer' (l'entrée est perdue et comptée)
+
+Détails écrits au journal (`compacter`), qu'ils viennent du corps de la requête ou
+d'une entrée créée par la vue :
+    CHAMPS_DETAILS      champs conservés du corps de requête, par ressource d'URL
+                        (ressource absente, entrée de vue : tous les champs)
+    CHAMPS_MASQUES      champs dont la valeur n'est jamais écrite
+    DIFF_MODIFICATIONS  PUT/PATCH : seuls les champs modifiés, avant et après
+    TAILLE_MAX_TEXTE    caractères gardés par chaîne
+    TAILLE_MAX_LISTE    éléments gardés par liste
+    TAILLE_MAX_DETAILS  taille JSON maximale ; au-delà, seuls les noms des champs restent
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist
+from django.db import close_old_connections
+
+from .models import Journal
+
+logger = logging.getLogger('core.journal')
+
+CONFIGURATION_PAR_DEFAUT = {
+    'ASYNCHRONE': True,
+    'TAILLE_LOT': 100,
+    'INTERVALLE_VIDAGE': 2.0,
+    'TAILLE_FILE': 10000,
+    'SATURATION': 'synchrone',
+    'CHAMPS_DETAILS': {
+        'boutiques': ['nom', 'ville'],
+        'produits': ['nom', 'reference', 'category', 'quantite', 'prix_achat', 'prix', 'boutique', 'actif'],
+        'prix-produits': ['produit', 'prix_achat_yen', 'prix_vente_yen', 'taux_fcfa'],
+        'partenaires': ['nom', 'prenom', 'telephone', 'statut', 'boutique'],
+        'factures': ['type', 'numero', 'nom', 'total', 'reste', 'status', 'boutique'],
+        'commandes-client': ['facture', 'produit', 'quantite', 'prix_unitaire_fcfa', 'justification_prix'],
+        'commandes-partenaire': ['facture', 'partenaire', 'produit', 'quantite', 'prix_unitaire_fcfa',
+                                 'justification_prix'],
+        'versements': ['facture', 'montant'],
+        'historiques-stock': ['produit', 'variation', 'motif'],
+        'users': ['username', 'email', 'role', 'boutique', 'first_name', 'last_name', 'is_active'],
+    },
+    'CHAMPS_MASQUES': ['password', 'refresh', 'access', 'token'],
+    'DIFF_MODIFICATIONS': True,
+    'TAILLE_MAX_TEXTE': 200,
+    'TAILLE_MAX_LISTE': 20,
+    'TAILLE_MAX_DETAILS': 4000,
+}
+
+# Valeur écrite à la place d'un champ de CHAMPS_MASQUES
+MASQUE = '[masqué]'
+
+# Entrées créées par la vue pendant la requête en cours (None hors requête)
+_entrees_requete = ContextVar('journal_entrees_requete', default=None)
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'JOURNAL', {})}
+
+
+def normaliser_details(details):
+    # Rend les détails sérialisables en JSON (dates, décimaux...) avant la mise en file
+    if details is None:
+        return None
+    return json.loads(json.dumps(details, cls=DjangoJSONEncoder))
+
+
+def compacter(donnees, ressource=None):
+    """
+    Réduit des données JSON (déjà normalisées) avant écriture dans `details` :
+    liste blanche de la ressource, champs masqués, chaînes et listes tronquées
+    avec un marqueur du reste, puis plafond global.
+    """
+    config = configuration()
+    champs = config['CHAMPS_DETAILS'].get(ressource)
+    masques = set(config['CHAMPS_MASQUES'])
+    max_texte, max_liste = config['TAILLE_MAX_TEXTE'], config['TAILLE_MAX_LISTE']
+
+    def filtrer(objet):
+        if champs is None or not isinstance(objet, dict):
+            return objet
+        return {cle: valeur for cle, valeur in objet.items() if cle in champs}
+
+    def reduire(valeur):
+        if isinstance(valeur, dict):
+            return {cle: MASQUE if cle in masques else reduire(v) for cle, v in valeur.items()}
+        if isinstance(valeur, list):
+            reduite = [reduire(v) for v in valeur[:max_liste]]
+            if len(valeur) > max_liste:
+                reduite.append(f'[+{len(valeur) - max_liste} éléments]')
+            return reduite
+        if isinstance(valeur, str) and len(valeur) > max_texte:
+            return f'{valeur[:max_texte]}[+{len(valeur) - max_texte} caractères]'
+        return valeur
+
+    donnees = reduire([filtrer(d) for d in donnees] if isinstance(donnees, list) else filtrer(donnees))
+    taille = len(json.dumps(donnees, ensure_ascii=False))
+    if taille > config['TAILLE_MAX_DETAILS']:
+        return {
+            'tronque': True,
+            'taille': taille,
+            'champs': sorted(donnees) if isinstance(donnees, dict) else f'{len(donnees)} éléments',
+        }
+    return donnees
+
+
+def valeurs_champs(instance, noms):
+    """Valeurs en base (clés étrangères sous forme d'id) des champs `noms` de `instance`."""
+    valeurs = {}
+    for nom in noms:
+        try:
+            champ = instance._meta.get_field(nom)
+        except FieldDoesNotExist:
+            continue
+        if champ.concrete and not champ.many_to_many:
+            valeurs[nom] = getattr(instance, champ.attname)
+    return valeurs
+
+
+def differences(avant, apres):
+    return {nom: {'avant': avant[nom], 'apres': apres.get(nom)} for nom in avant if avant[nom] != apres.get(nom)}
+
+
+class JournalWriter:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._thread = None
+        self._arret = threading.Event()
+        self.entrees_ignorees = 0
+
+    def ajouter(self, entree):
+        config = configuration()
+        if not config['ASYNCHRONE']:
+            self._ecrire([entree])
+            return
+
+        self._demarrer(config)
+        try:
+            self._file.put_nowait(entree)
+        except queue.Full:
+            if config['SATURATION'] == 'ignorer':
+                self.entrees_ignorees += 1
+            else:
+                self._ecrire([entree])
+
+    def vider(self):
+        """Écrit immédiatement toutes les entrées en attente (appelant bloqué)."""
+        if self._file is None:
+            return
+        lot = []
+        while True:
+            try:
+                lot.append(self._file.get_nowait())
+            except queue.Empty:
+                break
+        if lot:
+            self._ecrire(lot)
+
+    def arreter(self, timeout=5):
+        if self._thread is not None and self._pid == os.getpid():
+            self._arret.set()
+            self._thread.join(timeout)
+        self.vider()
+
+    def _demarrer(self, config):
+        # Démarrage paresseux, et redémarrage après un fork (workers gunicorn)
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._verrou:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._file = queue.Queue(maxsize=config['TAILLE_FILE'])
+            self._pid = os.getpid()
+            self._arret.clear()
+            self._thread = threading.Thread(
+                target=self._boucle,
+                args=(config['TAILLE_LOT'], config['INTERVALLE_VIDAGE']),
+                name='journal-writer',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _boucle(self, taille_lot, intervalle):
+        while not self._arret.is_set():
+            lot = self._collecter(taille_lot, intervalle)
+            if lot:
+                self._ecrire(lot)
+
+    def _collecter(self, taille_lot, intervalle):
+        # Attend la première entrée, puis complète le lot jusqu'à la taille ou l'échéance
+        try:
+            lot = [self._file.get(timeout=intervalle)]
+        except queue.Empty:
+            return []
+        echeance = time.monotonic() + intervalle
+        while len(lot) < taille_lot:
+            restant = echeance - time.monotonic()
+            if restant <= 0:
+                break
+            try:
+                lot.append(self._file.get(timeout=restant))
+            except queue.Empty:
+                break
+        return lot
+
+    def _ecrire(self, lot):
+        try:
+            Journal.objects.bulk_create(lot)
+        except Exception:
+            logger.warning("Échec de l'écriture d'un lot de %d entrées du journal", len(lot), exc_info=True)
+            # Une entrée invalide ne doit pas faire perdre tout le lot
+            for entree in lot:
+                try:
+                    entree.save()
+                except Exception:
+                    logger.exception("Entrée du journal perdue : %s", entree.description)
+        finally:
+            if threading.current_thread() is self._thread:
+                close_old_connections()
+
+
+writer = JournalWriter()
+atexit.register(writer.arreter)
+
+
+def ouvrir_requete():
+    return _entrees_requete.set([])
+
+
+def fermer_requete(jeton):
+    _entrees_requete.reset(jeton)
+
+
+def entrees_requete():
+    return _entrees_requete.get() or []
+
+
+def enregistrer(entree, differer_dans_requete=True):
+    """
+    Met une entrée `Journal` (non sauvegardée) en file d'écriture. Pendant une requête,
+    elle est d'abord retenue pour être fusionnée par le middleware.
+    """
+    entree.details = normaliser_details(entree.details)
+    entrees = _entrees_requete.get()
+    if differer_dans_requete and entrees is not None:
+        entrees.append(entree)
+    else:
+        writer.ajouter(entree)
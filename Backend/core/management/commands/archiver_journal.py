@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core import archives_journal
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les entrées du journal plus anciennes que leur durée de conservation "
+        "(ARCHIVES_JOURNAL['RETENTION_JOURS'] par type d'opération) dans des archives "
+        "mensuelles gzip JSON Lines, puis les supprime de la table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulation', action='store_true', help="Compter sans rien archiver")
+        parser.add_argument('--paquet', type=int, default=archives_journal.TAILLE_PAQUET,
+                            help="Entrées traitées par requête")
+
+    def handle(self, *args, **options):
+        rapport = archives_journal.archiver(simulation=options['simulation'], taille_paquet=options['paquet'])
+        for mois, nombre in sorted(rapport.items()):
+            self.stdout.write(f"{mois} : {nombre} entrée(s)")
+        total = sum(rapport.values())
+        if options['simulation']:
+            self.stdout.write(f"Simulation : {total} entrée(s) à archiver.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{total} entrée(s) archivée(s) dans {archives_journal.configuration()['REPERTOIRE']}."
+            ))
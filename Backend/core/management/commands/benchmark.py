@@ -0,0 +1,173 @@
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import cache_api, journal
+from core.models import Boutique, Facture, Produit, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue des scénarios sur les points d'accès les plus sollicités et enregistre p50/p95, "
+        "nombre de requêtes SQL et pic mémoire dans un fichier JSON de référence. "
+        "Avec --reference, signale les régressions par rapport à une mesure précédente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--sortie', default='benchmark.json', help="Fichier JSON des résultats")
+        parser.add_argument('--reference', help="Résultats précédents à comparer")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Dégradation relative tolérée de p95 avant de signaler une régression")
+        parser.add_argument('--scenario', action='append', help="Limiter à ce(s) scénario(s)")
+
+    def handle(self, *args, **options):
+        boutique = Boutique.objects.annotate(nombre=Count('facture')).order_by('-nombre').first()
+        if boutique is None or not Produit.objects.filter(boutique=boutique).exists():
+            raise CommandError("Base vide : lancez d'abord `manage.py generer_donnees`.")
+
+        utilisateur, _ = User.objects.get_or_create(
+            username='benchmark', defaults={'role': 'superadmin', 'boutique': boutique}
+        )
+        jeton = str(RefreshToken.for_user(utilisateur).access_token)
+        self.client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {jeton}')
+
+        scenarios = self.scenarios(boutique)
+        if options['scenario']:
+            scenarios = {nom: scenario for nom, scenario in scenarios.items() if nom in options['scenario']}
+
+        resultats = {}
+        for nom, scenario in scenarios.items():
+            resultats[nom] = self.mesurer(scenario, options['iterations'])
+            self.stdout.write(
+                f"{nom:<24} p50 {resultats[nom]['p50_ms']:>8.1f} ms   p95 {resultats[nom]['p95_ms']:>8.1f} ms   "
+                f"{resultats[nom]['requetes_sql']:>4} requêtes   {resultats[nom]['memoire_pic_ko']:>8.0f} Ko   "
+                f"{resultats[nom]['taille_reponse_o']:>9} o"
+            )
+        journal.writer.vider()
+
+        rapport = {
+            'date': timezone.now().isoformat(),
+            'base': connection.vendor,
+            'iterations': options['iterations'],
+            'volumes': {
+                'produits': Produit.objects.count(),
+                'factures': Facture.objects.count(),
+            },
+            'scenarios': resultats,
+        }
+        with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+            json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['sortie']}"))
+
+        if options['reference']:
+            self.comparer(resultats, options['reference'], options['tolerance'])
+
+    def scenarios(self, boutique):
+        jour = timezone.localdate() - timedelta(days=1)
+        produit = Produit.objects.filter(boutique=boutique, actif=True).order_by('-quantite').first()
+        mot = produit.nom.split()[0][:4]
+        produits_liste = lambda: self.client.get(f'/api/produits/?boutique={boutique.id}&actif=true')
+        produits_recherche = lambda: self.client.get(f'/api/produits/?boutique={boutique.id}&search={mot}')
+        return {
+            # Après le préchauffage, servis par le cache des lectures (core/cache_api.py)
+            'produits_liste': produits_liste,
+            'produits_recherche': produits_recherche,
+            # Mêmes requêtes, cache désactivé : chemin base de données et sérialisation
+            'produits_liste_froid': self.sans_cache(produits_liste),
+            'produits_recherche_froid': self.sans_cache(produits_recherche),
+            'factures_par_date': lambda: self.client.get(f'/api/factures/?boutique={boutique.id}&created_at={jour}'),
+            # Revalidation d'une liste inchangée : coût de l'agrégation du validateur (réponse 304)
+            'factures_revalidation': self.revalidation(f'/api/factures/?boutique={boutique.id}'),
+            'journal_filtre': lambda: self.client.get(
+                f'/api/journaux/?boutique={boutique.id}&type_operation=vente&date_debut={jour - timedelta(days=30)}'
+            ),
+            'dashboard': lambda: self.client.get(
+                f'/api/dashboard/?boutique={boutique.id}&date_debut={jour - timedelta(days=30)}&date_fin={jour}'
+            ),
+            'checkout': lambda: self.checkout(boutique, produit),
+        }
+
+    def sans_cache(self, scenario):
+        def executer():
+            with override_settings(CACHE_API={**cache_api.configuration(), 'ACTIF': False}):
+                return scenario()
+        return executer
+
+    def revalidation(self, url):
+        # ETag lu une fois, au premier appel (préchauffage) : seules les réponses 304 sont mesurées
+        etags = {}
+
+        def revalider():
+            if url not in etags:
+                etags[url] = self.client.get(url)['ETag']
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        return revalider
+
+    def checkout(self, boutique, produit):
+        # Vente annulée après mesure pour ne pas modifier le jeu de données
+        with transaction.atomic():
+            reponse = self.client.post('/api/checkout/', {
+                'type': 'client',
+                'numero': 'BENCH',
+                'boutique': boutique.id,
+                'lignes': [{'produit_id': produit.id, 'quantite': 1, 'prix_unitaire_fcfa': produit.prix_achat + 10000}],
+                'versement': 0,
+            }, content_type='application/json')
+            transaction.set_rollback(True)
+        return reponse
+
+    def mesurer(self, scenario, iterations):
+        reponse = scenario()  # préchauffage
+        if reponse.status_code >= 400:
+            raise CommandError(f"Réponse {reponse.status_code} : {reponse.content[:300]!r}")
+
+        durees = []
+        for _ in range(iterations):
+            debut = time.perf_counter()
+            scenario()
+            durees.append((time.perf_counter() - debut) * 1000)
+
+        # Requêtes et mémoire sur un passage séparé : tracemalloc fausserait les durées
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = scenario()
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        durees.sort()
+        return {
+            'p50_ms': round(statistics.median(durees), 2),
+            'p95_ms': round(durees[min(len(durees) - 1, int(len(durees) * 0.95))], 2),
+            'requetes_sql': len(requetes),
+            'memoire_pic_ko': round(pic / 1024, 1),
+            'taille_reponse_o': len(reponse.content),
+        }
+
+    def comparer(self, resultats, chemin, tolerance):
+        with open(chemin, encoding='utf-8') as fichier:
+            reference = json.load(fichier)['scenarios']
+
+        regressions = []
+        for nom, mesure in resultats.items():
+            avant = reference.get(nom)
+            if avant is None:
+                continue
+            if mesure['p95_ms'] > avant['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{nom} : p95 {avant['p95_ms']} -> {mesure['p95_ms']} ms")
+            if mesure['requetes_sql'] > avant['requetes_sql']:
+                regressions.append(f"{nom} : {avant['requetes_sql']} -> {mesure['requetes_sql']} requêtes SQL")
+
+        if regressions:
+            raise CommandError("Régressions détectées :\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"Aucune régression par rapport à {chemin}."))
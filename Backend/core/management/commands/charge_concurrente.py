@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+
+from core.models import Journal, Produit, User
+
+MARQUEUR = 'charge_concurrente'
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge concurrente mêlant lectures de catalogue et écritures (stock + journal) depuis "
+        "plusieurs threads : débit, latence p95 et erreurs de verrouillage. Sur SQLite, "
+        "--comparer rejoue la même charge en journal DELETE puis avec SQLITE_PRAGMAS (WAL). "
+        "À lancer sur une base de test (ex. remplie par generer_donnees)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duree', type=float, default=10, help="Durée de chaque mesure (secondes)")
+        parser.add_argument('--ecritures', type=float, default=0.3, help="Part des opérations en écriture")
+        parser.add_argument('--comparer', action='store_true',
+                            help="SQLite : comparer journal DELETE et les réglages de SQLITE_PRAGMAS")
+
+    def handle(self, *args, **options):
+        self.utilisateur = User.objects.filter(boutique__isnull=False).first()
+        self.produits = list(Produit.objects.values_list('id', 'boutique_id')[:1000])
+        if self.utilisateur is None or not self.produits:
+            raise CommandError("Base vide : lancez d'abord `manage.py generer_donnees`.")
+
+        configurations = [('configuration actuelle', None)]
+        if options['comparer']:
+            if connection.vendor != 'sqlite':
+                raise CommandError("--comparer ne concerne que SQLite.")
+            configurations = [
+                ('DELETE / synchronous=FULL', {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}),
+                ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+            ]
+
+        self.stdout.write(
+            f"{options['threads']} threads, {options['duree']:.0f} s, {options['ecritures']:.0%} d'écritures, "
+            f"base {connection.vendor}"
+        )
+        self.stdout.write(
+            f"{'configuration':<28}{'lectures/s':>12}{'écritures/s':>13}{'p95 lecture':>13}"
+            f"{'p95 écriture':>14}{'erreurs':>9}"
+        )
+        try:
+            for nom, pragmas in configurations:
+                resultat = self.mesurer(pragmas, options)
+                self.stdout.write(
+                    f"{nom:<28}{resultat['lectures_s']:>12.0f}{resultat['ecritures_s']:>13.0f}"
+                    f"{resultat['p95_lecture_ms']:>10.1f} ms{resultat['p95_ecriture_ms']:>11.1f} ms"
+                    f"{resultat['erreurs']:>9}"
+                )
+        finally:
+            Journal.objects.filter(description=MARQUEUR).delete()
+
+    def mesurer(self, pragmas, options):
+        # Les réglages s'appliquent à l'ouverture des connexions (core/base_de_donnees.py)
+        connections.close_all()
+        with override_settings(SQLITE_PRAGMAS=pragmas) if pragmas else nullcontext():
+            durees = {'lecture': [], 'ecriture': []}
+            erreurs = []
+            verrou = threading.Lock()
+            fin = time.perf_counter() + options['duree']
+            threads = [
+                threading.Thread(target=self.travailleur, args=(fin, options['ecritures'], durees, erreurs, verrou))
+                for _ in range(options['threads'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            connections.close_all()
+
+        def p95(valeurs):
+            valeurs = sorted(valeurs)
+            return valeurs[min(len(valeurs) - 1, int(len(valeurs) * 0.95))] if valeurs else 0
+
+        return {
+            'lectures_s': len(durees['lecture']) / options['duree'],
+            'ecritures_s': len(durees['ecriture']) / options['duree'],
+            'p95_lecture_ms': p95(durees['lecture']),
+            'p95_ecriture_ms': p95(durees['ecriture']),
+            'erreurs': len(erreurs),
+        }
+
+    def travailleur(self, fin, part_ecritures, durees, erreurs, verrou):
+        aleatoire = random.Random()
+        try:
+            while time.perf_counter() < fin:
+                produit_id, boutique_id = aleatoire.choice(self.produits)
+                nature = 'ecriture' if aleatoire.random() < part_ecritures else 'lecture'
+                debut = time.perf_counter()
+                try:
+                    if nature == 'ecriture':
+                        self.ecrire(produit_id, boutique_id)
+                    else:
+                        list(Produit.objects.filter(boutique_id=boutique_id, actif=True).order_by('-created_at')[:50])
+                except OperationalError as e:
+                    with verrou:
+                        erreurs.append(str(e))
+                    continue
+                with verrou:
+                    durees[nature].append((time.perf_counter() - debut) * 1000)
+        finally:
+            connection.close()
+
+    def ecrire(self, produit_id, boutique_id):
+        # Même forme qu'une vente : mise à jour du stock et entrée de journal dans une transaction
+        with transaction.atomic():
+            Produit.objects.filter(id=produit_id).update(quantite=F('quantite'))
+            Journal.objects.create(
+                utilisateur=self.utilisateur, boutique_id=boutique_id, type_operation='vente', description=MARQUEUR,
+            )
+
@@ -0,0 +1,202 @@
+import random
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Boutique, CommandeClient, CommandePartenaire, Facture, Journal, Partenaire, Produit, User, Versement,
+)
+
+TAILLE_LOT = 2000
+
+
+def poids_zipf(nombre, exposant=1.1):
+    # Quelques éléments concentrent l'essentiel de l'activité, comme dans les vraies boutiques
+    return [1 / (rang + 1) ** exposant for rang in range(nombre)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique (boutiques, produits, factures, lignes, versements, "
+        "journal) pour les mesures de performance. À lancer sur une base dédiée : les données "
+        "s'ajoutent à celles existantes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boutiques', type=int, default=20)
+        parser.add_argument('--produits', type=int, default=20000)
+        parser.add_argument('--factures', type=int, default=50000)
+        parser.add_argument('--lignes-max', type=int, default=5, help="Lignes maximum par facture")
+        parser.add_argument('--journal', type=int, default=200000)
+        parser.add_argument('--jours', type=int, default=365)
+        parser.add_argument('--graine', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.aleatoire = random.Random(options['graine'])
+        self.maintenant = timezone.now()
+        self.jours = options['jours']
+
+        with transaction.atomic():
+            boutiques, utilisateurs = self.generer_boutiques(options['boutiques'])
+            produits = self.generer_produits(boutiques, options['produits'])
+            partenaires = Partenaire.objects.bulk_create(
+                [Partenaire(nom=f'Partenaire {i}', prenom='Bench') for i in range(max(5, len(boutiques)))]
+            )
+            factures = self.generer_factures(boutiques, utilisateurs, options['factures'])
+            self.generer_lignes(factures, produits, partenaires, options['lignes_max'])
+            self.generer_versements(factures)
+            self.generer_journal(boutiques, utilisateurs, options['journal'])
+
+        # Les insertions en masse ne passent pas par les signaux du résumé journalier
+        call_command('reconstruire_ventes_journalieres', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(boutiques)} boutique(s), {options['produits']} produit(s), {len(factures)} facture(s), "
+            f"{options['journal']} entrée(s) de journal générées."
+        ))
+
+    def date_aleatoire(self):
+        # Activité plus dense sur les jours récents
+        jours = int(self.jours * self.aleatoire.random() ** 2)
+        return self.maintenant - timedelta(days=jours, seconds=self.aleatoire.randrange(86400))
+
+    def generer_boutiques(self, nombre):
+        debut = Boutique.objects.count()
+        boutiques = Boutique.objects.bulk_create(
+            [Boutique(nom=f'Boutique {debut + i}', ville='Bench') for i in range(nombre)]
+        )
+        utilisateurs = {}
+        for boutique in boutiques:
+            utilisateurs[boutique.id] = User.objects.create(
+                username=f'bench-{boutique.id}', role='admin', boutique=boutique
+            )
+        self.poids_boutiques = poids_zipf(len(boutiques))
+        return boutiques, utilisateurs
+
+    def generer_produits(self, boutiques, nombre):
+        categories = [choix for choix, _ in Produit.choice]
+        poids_categories = poids_zipf(len(categories), exposant=0.8)
+        marques = ['Lenovo', 'HP', 'Dell', 'Samsung', 'Apple', 'Tecno', 'Infinix', 'Asus', 'Acer', 'Xiaomi']
+        objets = []
+        for i in range(nombre):
+            category = self.aleatoire.choices(categories, poids_categories)[0]
+            marque = self.aleatoire.choice(marques)
+            prix_achat = self.aleatoire.randrange(5000, 500000, 500)
+            objets.append(Produit(
+                nom=f'{marque} {category} {i}',
+                reference=f'BENCH-{i}',
+                category=category,
+                description=f'{marque} {category} reconditionné, garantie 6 mois',
+                quantite=self.aleatoire.randint(0, 30),
+                prix_achat=prix_achat,
+                prix=prix_achat + self.aleatoire.randrange(5000, 100000, 500),
+                boutique=self.aleatoire.choices(boutiques, self.poids_boutiques)[0],
+                actif=self.aleatoire.random() < 0.9,
+                created_at=self.date_aleatoire(),
+                updated_at=self.maintenant,
+                marque=marque if category == 'ordinateur' else None,
+                processeur='Core i5' if category == 'ordinateur' else None,
+            ))
+        produits = Produit.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+
+        # Popularité des produits par boutique (loi de Zipf)
+        self.produits_par_boutique = {}
+        for produit in produits:
+            self.produits_par_boutique.setdefault(produit.boutique_id, []).append(produit)
+        self.poids_produits = {
+            boutique_id: poids_zipf(len(liste)) for boutique_id, liste in self.produits_par_boutique.items()
+        }
+        return produits
+
+    def generer_factures(self, boutiques, utilisateurs, nombre):
+        boutiques = [boutique for boutique in boutiques if boutique.id in self.produits_par_boutique]
+        poids = poids_zipf(len(boutiques))
+        objets = []
+        for i in range(nombre):
+            boutique = self.aleatoire.choices(boutiques, poids)[0]
+            objets.append(Facture(
+                type='client' if self.aleatoire.random() < 0.8 else 'partenaire',
+                nom=f'Client {i}',
+                numero=f'B{i}',
+                total=0,
+                reste=0,
+                status='encours',
+                created_by=utilisateurs[boutique.id],
+                boutique=boutique,
+            ))
+        factures = Facture.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+
+        # created_at est en auto_now_add : les dates sont réparties après l'insertion
+        dates = {facture.id: self.date_aleatoire() for facture in factures}
+        for facture in factures:
+            facture.created_at = dates[facture.id]
+        Facture.objects.bulk_update(factures, ['created_at'], batch_size=500)
+        return factures
+
+    def generer_lignes(self, factures, produits, partenaires, lignes_max):
+        lignes_client, lignes_partenaire = [], []
+        for facture in factures:
+            candidats = self.produits_par_boutique[facture.boutique_id]
+            poids = self.poids_produits[facture.boutique_id]
+            total = 0
+            partenaire = self.aleatoire.choice(partenaires)
+            for _ in range(self.aleatoire.randint(1, lignes_max)):
+                produit = self.aleatoire.choices(candidats, poids)[0]
+                quantite = self.aleatoire.choices([1, 2, 3, 5], [70, 20, 7, 3])[0]
+                total += quantite * produit.prix
+                if facture.type == 'client':
+                    lignes_client.append(CommandeClient(
+                        facture=facture, produit=produit, quantite=quantite,
+                        prix_unitaire_fcfa=produit.prix, prix_initial_fcfa=produit.prix, prix_achat_fcfa=produit.prix_achat,
+                        nom=facture.nom, prenom='Bench', telephone='600000000',
+                    ))
+                else:
+                    lignes_partenaire.append(CommandePartenaire(
+                        facture=facture, partenaire=partenaire, produit=produit, quantite=quantite,
+                        prix_unitaire_fcfa=produit.prix, prix_initial_fcfa=produit.prix, prix_achat_fcfa=produit.prix_achat,
+                    ))
+            facture.total = total
+        CommandeClient.objects.bulk_create(lignes_client, batch_size=TAILLE_LOT)
+        CommandePartenaire.objects.bulk_create(lignes_partenaire, batch_size=TAILLE_LOT)
+
+    def generer_versements(self, factures):
+        versements = []
+        for facture in factures:
+            # 70 % soldées, 20 % partiellement payées, 10 % sans versement
+            tirage = self.aleatoire.random()
+            if tirage < 0.7:
+                montant = facture.total
+            elif tirage < 0.9:
+                montant = round(facture.total * self.aleatoire.uniform(0.2, 0.8), -2)
+            else:
+                montant = 0
+            facture.verse = montant
+            facture.reste = facture.total - montant
+            facture.status = 'payé' if facture.reste <= 0 else 'encours'
+            if montant:
+                versements.append(Versement(facture=facture, montant=montant))
+        Facture.objects.bulk_update(factures, ['total', 'verse', 'reste', 'status'], batch_size=500)
+        Versement.objects.bulk_create(versements, batch_size=TAILLE_LOT)
+
+    def generer_journal(self, boutiques, utilisateurs, nombre):
+        types = [choix for choix, _ in Journal.OPERATION_TYPES]
+        poids_types = [30, 25, 3, 15, 5, 15, 5, 2]
+        objets = []
+        for i in range(nombre):
+            boutique = self.aleatoire.choices(boutiques, self.poids_boutiques)[0]
+            type_operation = self.aleatoire.choices(types, poids_types)[0]
+            objets.append(Journal(
+                utilisateur=utilisateurs[boutique.id],
+                boutique=boutique,
+                type_operation=type_operation,
+                description=f'Opération {type_operation} {i}',
+                details={'method': 'POST', 'path': '/api/produits/', 'status_code': 201},
+                date_operation=self.date_aleatoire(),
+                ip_address='127.0.0.1',
+            ))
+            if len(objets) >= TAILLE_LOT:
+                Journal.objects.bulk_create(objets)
+                objets = []
+        Journal.objects.bulk_create(objets)
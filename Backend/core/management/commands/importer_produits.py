@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from core.importation import FichierInvalide, importer_produits, lire_lignes
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un catalogue de produits CSV ou XLSX : création ou mise à jour par "
+        "(boutique, reference), lignes invalides listées dans le rapport."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier')
+        parser.add_argument('--boutique', type=int, help="Boutique des lignes sans colonne boutique")
+        parser.add_argument('--ajouter-quantite', action='store_true',
+                            help="Ajouter la quantité au stock des produits existants au lieu de la remplacer")
+        parser.add_argument('--simulation', action='store_true', help="Valider et compter sans rien enregistrer")
+        parser.add_argument('--utilisateur', help="Nom de l'utilisateur inscrit dans l'historique de stock")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['utilisateur']:
+            user = User.objects.filter(username=options['utilisateur']).first()
+            if user is None:
+                raise CommandError(f"Utilisateur {options['utilisateur']} introuvable.")
+
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = importer_produits(
+                    lire_lignes(fichier, options['fichier']),
+                    boutique=options['boutique'],
+                    ajouter_quantite=options['ajouter_quantite'],
+                    simulation=options['simulation'],
+                    user=user,
+                    motif=f"Import {options['fichier']}",
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+        except (FichierInvalide, UnicodeDecodeError) as e:
+            raise CommandError(f"Fichier illisible : {e}")
+        except serializers.ValidationError as e:
+            raise CommandError(f"Import annulé : {e.detail}")
+
+        for erreur in rapport['erreurs']:
+            messages = '; '.join(
+                f"{champ} : {' '.join(str(message) for message in liste)}" for champ, liste in erreur['erreurs'].items()
+            )
+            self.stderr.write(f"Ligne {erreur['ligne']} : {messages}")
+        message = (
+            f"{rapport['lignes']} ligne(s) lue(s) : {rapport['crees']} produit(s) créé(s), "
+            f"{rapport['mis_a_jour']} mis à jour, {len(rapport['erreurs'])} erreur(s)."
+        )
+        if rapport['simulation']:
+            message += " Simulation : rien n'a été enregistré."
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import Boutique, Facture, Produit, User
+from core.views import debut_journee
+
+
+class Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure l'effet des index composites de Produit et Facture sur un jeu de données "
+        "généré pour l'occasion. Tout est fait dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boutiques', type=int, default=10)
+        parser.add_argument('--produits', type=int, default=50000)
+        parser.add_argument('--factures', type=int, default=100000)
+        parser.add_argument('--jours', type=int, default=365)
+        parser.add_argument('--repetitions', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repetitions = options['repetitions']
+        try:
+            with transaction.atomic():
+                boutique, jour = self.generer(options)
+                requetes = self.requetes(boutique, jour)
+                avec_index = self.mesurer(requetes)
+                self.supprimer_index()
+                sans_index = self.mesurer(requetes)
+                raise Annulation
+        except Annulation:
+            pass
+
+        self.stdout.write(f"{'Requête':<32}{'sans index (ms)':>18}{'avec index (ms)':>18}{'gain':>10}")
+        for nom in requetes:
+            gain = sans_index[nom] / avec_index[nom] if avec_index[nom] else float('inf')
+            self.stdout.write(f"{nom:<32}{sans_index[nom]:>18.2f}{avec_index[nom]:>18.2f}{gain:>9.1f}x")
+
+    def generer(self, options):
+        aleatoire = random.Random(42)
+        maintenant = timezone.now()
+        categories = [choix for choix, _ in Produit.choice]
+
+        boutiques = Boutique.objects.bulk_create(
+            [Boutique(nom=f'Boutique {i}', ville='Bench') for i in range(options['boutiques'])]
+        )
+        utilisateur = User.objects.create(username='mesure-index', role='admin', boutique=boutiques[0])
+
+        Produit.objects.bulk_create(
+            [
+                Produit(
+                    nom=f'Produit {i}', reference=f'BENCH-{i}', category=aleatoire.choice(categories),
+                    quantite=aleatoire.randint(0, 50), prix_achat=10000, prix=20000,
+                    boutique=aleatoire.choice(boutiques), actif=aleatoire.random() < 0.9,
+                    created_at=maintenant - timedelta(minutes=i), updated_at=maintenant,
+                )
+                for i in range(options['produits'])
+            ],
+            batch_size=1000,
+        )
+
+        factures = Facture.objects.bulk_create(
+            [
+                Facture(
+                    type=aleatoire.choice(['client', 'partenaire']), total=100000, reste=0,
+                    status='payé', created_by=utilisateur, boutique=aleatoire.choice(boutiques),
+                )
+                for _ in range(options['factures'])
+            ],
+            batch_size=1000,
+        )
+        # auto_now_add impose la date courante à l'insertion : étalement sur la période ensuite
+        par_jour = {}
+        for facture in factures:
+            par_jour.setdefault(aleatoire.randrange(options['jours']), []).append(facture.id)
+        for decalage, ids in par_jour.items():
+            for debut in range(0, len(ids), 500):
+                Facture.objects.filter(id__in=ids[debut:debut + 500]).update(
+                    created_at=maintenant - timedelta(days=decalage, seconds=aleatoire.randrange(86400))
+                )
+
+        return boutiques[0], timezone.localdate(maintenant - timedelta(days=options['jours'] // 2))
+
+    def requetes(self, boutique, jour):
+        debut = debut_journee(jour)
+        fin = debut_journee(jour + timedelta(days=1))
+        return {
+            'factures_jour_truncdate': lambda: list(
+                Facture.objects.filter(boutique=boutique).annotate(jour=TruncDate('created_at'))
+                .filter(jour=jour).order_by('-created_at')[:50]
+            ),
+            'factures_jour_plage': lambda: list(
+                Facture.objects.filter(boutique=boutique, created_at__gte=debut, created_at__lt=fin)
+                .order_by('-created_at')[:50]
+            ),
+            'factures_boutique_recentes': lambda: list(
+                Facture.objects.filter(boutique=boutique).order_by('-created_at')[:50]
+            ),
+            'produits_filtres': lambda: list(
+                Produit.objects.filter(boutique=boutique, actif=True, category='ordinateur')
+                .order_by('-created_at')[:50]
+            ),
+            'produits_boutique_recents': lambda: list(
+                Produit.objects.filter(boutique=boutique).order_by('-created_at')[:50]
+            ),
+        }
+
+    def mesurer(self, requetes):
+        resultats = {}
+        for nom, requete in requetes.items():
+            requete()  # préchauffage du cache
+            durees = []
+            for _ in range(self.repetitions):
+                debut = time.perf_counter()
+                requete()
+                durees.append((time.perf_counter() - debut) * 1000)
+            resultats[nom] = statistics.median(durees)
+        return resultats
+
+    def supprimer_index(self):
+        with connection.cursor() as cursor:
+            for modele in (Produit, Facture):
+                for index in modele._meta.indexes:
+                    cursor.execute('DROP INDEX %s' % connection.ops.quote_name(index.name))
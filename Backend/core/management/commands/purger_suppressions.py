@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import synchro
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les traces de suppression plus anciennes que "
+        "SYNCHRO['RETENTION_SUPPRESSIONS_JOURS'] (synchronisation incrémentale)."
+    )
+
+    def handle(self, *args, **options):
+        nombre = synchro.purger()
+        self.stdout.write(self.style.SUCCESS(f"{nombre} trace(s) de suppression purgée(s)."))
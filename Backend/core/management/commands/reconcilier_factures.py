@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import soldes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule verse, reste et status des factures depuis leurs versements (core/soldes.py) "
+        "et corrige le résumé VenteJournaliere en conséquence."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boutique', type=int, help="Ne traiter que cette boutique")
+        parser.add_argument('--simulation', action='store_true', help="Compter les écarts sans rien corriger")
+
+    def handle(self, *args, **options):
+        nombre = soldes.reconcilier(simulation=options['simulation'], boutique=options.get('boutique'))
+        if options['simulation']:
+            self.stdout.write(f"Simulation : {nombre} facture(s) à corriger.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{nombre} facture(s) corrigée(s)."))
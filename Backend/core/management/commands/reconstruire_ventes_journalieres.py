@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import ventes_journalieres
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule la table VenteJournaliere à partir des factures, lignes et versements. "
+        "La marge utilise le prix d'achat enregistré sur chaque ligne à la vente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boutique', type=int, help="Ne reconstruire que cette boutique")
+
+    def handle(self, *args, **options):
+        nombre = ventes_journalieres.reconstruire(options.get('boutique'))
+        self.stdout.write(self.style.SUCCESS(f"{nombre} ligne(s) de ventes journalières reconstruites."))
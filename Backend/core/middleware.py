@@ -1,45 +1,66 @@
+import time
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils import timezone
 from .models import Journal
-from django.contrib.auth.models import User
+from . import journal, profilage
+
 
 class JournalMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
-        self.process_response(request, response)
+        # Les entrées créées par la vue pendant la requête sont fusionnées ici
+        jeton = journal.ouvrir_requete()
+        try:
+            response = self.get_response(request)
+            self.process_response(request, response)
+        finally:
+            journal.fermer_requete(jeton)
         return response
 
     def process_response(self, request, response):
+        entrees_vue = journal.entrees_requete()
+
         # Ignorer les requêtes non authentifiées
         if not request.user.is_authenticated:
             return response
 
         # Ignorer les requêtes GET
-        if request.method == 'GET':
+        if request.method == 'GET' and not entrees_vue:
             return response
 
         try:
-            # Déterminer le type d'opération
-            operation_type = self._get_operation_type(request)
+            contexte = {
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+            }
+            ip_address = self._get_client_ip(request)
+
+            if entrees_vue:
+                # La vue a déjà décrit l'opération : on la complète au lieu d'écrire une seconde ligne,
+                # avec les mêmes limites de taille que les détails construits ici
+                for entree in entrees_vue:
+                    entree.details = {**contexte, **journal.compacter(entree.details or {})}
+                    entree.ip_address = ip_address
+                    journal.enregistrer(entree, differer_dans_requete=False)
+                return response
 
-            # Récupérer la boutique de l'utilisateur
-            boutique = None
-            if hasattr(request.user, 'boutique'):
-                boutique = request.user.boutique
-            elif hasattr(request.user, 'boutiques'):
-                boutique = request.user.boutiques.first()
-
-            # Créer l'entrée dans le journal
-            Journal.objects.create(
-                utilisateur=request.user,
-                boutique=boutique,
-                type_operation=operation_type,
-                description=self._get_operation_description(request, operation_type),
-                details=self._get_operation_details(request, response),
-                date_operation=timezone.now(),
-                ip_address=self._get_client_ip(request)
+            operation_type = self._get_operation_type(request)
+            journal.enregistrer(
+                Journal(
+                    utilisateur=request.user,
+                    # boutique_id évite de charger la boutique de l'utilisateur
+                    boutique_id=getattr(request.user, 'boutique_id', None),
+                    type_operation=operation_type,
+                    description=self._get_operation_description(request, operation_type),
+                    details=self._get_operation_details(request, response),
+                    date_operation=timezone.now(),
+                    ip_address=ip_address
+                ),
+                differer_dans_requete=False,
             )
         except Exception as e:
             print(f"Erreur lors de la journalisation: {str(e)}")
@@ -78,20 +99,84 @@ class JournalMiddleware:
             'status_code': response.status_code,
         }
 
-        # Ajouter les données de la requête si elles existent
-        if request.body:
+        # PUT/PATCH : champs réellement modifiés, notés par ModificationsJournalMixin
+        modifications = getattr(request, 'journal_modifications', None)
+        if modifications is not None and journal.configuration()['DIFF_MODIFICATIONS']:
+            details['modifications'] = journal.compacter(journal.normaliser_details(modifications))
+            return details
+
+        # Réutiliser les données déjà analysées par DRF plutôt que relire request.body
+        drf_request = getattr(response, 'renderer_context', {}).get('request')
+        donnees = getattr(drf_request, '_full_data', None)
+        if donnees:
+            if hasattr(donnees, 'dict'):
+                donnees = donnees.dict()
             try:
-                import json
-                details['request_data'] = json.loads(request.body)
-            except:
+                details['request_data'] = journal.compacter(
+                    journal.normaliser_details(donnees), self._get_ressource(request)
+                )
+            except (TypeError, ValueError):
                 pass
 
         return details
 
+    def _get_ressource(self, request):
+        # /api/<ressource>/... : clé de JOURNAL['CHAMPS_DETAILS']
+        parts = request.path.strip('/').split('/')
+        return parts[1] if len(parts) > 1 and parts[0] == 'api' else None
+
     def _get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip 
\ No newline at end of file
+        return ip
+
+
+class ProfilageMiddleware:
+    """
+    Instrumentation optionnelle (settings.PROFILAGE['ACTIF']) : requêtes SQL, temps base,
+    temps de sérialisation, temps de rendu et taille de réponse par vue, en en-tête Server-Timing et sur /api/_metrics/.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.configuration = profilage.configuration()
+        if not self.configuration['ACTIF']:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        compteur = profilage.CompteurRequetesSQL(self.configuration['SEUIL_REQUETE_LENTE_MS'])
+        request._profilage_serialisation = 0.0
+        request._profilage_rendu = 0.0
+        debut = time.perf_counter()
+        with connection.execute_wrapper(compteur):
+            response = self.get_response(request)
+        duree = time.perf_counter() - debut
+
+        taille = 0 if response.streaming else len(response.content)
+        resolver_match = getattr(request, 'resolver_match', None)
+        vue = resolver_match.view_name if resolver_match else 'inconnue'
+        profilage.metriques.enregistrer(
+            vue, request.method, duree, compteur.nombre, compteur.duree, compteur.lentes,
+            request._profilage_serialisation, request._profilage_rendu, taille,
+        )
+
+        if self.configuration['EN_TETE_SERVER_TIMING']:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={compteur.duree * 1000:.1f};desc="{compteur.nombre} requetes SQL"',
+                f'serialisation;dur={request._profilage_serialisation * 1000:.1f}',
+                f'rendu;dur={request._profilage_rendu * 1000:.1f}',
+                f'total;dur={duree * 1000:.1f}',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # Appelé juste avant response.render() : mesure du rendu (JSON) de la réponse DRF
+        debut = time.perf_counter()
+
+        def fin_rendu(rendue):
+            request._profilage_rendu += time.perf_counter() - debut
+
+        response.add_post_render_callback(fin_rendu)
+        return response
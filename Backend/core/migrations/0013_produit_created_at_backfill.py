@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Min
+from django.utils import timezone
+
+
+def renseigner_created_at(apps, schema_editor):
+    # Les produits antérieurs à la migration 0010 n'ont pas de date de création ;
+    # la pagination par curseur sur created_at exige une valeur. On les place
+    # juste avant le plus ancien produit daté pour conserver l'ordre d'affichage.
+    Produit = apps.get_model('core', 'Produit')
+    plus_ancien = Produit.objects.aggregate(date=Min('created_at'))['date'] or timezone.now()
+    date_par_defaut = plus_ancien - timedelta(seconds=1)
+    Produit.objects.filter(created_at__isnull=True).update(created_at=date_par_defaut)
+    Produit.objects.filter(updated_at__isnull=True).update(updated_at=date_par_defaut)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_journal_core_journa_date_op_a99831_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(renseigner_created_at, migrations.RunPython.noop),
+    ]
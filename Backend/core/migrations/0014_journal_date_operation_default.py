@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-17 22:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_produit_created_at_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journal',
+            name='date_operation',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-17 22:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_journal_date_operation_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenteJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('client', 'Client'), ('partenaire', 'Partenaire')], max_length=20)),
+                ('nombre_factures', models.IntegerField(default=0)),
+                ('chiffre_affaires', models.FloatField(default=0)),
+                ('encaisse', models.FloatField(default=0)),
+                ('reste', models.FloatField(default=0)),
+                ('versements', models.FloatField(default=0)),
+                ('quantite_vendue', models.IntegerField(default=0)),
+                ('marge', models.FloatField(default=0)),
+                ('boutique', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.boutique')),
+            ],
+            options={
+                'verbose_name': 'Vente journalière',
+                'verbose_name_plural': 'Ventes journalières',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='core_ventej_date_1fcbc9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('boutique', 'date', 'type'), name='vente_journaliere_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# Figé ici plutôt qu'importé de core.recherche, pour que la migration ne change pas avec le code
+CHAMPS_RECHERCHE = ['nom', 'description', 'marque', 'modele', 'processeur']
+TABLE_FTS = 'core_produit_fts'
+COLONNES = ', '.join(CHAMPS_RECHERCHE)
+NOUVELLES_VALEURS = ', '.join('new.%s' % champ for champ in CHAMPS_RECHERCHE)
+ANCIENNES_VALEURS = ', '.join('old.%s' % champ for champ in CHAMPS_RECHERCHE)
+
+SQLITE_CREATION = [
+    # Table FTS5 à contenu externe : seul l'index est stocké, le texte reste dans core_produit
+    f"""CREATE VIRTUAL TABLE {TABLE_FTS} USING fts5(
+        {COLONNES}, content='core_produit', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {TABLE_FTS}_ai AFTER INSERT ON core_produit BEGIN
+        INSERT INTO {TABLE_FTS}(rowid, {COLONNES}) VALUES (new.id, {NOUVELLES_VALEURS});
+    END""",
+    f"""CREATE TRIGGER {TABLE_FTS}_ad AFTER DELETE ON core_produit BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, {COLONNES}) VALUES ('delete', old.id, {ANCIENNES_VALEURS});
+    END""",
+    f"""CREATE TRIGGER {TABLE_FTS}_au AFTER UPDATE OF {COLONNES} ON core_produit BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, {COLONNES}) VALUES ('delete', old.id, {ANCIENNES_VALEURS});
+        INSERT INTO {TABLE_FTS}(rowid, {COLONNES}) VALUES (new.id, {NOUVELLES_VALEURS});
+    END""",
+    f"INSERT INTO {TABLE_FTS}({TABLE_FTS}) VALUES ('rebuild')",
+]
+
+SQLITE_SUPPRESSION = [
+    f"DROP TRIGGER IF EXISTS {TABLE_FTS}_au",
+    f"DROP TRIGGER IF EXISTS {TABLE_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {TABLE_FTS}_ai",
+    f"DROP TABLE IF EXISTS {TABLE_FTS}",
+]
+
+POSTGRESQL_CREATION = [
+    "CREATE INDEX core_produit_recherche_idx ON core_produit USING GIN ((to_tsvector('simple', {})))".format(
+        " || ' ' || ".join("coalesce({}, '')".format(champ) for champ in CHAMPS_RECHERCHE)
+    ),
+]
+
+POSTGRESQL_SUPPRESSION = [
+    "DROP INDEX IF EXISTS core_produit_recherche_idx",
+]
+
+
+def executer(requetes_par_moteur):
+    def operation(apps, schema_editor):
+        for requete in requetes_par_moteur.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(requete)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_ventejournaliere'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            executer({'sqlite': SQLITE_CREATION, 'postgresql': POSTGRESQL_CREATION}),
+            executer({'sqlite': SQLITE_SUPPRESSION, 'postgresql': POSTGRESQL_SUPPRESSION}),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_produit_recherche_plein_texte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['boutique', '-created_at'], name='core_factur_boutiqu_c717ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['boutique', 'type', '-created_at'], name='core_factur_boutiqu_8d465d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['-created_at'], name='core_factur_created_699f65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['boutique', 'actif', 'category', '-created_at'], name='core_produi_boutiqu_bf762a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['boutique', '-created_at'], name='core_produi_boutiqu_9ec0ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['-created_at'], name='core_produi_created_e31e76_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1 on 2026-10-17 23:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_index_produit_facture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LigneTransfert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantite', models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Transfert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('motif', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['boutique', 'reference'], name='core_produi_boutiqu_2a6938_idx'),
+        ),
+        migrations.AddField(
+            model_name='lignetransfert',
+            name='produit_destination',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.produit'),
+        ),
+        migrations.AddField(
+            model_name='lignetransfert',
+            name='produit_source',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.produit'),
+        ),
+        migrations.AddField(
+            model_name='transfert',
+            name='boutique_destination',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transferts_entrants', to='core.boutique'),
+        ),
+        migrations.AddField(
+            model_name='transfert',
+            name='boutique_source',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transferts_sortants', to='core.boutique'),
+        ),
+        migrations.AddField(
+            model_name='transfert',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='lignetransfert',
+            name='transfert',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='core.transfert'),
+        ),
+    ]
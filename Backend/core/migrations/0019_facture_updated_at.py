@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def renseigner_updated_at(apps, schema_editor):
+    # Les factures existantes n'ont pas été modifiées depuis leur création connue
+    Facture = apps.get_model('core', 'Facture')
+    Facture.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_transfert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facture',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(renseigner_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-17 23:19
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def renseigner_updated_at(apps, schema_editor):
+    # Lignes et versements existants : date de leur facture, date du versement
+    Facture = apps.get_model('core', 'Facture')
+    creation_facture = Subquery(Facture.objects.filter(pk=OuterRef('facture_id')).values('created_at')[:1])
+    for nom in ('CommandeClient', 'CommandePartenaire'):
+        apps.get_model('core', nom).objects.update(updated_at=creation_facture)
+    apps.get_model('core', 'Versement').objects.update(updated_at=F('date_versement'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_facture_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(max_length=30)),
+                ('objet_id', models.BigIntegerField()),
+                ('boutique_id', models.BigIntegerField(null=True)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='commandeclient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='commandepartenaire',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='versement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['updated_at'], name='core_factur_updated_60bd1e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['updated_at'], name='core_produi_updated_6923fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppression',
+            index=models.Index(fields=['modele', 'date'], name='core_suppre_modele_d395f1_idx'),
+        ),
+        migrations.RunPython(renseigner_updated_at, migrations.RunPython.noop),
+    ]
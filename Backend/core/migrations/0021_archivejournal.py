@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-17 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_synchronisation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveJournal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.CharField(max_length=7, unique=True)),
+                ('fichier', models.CharField(max_length=255)),
+                ('nombre', models.IntegerField(default=0)),
+                ('premiere_operation', models.DateTimeField(blank=True, null=True)),
+                ('derniere_operation', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-mois'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_archivejournal'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='journal',
+            name='core_journa_boutiqu_2c0bfa_idx',
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['boutique', '-date_operation'], name='core_journa_boutiqu_8c71c0_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-17 23:32
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def renseigner_verse(apps, schema_editor):
+    # Le reste saisi jusqu'ici fait foi : verse en est le complément
+    Facture = apps.get_model('core', 'Facture')
+    Facture.objects.update(verse=F('total') - F('reste'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_journal_boutique_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facture',
+            name='verse',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(renseigner_verse, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['boutique', 'status'], name='core_factur_boutiqu_8402f3_idx'),
+        ),
+    ]
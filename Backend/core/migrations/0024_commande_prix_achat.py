@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-17 23:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def renseigner_prix_achat(apps, schema_editor):
+    # Prix d'achat d'origine inconnu : celui du produit aujourd'hui, comme le calcul d'avant
+    Produit = apps.get_model('core', 'Produit')
+    prix_achat = Subquery(Produit.objects.filter(pk=OuterRef('produit_id')).values('prix_achat')[:1])
+    for modele in ('CommandeClient', 'CommandePartenaire'):
+        apps.get_model('core', modele).objects.update(prix_achat_fcfa=prix_achat)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_facture_verse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commandeclient',
+            name='prix_achat_fcfa',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commandepartenaire',
+            name='prix_achat_fcfa',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(renseigner_prix_achat, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from core.ventes_journalieres import reconstruire
+
+
+def remplir(apps, schema_editor):
+    # VenteJournaliere est créée vide (0015) et n'est tenue à jour qu'à partir des écritures
+    # suivantes : l'historique existant est résumé une fois ici, prix d'achat des lignes (0024) compris
+    reconstruire(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_commande_prix_achat'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir, migrations.RunPython.noop),
+    ]
@@ -67,6 +67,16 @@ class Produit(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Filtres et tri de ProduitViewSet (boutique, actif, category, -created_at)
+        indexes = [
+            models.Index(fields=['boutique', 'actif', 'category', '-created_at']),
+            models.Index(fields=['boutique', '-created_at']),
+            models.Index(fields=['-created_at']),
+            # Rapprochement des produits d'une boutique par référence (transferts)
+            models.Index(fields=['boutique', 'reference']),
+            # Synchronisation incrémentale (?since=)
+            models.Index(fields=['updated_at']),
+        ]
 
 class PrixProduit(models.Model):
     produit = models.OneToOneField(Produit, on_delete=models.CASCADE)
@@ -101,12 +111,27 @@ class Facture(models.Model):
     nom = models.CharField(max_length=20, default='',blank=True)
     numero = models.CharField(max_length=20, default='',blank=True)
     total = models.FloatField()
+    # Montant déjà payé ; verse, reste et status sont tenus à jour par les versements (core/soldes.py)
+    verse = models.FloatField(default=0)
     reste = models.FloatField()
     
     status = models.CharField(max_length=20, default='En attente')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     boutique = models.ForeignKey(Boutique, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Validateur des requêtes conditionnelles (ETag / Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Listes par boutique et par date (FactureFilter, tableau de bord, pagination)
+        indexes = [
+            models.Index(fields=['boutique', '-created_at']),
+            models.Index(fields=['boutique', 'type', '-created_at']),
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['updated_at']),
+            # Factures en cours / payées d'une boutique
+            models.Index(fields=['boutique', 'status']),
+        ]
 
 class CommandeClient(models.Model):
     facture = models.ForeignKey(Facture, on_delete=models.CASCADE)
@@ -114,10 +139,12 @@ class CommandeClient(models.Model):
     quantite = models.IntegerField()
     prix_unitaire_fcfa = models.FloatField()
     prix_initial_fcfa = models.FloatField(null=True, blank=True)  # Prix initial avant modification
+    prix_achat_fcfa = models.FloatField(null=True, blank=True)  # Prix d'achat du produit à la vente (marge)
     justification_prix = models.TextField(blank=True)  # Justification si le prix a été modifié
     nom = models.CharField(max_length=100,default='')
     prenom = models.CharField(max_length=100,default='')
     telephone = models.CharField(max_length=100,default='')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def total(self):
@@ -130,7 +157,9 @@ class CommandePartenaire(models.Model):
     quantite = models.IntegerField()
     prix_unitaire_fcfa = models.FloatField()
     prix_initial_fcfa = models.FloatField(null=True, blank=True)  # Prix initial avant modification
+    prix_achat_fcfa = models.FloatField(null=True, blank=True)  # Prix d'achat du produit à la vente (marge)
     justification_prix = models.TextField(blank=True)  # Justification si le prix a été modifié
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def total(self):
@@ -140,6 +169,7 @@ class Versement(models.Model):
     facture = models.ForeignKey(Facture, on_delete=models.CASCADE)
     montant = models.FloatField()
     date_versement = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 class HistoriqueStock(models.Model):
     produit = models.ForeignKey(Produit, on_delete=models.CASCADE)
@@ -148,6 +178,67 @@ class HistoriqueStock(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     date = models.DateTimeField(auto_now_add=True)
 
+class Transfert(models.Model):
+    boutique_source = models.ForeignKey(Boutique, on_delete=models.CASCADE, related_name='transferts_sortants')
+    boutique_destination = models.ForeignKey(Boutique, on_delete=models.CASCADE, related_name='transferts_entrants')
+    motif = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+class LigneTransfert(models.Model):
+    transfert = models.ForeignKey(Transfert, on_delete=models.CASCADE, related_name='lignes')
+    produit_source = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='+')
+    produit_destination = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='+')
+    quantite = models.IntegerField()
+
+class Suppression(models.Model):
+    """
+    Trace d'une suppression pour la synchronisation incrémentale (?since=) : le
+    client retire `objet_id` de son cache local.
+    """
+    modele = models.CharField(max_length=30)
+    objet_id = models.BigIntegerField()
+    boutique_id = models.BigIntegerField(null=True)
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modele', 'date']),
+        ]
+
+class VenteJournaliere(models.Model):
+    """
+    Résumé des ventes par boutique, jour et type de facture, tenu à jour à chaque
+    écriture (voir core/ventes_journalieres.py) pour les rapports sur de longues périodes.
+    """
+    boutique = models.ForeignKey(Boutique, on_delete=models.CASCADE)
+    date = models.DateField()
+    type = models.CharField(max_length=20, choices=Facture.TYPES)
+    nombre_factures = models.IntegerField(default=0)
+    chiffre_affaires = models.FloatField(default=0)  # total des factures du jour
+    encaisse = models.FloatField(default=0)  # total - reste des factures du jour
+    reste = models.FloatField(default=0)  # reste à payer des factures du jour
+    versements = models.FloatField(default=0)  # versements reçus ce jour
+    quantite_vendue = models.IntegerField(default=0)
+    marge = models.FloatField(default=0)  # (prix de vente - prix d'achat) * quantité
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Vente journalière'
+        verbose_name_plural = 'Ventes journalières'
+        constraints = [
+            models.UniqueConstraint(fields=['boutique', 'date', 'type'], name='vente_journaliere_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.boutique_id} - {self.date} - {self.type}"
+
 class Journal(models.Model):
     OPERATION_TYPES = [
         ('creation', 'Création'),
@@ -165,7 +256,8 @@ class Journal(models.Model):
     type_operation = models.CharField(max_length=20, choices=OPERATION_TYPES)
     description = models.TextField()
     details = models.JSONField(null=True, blank=True)
-    date_operation = models.DateTimeField(auto_now_add=True)
+    # Horodatage fixé à la création de l'entrée, pas à son écriture différée
+    date_operation = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
@@ -176,7 +268,8 @@ class Journal(models.Model):
             models.Index(fields=['date_operation']),
             models.Index(fields=['type_operation']),
             models.Index(fields=['utilisateur']),
-            models.Index(fields=['boutique']),
+            # Liste du journal d'une boutique (PerimetreBoutiqueMixin), plus récentes d'abord
+            models.Index(fields=['boutique', '-date_operation']),
         ]
 
     def __str__(self):
@@ -185,4 +278,18 @@ class Journal(models.Model):
     def save(self, *args, **kwargs):
         if not self.date_operation:
             self.date_operation = timezone.now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class ArchiveJournal(models.Model):
+    """
+    Index des archives mensuelles du journal (voir core/archives_journal.py).
+    """
+    mois = models.CharField(max_length=7, unique=True)  # AAAA-MM
+    fichier = models.CharField(max_length=255)
+    nombre = models.IntegerField(default=0)
+    premiere_operation = models.DateTimeField(null=True, blank=True)
+    derniere_operation = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-mois']
@@ -0,0 +1,147 @@
+import json
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, _reverse_ordering
+from rest_framework.response import Response
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Pagination par curseur (keyset) : le coût d'une page reste constant quelle que
+    soit la taille de la table, contrairement à LIMIT/OFFSET.
+
+    - tri : attribut `ordering` de la vue (ou `?ordering=` via OrderingFilter),
+      complété par `id` pour garantir un ordre total ;
+    - `?page_size=` : taille de page, plafonnée à `max_page_size` ;
+    - `?count=true` : ajoute le nombre total de résultats (requête COUNT en plus).
+
+    Le curseur retient la valeur de chaque champ du tri, `id` compris, pour la ligne
+    de bord de la page : la page suivante commence strictement après elle. Les ex aequo
+    sur le premier champ (produits importés avec le même created_at, même `rang` de
+    recherche) ne demandent donc pas le décalage (offset) du CursorPagination de DRF,
+    qui ne sait pas revenir en arrière quand toute une page partage la même valeur.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'oui'):
+            self.count = queryset.count()
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        inverse = self.cursor is not None and self.cursor.reverse
+        self.position = self.lire_position(self.cursor)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if inverse else self.ordering))
+        if self.position is not None:
+            queryset = queryset.filter(self.apres(self.position, inverse))
+
+        resultats = list(queryset[:self.page_size + 1])
+        self.page = resultats[:self.page_size]
+        suite = len(resultats) > self.page_size
+        if inverse:
+            # Page lue à rebours depuis le curseur « précédent » : remise dans l'ordre demandé
+            self.page.reverse()
+            self.has_next, self.has_previous = True, suite
+        else:
+            self.has_next, self.has_previous = suite, self.position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        if getattr(view, 'ordering', None):
+            self.ordering = view.ordering
+        ordering = super().get_ordering(request, queryset, view)
+
+        # Départage des ex aequo sur l'identifiant, dans le même sens que le premier champ
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id',) if ordering[0].startswith('-') else ('id',)
+        return ordering
+
+    def lire_position(self, cursor):
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def apres(self, position, inverse):
+        """
+        Lignes situées strictement après `position` dans l'ordre de lecture : comparaison
+        lexicographique sur les champs du tri, chacun dans son sens. Une valeur NULL
+        n'est comparée que par égalité (son rang dépend de la base).
+        """
+        condition = Q(pk__in=[])
+        egalites = Q()
+        for champ, valeur in zip(self.ordering, position):
+            nom = champ.lstrip('-')
+            decroissant = champ.startswith('-') != inverse
+            if valeur is not None:
+                condition |= egalites & Q(**{'%s__%s' % (nom, 'lt' if decroissant else 'gt'): valeur})
+            egalites &= Q(**{nom: valeur})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for champ in ordering:
+            field_name = champ.lstrip('-')
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                # serializable_value renvoie l'identifiant pour une clé étrangère (ex. `utilisateur`)
+                attr = instance.serializable_value(field_name)
+            position.append(None if attr is None else str(attr))
+        return json.dumps(position, separators=(',', ':'))
+
+    def lien(self, ligne, inverse):
+        if ligne is None:
+            # Page vide : on repart du même curseur
+            position = self.cursor.position if self.cursor else None
+        else:
+            position = self._get_position_from_instance(ligne, self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=inverse, position=position))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.lien(self.page[-1] if self.page else None, inverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.lien(self.page[0] if self.page else None, inverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+        }
+        return response_schema
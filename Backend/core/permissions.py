@@ -1,3 +1,4 @@
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import BasePermission
 
 class IsSuperAdmin(BasePermission):
@@ -23,4 +24,21 @@ class IsSameBoutique(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.role == 'superadmin':
             return True
-        return hasattr(obj, 'boutique') and obj.boutique == request.user.boutique
\ No newline at end of file
+        return hasattr(obj, 'boutique') and obj.boutique == request.user.boutique
+
+def boutique_autorisee(user, boutique_id):
+    """
+    Écriture permise dans `boutique_id` : partout pour le superadmin, sinon
+    seulement dans la boutique de l'utilisateur.
+    """
+    if getattr(user, 'role', None) == 'superadmin':
+        return True
+    return boutique_id is not None and boutique_id == getattr(user, 'boutique_id', None)
+
+
+def verifier_boutiques(user, boutique_ids):
+    refusees = sorted({boutique_id for boutique_id in boutique_ids if not boutique_autorisee(user, boutique_id)}, key=str)
+    if refusees:
+        raise PermissionDenied(
+            f"Boutique(s) hors de votre périmètre : {', '.join(str(boutique_id) for boutique_id in refusees)}."
+        )
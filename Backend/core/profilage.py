@@ -0,0 +1,146 @@
+"""
+Mesures par vue collectées par `ProfilageMiddleware` et exposées au format texte
+Prometheus sur /api/_metrics/.
+
+Les compteurs sont propres à chaque processus : avec plusieurs workers, chaque
+collecte Prometheus ne voit que le worker qui a répondu.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger('core.profilage')
+
+CONFIGURATION_PAR_DEFAUT = {
+    'ACTIF': False,
+    'SEUIL_REQUETE_LENTE_MS': 200,
+    'EN_TETE_SERVER_TIMING': True,
+}
+
+# Bornes (secondes) de l'histogramme des durées de réponse
+BORNES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'PROFILAGE', {})}
+
+
+class CompteurRequetesSQL:
+    """
+    `execute_wrapper` qui compte les requêtes SQL et leur durée, et journalise les lentes.
+    """
+
+    def __init__(self, seuil_ms):
+        self.seuil = seuil_ms / 1000
+        self.nombre = 0
+        self.duree = 0.0
+        self.lentes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duree = time.perf_counter() - debut
+            self.nombre += 1
+            self.duree += duree
+            if duree >= self.seuil:
+                self.lentes += 1
+                logger.warning("Requête SQL lente (%.0f ms) : %s", duree * 1000, sql[:1000])
+
+
+def mesurer_serialisation(request, serializer):
+    """
+    Ajoute le temps de `serializer.to_representation` (serializer.data) à la requête
+    profilée ; sans effet si ProfilageMiddleware est inactif. Les requêtes SQL paresseuses
+    lancées pendant la sérialisation comptent aussi dans le temps base.
+    """
+    if not hasattr(request, '_profilage_serialisation'):
+        return serializer
+    to_representation = serializer.to_representation
+
+    def mesure(instance):
+        debut = time.perf_counter()
+        try:
+            return to_representation(instance)
+        finally:
+            request._profilage_serialisation += time.perf_counter() - debut
+
+    serializer.to_representation = mesure
+    return serializer
+
+
+class Metriques:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._vues = {}
+
+    def enregistrer(self, vue, methode, duree, sql, duree_sql, sql_lentes, duree_serialisation, duree_rendu, taille):
+        with self._verrou:
+            stats = self._vues.get((vue, methode))
+            if stats is None:
+                stats = self._vues[(vue, methode)] = {
+                    'nombre': 0, 'duree': 0.0, 'buckets': [0] * (len(BORNES_DUREE) + 1),
+                    'sql': 0, 'duree_sql': 0.0, 'sql_lentes': 0, 'duree_serialisation': 0.0, 'duree_rendu': 0.0,
+                    'octets': 0,
+                }
+            stats['nombre'] += 1
+            stats['duree'] += duree
+            stats['buckets'][bisect_left(BORNES_DUREE, duree)] += 1
+            stats['sql'] += sql
+            stats['duree_sql'] += duree_sql
+            stats['sql_lentes'] += sql_lentes
+            stats['duree_serialisation'] += duree_serialisation
+            stats['duree_rendu'] += duree_rendu
+            stats['octets'] += taille
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._vues.clear()
+
+    def format_prometheus(self):
+        with self._verrou:
+            vues = {cle: {**stats, 'buckets': list(stats['buckets'])} for cle, stats in self._vues.items()}
+
+        lignes = []
+
+        def serie(nom, type_metrique, aide, valeurs):
+            lignes.append(f'# HELP {nom} {aide}')
+            lignes.append(f'# TYPE {nom} {type_metrique}')
+            lignes.extend(valeurs)
+
+        def etiquettes(vue, methode, **autres):
+            paires = {'vue': vue, 'methode': methode, **autres}
+            return '{' + ','.join('%s="%s"' % (cle, str(valeur).replace('"', '\\"')) for cle, valeur in paires.items()) + '}'
+
+        histogramme = []
+        for (vue, methode), stats in sorted(vues.items()):
+            cumul = 0
+            for borne, nombre in zip(BORNES_DUREE + ('+Inf',), stats['buckets']):
+                cumul += nombre
+                histogramme.append(f'api_requete_duree_secondes_bucket{etiquettes(vue, methode, le=borne)} {cumul}')
+            histogramme.append(f'api_requete_duree_secondes_sum{etiquettes(vue, methode)} {stats["duree"]:.6f}')
+            histogramme.append(f'api_requete_duree_secondes_count{etiquettes(vue, methode)} {stats["nombre"]}')
+        serie('api_requete_duree_secondes', 'histogram', 'Durée totale de traitement des requêtes.', histogramme)
+
+        compteurs = (
+            ('api_requetes_sql_total', 'sql', 'Nombre de requêtes SQL exécutées.', '{}'),
+            ('api_requetes_sql_secondes_total', 'duree_sql', 'Temps passé en base de données.', '{:.6f}'),
+            ('api_requetes_sql_lentes_total', 'sql_lentes', 'Requêtes SQL au-dessus du seuil.', '{}'),
+            ('api_serialisation_secondes_total', 'duree_serialisation', 'Temps de sérialisation (serializer.data).',
+             '{:.6f}'),
+            ('api_rendu_secondes_total', 'duree_rendu', 'Temps de rendu (JSONRenderer) des réponses.', '{:.6f}'),
+            ('api_reponse_octets_total', 'octets', 'Taille cumulée des réponses.', '{}'),
+        )
+        for nom, champ, aide, format_valeur in compteurs:
+            serie(nom, 'counter', aide, [
+                f'{nom}{etiquettes(vue, methode)} {format_valeur.format(stats[champ])}'
+                for (vue, methode), stats in sorted(vues.items())
+            ])
+        return '\n'.join(lignes) + '\n'
+
+
+metriques = Metriques()
@@ -0,0 +1,81 @@
+"""
+Recherche plein texte sur les produits.
+
+- SQLite : table virtuelle FTS5 `core_produit_fts` (contenu externe sur core_produit),
+  tenue à jour par des triggers créés dans la migration 0016 (y compris pour
+  les update() et bulk_create) ;
+- PostgreSQL : index GIN sur l'expression `expression_tsvector()` ;
+- autres bases : recherche LIKE habituelle de DRF (`SearchFilter`).
+
+Chaque mot saisi est cherché en préfixe (« leno » trouve « Lenovo ») et les résultats
+sont triés par pertinence (annotation `rang`, croissante) sauf si `?ordering=` est fourni.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+CHAMPS_RECHERCHE = ['nom', 'description', 'marque', 'modele', 'processeur']
+
+TABLE_FTS = 'core_produit_fts'
+
+
+def expression_tsvector(table=None):
+    # Même expression pour l'index (colonnes seules) et les requêtes (colonnes qualifiées)
+    prefixe = '%s.' % table if table else ''
+    return "to_tsvector('simple', {})".format(
+        " || ' ' || ".join("coalesce({}{}, '')".format(prefixe, champ) for champ in CHAMPS_RECHERCHE)
+    )
+
+
+def mots(terme):
+    return re.findall(r'\w+', terme or '')
+
+
+def recherche_disponible():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def rechercher_produits(queryset, terme):
+    """
+    Filtre `queryset` (Produit) sur `terme` et l'annote avec `rang` (plus petit = plus pertinent).
+    """
+    termes = mots(terme)
+    if not termes:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        # Les produits trouvés par l'index, puis leur `rank` FTS5 (bm25) relu par rowid
+        requete = ' '.join('"%s"*' % mot for mot in termes)
+        return queryset.filter(
+            id__in=RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (TABLE_FTS, TABLE_FTS), [requete])
+        ).annotate(rang=RawSQL(
+            'SELECT rank FROM %s WHERE %s MATCH %%s AND rowid = core_produit.id' % (TABLE_FTS, TABLE_FTS),
+            [requete], output_field=FloatField(),
+        ))
+
+    requete = ' & '.join('%s:*' % mot for mot in termes)
+    vecteur = expression_tsvector('core_produit')
+    return queryset.filter(
+        RawSQL("%s @@ to_tsquery('simple', %%s)" % vecteur, [requete], output_field=BooleanField())
+    ).annotate(rang=RawSQL(
+        "-ts_rank(%s, to_tsquery('simple', %%s))" % vecteur, [requete], output_field=FloatField()
+    ))
+
+
+class RechercheProduitFilter(filters.SearchFilter):
+    """
+    `?search=` indexé pour les produits, avec repli sur la recherche LIKE de DRF.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terme = request.query_params.get(self.search_param, '')
+        if not mots(terme) or not recherche_disponible():
+            return super().filter_queryset(request, queryset, view)
+
+        # Tri par pertinence par défaut ; repris par OrderingFilter et la pagination
+        if not request.query_params.get('ordering'):
+            view.ordering = ['rang']
+        return rechercher_produits(queryset, terme)
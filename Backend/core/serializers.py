@@ -1,5 +1,105 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import *
+from . import cache_api, soldes, stock, ventes_journalieres
+from .permissions import verifier_boutiques
+
+# Marge minimale exigée entre le prix d'achat et le prix de vente (FCFA)
+MARGE_MINIMALE = 5000
+
+class CleEtrangereLot(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField qui consulte d'abord les objets préchargés par
+    ListeEnMasseSerializer.
+    """
+    objets_lot = None
+
+    def to_internal_value(self, data):
+        if self.objets_lot is not None and type(data) is int and data in self.objets_lot:
+            return self.objets_lot[data]
+        return super().to_internal_value(data)
+
+class ListeEnMasseSerializer(serializers.ListSerializer):
+    """
+    Création et modification de plusieurs objets en une requête : un bulk_create ou
+    un bulk_update au lieu d'un save() par objet. En modification, `instance` est la
+    liste des objets dans l'ordre des éléments reçus, chacun portant son `id`.
+    """
+
+    def to_internal_value(self, data):
+        # Clés étrangères du lot chargées en une requête par champ, pas une par élément
+        if isinstance(data, list):
+            for nom, champ in self.child.fields.items():
+                if isinstance(champ, CleEtrangereLot) and not champ.read_only:
+                    pks = {element.get(nom) for element in data if isinstance(element, dict)}
+                    pks = {pk for pk in pks if type(pk) is int}
+                    champ.objets_lot = champ.get_queryset().in_bulk(pks)
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            # Chaque élément est validé contre l'objet qu'il modifie
+            if not hasattr(self, '_instances_par_id'):
+                self._instances_par_id = {instance.pk: instance for instance in self.instance}
+            self.child.instance = self._instances_par_id.get(data.get('id'))
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def instancier(self, attrs):
+        return self.child.Meta.model(**attrs)
+
+    def modifier(self, instance, attrs):
+        for champ, valeur in attrs.items():
+            setattr(instance, champ, valeur)
+        return set(attrs)
+
+    def create(self, validated_data):
+        return self.child.Meta.model.objects.bulk_create(
+            [self.instancier(attrs) for attrs in validated_data], batch_size=500
+        )
+
+    def update(self, instances, validated_data):
+        champs = set()
+        for instance, attrs in zip(instances, validated_data):
+            champs |= self.modifier(instance, attrs)
+        if champs:
+            # bulk_update ne renseigne pas les champs auto_now
+            for champ in self.child.Meta.model._meta.concrete_fields:
+                if getattr(champ, 'auto_now', False):
+                    for instance in instances:
+                        champ.pre_save(instance, False)
+                    champs.add(champ.name)
+            self.child.Meta.model.objects.bulk_update(instances, champs, batch_size=500)
+        return instances
+
+class ListeProduitsSerializer(ListeEnMasseSerializer):
+    def instancier(self, attrs):
+        ProduitSerializer.normaliser_champs_ordinateur(attrs, attrs.get('category'))
+        # bulk_create ne passe pas par Produit.save()
+        maintenant = timezone.now()
+        return Produit(**{'created_at': maintenant, 'updated_at': maintenant, **attrs})
+
+    def modifier(self, instance, attrs):
+        # Contrairement à update(), les champs absents d'une modification partielle sont conservés
+        if attrs.get('category', instance.category) == 'ordinateur':
+            for field in ['ram', 'stockage', 'processeur', 'annee', 'marque', 'modele', 'systeme_exploitation']:
+                if attrs.get(field) == '':
+                    attrs[field] = None
+        attrs['updated_at'] = timezone.now()
+        return super().modifier(instance, attrs)
+
+    # bulk_create / bulk_update ne passent pas par les signaux d'invalidation du cache
+    def create(self, validated_data):
+        produits = super().create(validated_data)
+        cache_api.invalider('produit', {produit.boutique_id for produit in produits})
+        return produits
+
+    def update(self, instances, validated_data):
+        anciennes_boutiques = {produit.boutique_id for produit in instances}
+        produits = super().update(instances, validated_data)
+        cache_api.invalider('produit', anciennes_boutiques | {produit.boutique_id for produit in produits})
+        return produits
 
 class BoutiqueSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,9 +112,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'role', 'boutique')
 
 class ProduitSerializer(serializers.ModelSerializer):
+    serializer_related_field = CleEtrangereLot
+
     class Meta:
         model = Produit
         fields = '__all__'
+        list_serializer_class = ListeProduitsSerializer
         extra_kwargs = {
             'marque': {'required': False, 'allow_null': True},
             'modele': {'required': False, 'allow_null': True},
@@ -58,24 +161,52 @@ class ProduitSerializer(serializers.ModelSerializer):
         
         return value
 
-    def create(self, validated_data):
+    @staticmethod
+    def normaliser_champs_ordinateur(validated_data, category):
         # S'assurer que les champs spécifiques aux ordinateurs sont correctement gérés
-        if validated_data.get('category') == 'ordinateur':
+        if category == 'ordinateur':
             for field in ['ram', 'stockage', 'processeur', 'annee', 'marque', 'modele', 'systeme_exploitation']:
                 if field not in validated_data or validated_data[field] == '':
                     validated_data[field] = None
+        return validated_data
 
+    def create(self, validated_data):
+        self.normaliser_champs_ordinateur(validated_data, validated_data.get('category'))
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        # S'assurer que les champs spécifiques aux ordinateurs sont correctement mis à jour
-        if validated_data.get('category', instance.category) == 'ordinateur':
-            for field in ['ram', 'stockage', 'processeur', 'annee', 'marque', 'modele', 'systeme_exploitation']:
-                if field not in validated_data or validated_data[field] == '':
-                    validated_data[field] = None
-                    
+        self.normaliser_champs_ordinateur(validated_data, validated_data.get('category', instance.category))
         return super().update(instance, validated_data)
 
+class ProduitImportSerializer(ProduitSerializer):
+    """
+    Validation d'une ligne d'import : mêmes règles que ProduitSerializer, mais la
+    boutique est vérifiée contre l'ensemble chargé une fois (context['boutiques'])
+    plutôt que par une requête par ligne.
+    """
+    boutique = serializers.IntegerField()
+
+    class Meta(ProduitSerializer.Meta):
+        exclude = ['created_at', 'updated_at']
+        fields = None
+
+    def validate_boutique(self, value):
+        if value not in self.context['boutiques']:
+            raise serializers.ValidationError(f"Boutique {value} introuvable.")
+        # Import par l'API : pas de ligne hors du périmètre de l'appelant
+        if self.context.get('perimetre') is not None:
+            verifier_boutiques(self.context['perimetre'], [value])
+        return value
+
+class ProduitResumeSerializer(serializers.ModelSerializer):
+    """
+    Représentation réduite d'un produit pour les listes de lignes de commande.
+    """
+    class Meta:
+        model = Produit
+        fields = ['id', 'nom', 'reference', 'prix_achat']
+        read_only_fields = fields
+
 class PrixProduitSerializer(serializers.ModelSerializer):
     prix_vente_fcfa = serializers.FloatField(read_only=True)
 
@@ -89,9 +220,34 @@ class PartenaireSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class FactureSerializer(serializers.ModelSerializer):
+    serializer_related_field = CleEtrangereLot
+
     class Meta:
         model = Facture
         fields = '__all__'
+        read_only_fields = ('verse',)
+        list_serializer_class = ListeEnMasseSerializer
+
+    def validate(self, data):
+        # Reste saisi à la main (création, correction) : verse en découle. Sinon un
+        # nouveau total garde les versements déjà reçus et seul le reste change.
+        if 'total' in data or 'reste' in data:
+            total = data.get('total', getattr(self.instance, 'total', None))
+            if 'reste' in data:
+                data['verse'] = total - data['reste']
+            else:
+                data['reste'] = total - getattr(self.instance, 'verse', 0)
+            data.setdefault('status', soldes.statut(data['reste']))
+        return data
+
+def verifier_produit_de_la_facture(instance, data):
+    # Une ligne ne vend que des produits de la boutique de sa facture (comme le checkout)
+    facture = data.get('facture') or getattr(instance, 'facture', None)
+    produit = data.get('produit') or getattr(instance, 'produit', None)
+    if facture is not None and produit is not None and produit.boutique_id != facture.boutique_id:
+        raise serializers.ValidationError(
+            {'produit_id': f"Le produit {produit.nom} n'appartient pas à la boutique de la facture."}
+        )
 
 class CommandeClientSerializer(serializers.ModelSerializer):
     total = serializers.ReadOnlyField()
@@ -116,21 +272,25 @@ class CommandeClientSerializer(serializers.ModelSerializer):
                 produit = Produit.objects.get(id=produit_id)
                 prix_achat = produit.prix_achat or 0
                 prix_vente = data.get('prix_unitaire_fcfa', 0)
-                marge_minimale = 5000  # 5000 FCFA
+                marge_minimale = MARGE_MINIMALE
                 
                 if prix_vente < prix_achat + marge_minimale:
                     raise serializers.ValidationError(
                         f"Le prix de vente ({prix_vente} FCFA) doit être au moins {prix_achat + marge_minimale} FCFA "
                         f"(prix d'achat: {prix_achat} FCFA + marge minimale: {marge_minimale} FCFA)"
                     )
+                # Réutilisé par create() pour éviter une seconde lecture du produit
+                data['produit'] = produit
+                data['prix_achat_fcfa'] = produit.prix_achat
             except Produit.DoesNotExist:
                 raise serializers.ValidationError("Produit introuvable")
         
+        verifier_produit_de_la_facture(self.instance, data)
         return data
     
     def create(self, validated_data):
-        produit_id = validated_data.pop('produit_id')
-        produit = Produit.objects.get(id=produit_id)
+        validated_data.pop('produit_id')
+        produit = validated_data.pop('produit')
         # Sauvegarder le prix initial
         validated_data['prix_initial_fcfa'] = validated_data.get('prix_unitaire_fcfa')
         commande = CommandeClient.objects.create(produit=produit, **validated_data)
@@ -159,7 +319,7 @@ class CommandePartenaireSerializer(serializers.ModelSerializer):
                 produit = Produit.objects.get(id=produit_id)
                 prix_achat = produit.prix_achat or 0
                 prix_vente = data.get('prix_unitaire_fcfa', 0)
-                marge_minimale = 5000  # 5000 FCFA
+                marge_minimale = MARGE_MINIMALE
                 
                 if prix_vente < prix_achat + marge_minimale:
                     # Ne pas révéler le prix d'achat dans le message d'erreur
@@ -167,19 +327,36 @@ class CommandePartenaireSerializer(serializers.ModelSerializer):
                         f"Le prix de vente ({prix_vente} FCFA) est trop bas. "
                         f"Le prix minimum requis est {prix_achat + marge_minimale} FCFA."
                     )
+                # Réutilisé par create() pour éviter une seconde lecture du produit
+                data['produit'] = produit
+                data['prix_achat_fcfa'] = produit.prix_achat
             except Produit.DoesNotExist:
                 raise serializers.ValidationError("Produit introuvable")
         
+        verifier_produit_de_la_facture(self.instance, data)
         return data
 
     def create(self, validated_data):
-        produit_id = validated_data.pop('produit_id')
-        produit = Produit.objects.get(id=produit_id)
+        validated_data.pop('produit_id')
+        produit = validated_data.pop('produit')
         # Sauvegarder le prix initial
         validated_data['prix_initial_fcfa'] = validated_data.get('prix_unitaire_fcfa')
         commande = CommandePartenaire.objects.create(produit=produit, **validated_data)
         return commande
 
+# Variantes de lecture des lignes de commande (?produit_format=resume|table)
+class CommandeClientResumeSerializer(CommandeClientSerializer):
+    produit = ProduitResumeSerializer(read_only=True)
+
+class CommandeClientTableSerializer(CommandeClientSerializer):
+    produit = serializers.PrimaryKeyRelatedField(read_only=True)
+
+class CommandePartenaireResumeSerializer(CommandePartenaireSerializer):
+    produit = ProduitResumeSerializer(read_only=True)
+
+class CommandePartenaireTableSerializer(CommandePartenaireSerializer):
+    produit = serializers.PrimaryKeyRelatedField(read_only=True)
+
 class VersementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Versement
@@ -190,6 +367,11 @@ class HistoriqueStockSerializer(serializers.ModelSerializer):
         model = HistoriqueStock
         fields = '__all__'
 
+class VenteJournaliereSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VenteJournaliere
+        fields = '__all__'
+
 class JournalSerializer(serializers.ModelSerializer):
     utilisateur_nom = serializers.SerializerMethodField()
     boutique_nom = serializers.SerializerMethodField()
@@ -199,8 +381,313 @@ class JournalSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('date_operation',)
 
+    # Les relations utilisateur/boutique sont chargées par JournalViewSet.get_queryset
     def get_utilisateur_nom(self, obj):
         return f"{obj.utilisateur.first_name} {obj.utilisateur.last_name}" if obj.utilisateur else obj.utilisateur.username
 
     def get_boutique_nom(self, obj):
-        return obj.boutique.nom if obj.boutique else None
\ No newline at end of file
+        return obj.boutique.nom if obj.boutique else None
+
+# Liste du journal : `details` n'est chargé que sur la fiche (/api/journaux/<id>/)
+class JournalListeSerializer(JournalSerializer):
+    class Meta:
+        model = Journal
+        exclude = ('details',)
+
+class ArchiveJournalSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchiveJournal
+        fields = ('mois', 'nombre', 'premiere_operation', 'derniere_operation', 'updated_at')
+
+class MouvementStockSerializer(serializers.Serializer):
+    variation = serializers.IntegerField()
+    motif = serializers.CharField(max_length=100)
+
+    def validate_variation(self, value):
+        if value == 0:
+            raise serializers.ValidationError("La variation ne peut pas être nulle.")
+        return value
+
+class LigneMouvementStockSerializer(serializers.Serializer):
+    produit_id = serializers.IntegerField()
+    variation = serializers.IntegerField()
+
+class MouvementsStockSerializer(serializers.Serializer):
+    motif = serializers.CharField(max_length=100)
+    mouvements = LigneMouvementStockSerializer(many=True, allow_empty=False)
+
+    def validate_mouvements(self, mouvements):
+        # Plusieurs lignes pour un même produit sont cumulées
+        variations = {}
+        for mouvement in mouvements:
+            variations[mouvement['produit_id']] = variations.get(mouvement['produit_id'], 0) + mouvement['variation']
+        return variations
+
+class LigneCheckoutSerializer(serializers.Serializer):
+    produit_id = serializers.IntegerField()
+    quantite = serializers.IntegerField(min_value=1)
+    prix_unitaire_fcfa = serializers.FloatField()
+    justification_prix = serializers.CharField(required=False, allow_blank=True, default='')
+
+class ClientCheckoutSerializer(serializers.Serializer):
+    nom = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    prenom = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    telephone = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    Vente complète en une requête : facture, lignes, premier versement et sortie de stock.
+    """
+    type = serializers.ChoiceField(choices=Facture.TYPES)
+    nom = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    numero = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    boutique = serializers.PrimaryKeyRelatedField(queryset=Boutique.objects.all())
+    client = ClientCheckoutSerializer(required=False)
+    partenaire = serializers.PrimaryKeyRelatedField(queryset=Partenaire.objects.all(), required=False)
+    lignes = LigneCheckoutSerializer(many=True, allow_empty=False)
+    versement = serializers.FloatField(required=False, min_value=0, default=0)
+
+    def validate(self, data):
+        # Les produits devant appartenir à la boutique de la facture, vérifier celle-ci suffit
+        verifier_boutiques(self.context['request'].user, [data['boutique'].id])
+        if data['type'] == 'partenaire' and not data.get('partenaire'):
+            raise serializers.ValidationError({'partenaire': "Partenaire requis pour une facture partenaire."})
+
+        # Quantités demandées par produit (un même produit peut apparaître sur plusieurs lignes)
+        quantites = {}
+        for ligne in data['lignes']:
+            quantites[ligne['produit_id']] = quantites.get(ligne['produit_id'], 0) + ligne['quantite']
+
+        # Un seul SELECT pour tous les produits de la facture
+        produits = Produit.objects.only('id', 'nom', 'prix_achat', 'quantite', 'boutique_id').in_bulk(quantites.keys())
+
+        erreurs = []
+        for ligne in data['lignes']:
+            produit = produits.get(ligne['produit_id'])
+            if produit is None:
+                erreurs.append(f"Produit {ligne['produit_id']} introuvable")
+                continue
+            if produit.boutique_id != data['boutique'].id:
+                erreurs.append(f"Le produit {produit.nom} n'appartient pas à cette boutique")
+            prix_minimum = (produit.prix_achat or 0) + MARGE_MINIMALE
+            if ligne['prix_unitaire_fcfa'] < prix_minimum:
+                erreurs.append(
+                    f"Le prix de vente de {produit.nom} ({ligne['prix_unitaire_fcfa']} FCFA) est trop bas. "
+                    f"Le prix minimum requis est {prix_minimum} FCFA."
+                )
+        for produit_id, quantite in quantites.items():
+            produit = produits.get(produit_id)
+            if produit is not None and produit.quantite < quantite:
+                erreurs.append(
+                    f"Stock insuffisant pour {produit.nom}: {produit.quantite} disponible(s), {quantite} demandé(s)"
+                )
+        if erreurs:
+            raise serializers.ValidationError({'lignes': erreurs})
+
+        total = sum(ligne['quantite'] * ligne['prix_unitaire_fcfa'] for ligne in data['lignes'])
+        if data['versement'] > total:
+            raise serializers.ValidationError({'versement': "Le versement dépasse le total de la facture."})
+
+        data['total'] = total
+        data['quantites'] = quantites
+        data['produits'] = produits
+        return data
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        lignes = validated_data['lignes']
+        quantites = validated_data['quantites']
+        produits = validated_data['produits']
+        reste = validated_data['total'] - validated_data['versement']
+
+        with transaction.atomic():
+            facture = Facture.objects.create(
+                type=validated_data['type'],
+                nom=validated_data['nom'],
+                numero=validated_data['numero'],
+                total=validated_data['total'],
+                verse=validated_data['versement'],
+                reste=reste,
+                status=soldes.statut(reste),
+                created_by=user,
+                boutique=validated_data['boutique'],
+            )
+
+            if validated_data['type'] == 'client':
+                client = validated_data.get('client', {})
+                CommandeClient.objects.bulk_create([
+                    CommandeClient(
+                        facture=facture,
+                        produit_id=ligne['produit_id'],
+                        quantite=ligne['quantite'],
+                        prix_unitaire_fcfa=ligne['prix_unitaire_fcfa'],
+                        prix_initial_fcfa=ligne['prix_unitaire_fcfa'],
+                        prix_achat_fcfa=produits[ligne['produit_id']].prix_achat,
+                        justification_prix=ligne['justification_prix'],
+                        nom=client.get('nom', ''),
+                        prenom=client.get('prenom', ''),
+                        telephone=client.get('telephone', ''),
+                    )
+                    for ligne in lignes
+                ])
+            else:
+                CommandePartenaire.objects.bulk_create([
+                    CommandePartenaire(
+                        facture=facture,
+                        partenaire=validated_data['partenaire'],
+                        produit_id=ligne['produit_id'],
+                        quantite=ligne['quantite'],
+                        prix_unitaire_fcfa=ligne['prix_unitaire_fcfa'],
+                        prix_initial_fcfa=ligne['prix_unitaire_fcfa'],
+                        prix_achat_fcfa=produits[ligne['produit_id']].prix_achat,
+                        justification_prix=ligne['justification_prix'],
+                    )
+                    for ligne in lignes
+                ])
+
+            # bulk_create ne déclenche pas les signaux : résumé journalier mis à jour en une fois
+            ventes_journalieres.ajuster(
+                facture.boutique_id, ventes_journalieres.jour(facture.created_at), facture.type,
+                quantite_vendue=sum(ligne['quantite'] for ligne in lignes),
+                marge=sum(
+                    (ligne['prix_unitaire_fcfa'] - (produits[ligne['produit_id']].prix_achat or 0)) * ligne['quantite']
+                    for ligne in lignes
+                ),
+            )
+
+            # Sortie de stock en un seul UPDATE F('quantite') - n, avec HistoriqueStock
+            try:
+                stock.appliquer_mouvements(
+                    {produit_id: -quantite for produit_id, quantite in quantites.items()},
+                    f"Facture {facture.numero}",
+                    user,
+                )
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({'lignes': e.detail})
+
+            if validated_data['versement'] > 0:
+                Versement.objects.create(facture=facture, montant=validated_data['versement'])
+
+        return facture
+
+class LigneTransfertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LigneTransfert
+        fields = ['id', 'produit_source', 'produit_destination', 'quantite']
+
+class LigneTransfertEntreeSerializer(serializers.Serializer):
+    produit_id = serializers.IntegerField()
+    quantite = serializers.IntegerField(min_value=1)
+
+class TransfertSerializer(serializers.ModelSerializer):
+    """
+    Transfert de stock entre deux boutiques : sortie à la source, entrée sur le produit
+    de même référence à la destination (créé s'il n'existe pas), le tout en une transaction.
+    """
+    lignes = LigneTransfertSerializer(many=True, read_only=True)
+    mouvements = LigneTransfertEntreeSerializer(many=True, allow_empty=False, write_only=True)
+
+    # Champs recopiés sur le produit créé dans la boutique de destination
+    CHAMPS_COPIES = [
+        'reference', 'category', 'nom', 'description', 'prix_achat', 'prix', 'actif',
+        'marque', 'modele', 'processeur', 'ram', 'stockage', 'systeme_exploitation', 'annee',
+    ]
+
+    class Meta:
+        model = Transfert
+        fields = ['id', 'boutique_source', 'boutique_destination', 'motif', 'created_by', 'created_at',
+                  'lignes', 'mouvements']
+        read_only_fields = ['created_by', 'created_at']
+
+    def validate(self, data):
+        # Sortie de stock : seulement depuis la boutique de l'appelant ; la destination est libre
+        verifier_boutiques(self.context['request'].user, [data['boutique_source'].id])
+        if data['boutique_source'] == data['boutique_destination']:
+            raise serializers.ValidationError(
+                {'boutique_destination': "La boutique de destination doit différer de la source."}
+            )
+
+        quantites = {}
+        for mouvement in data['mouvements']:
+            quantites[mouvement['produit_id']] = quantites.get(mouvement['produit_id'], 0) + mouvement['quantite']
+
+        # Un seul SELECT pour tous les produits transférés
+        produits = Produit.objects.filter(boutique=data['boutique_source']).in_bulk(quantites.keys())
+
+        erreurs = []
+        for produit_id, quantite in quantites.items():
+            produit = produits.get(produit_id)
+            if produit is None:
+                erreurs.append(f"Produit {produit_id} introuvable dans la boutique source")
+            elif not produit.reference:
+                erreurs.append(f"Le produit {produit.nom} n'a pas de référence : impossible de le rapprocher")
+            elif produit.quantite < quantite:
+                erreurs.append(
+                    f"Stock insuffisant pour {produit.nom}: {produit.quantite} disponible(s), {quantite} demandé(s)"
+                )
+        references = [produit.reference for produit in produits.values()]
+        if len(set(references)) != len(references):
+            erreurs.append("Plusieurs produits transférés partagent la même référence")
+        if erreurs:
+            raise serializers.ValidationError({'mouvements': erreurs})
+
+        data['quantites'] = quantites
+        data['produits'] = produits
+        return data
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        source = validated_data['boutique_source']
+        destination = validated_data['boutique_destination']
+        quantites = validated_data['quantites']
+        produits = validated_data['produits']
+
+        with transaction.atomic():
+            transfert = Transfert.objects.create(
+                boutique_source=source,
+                boutique_destination=destination,
+                motif=validated_data.get('motif', ''),
+                created_by=user,
+            )
+
+            # Produits de destination rapprochés par référence en une seule requête
+            correspondances = {}
+            for produit in Produit.objects.filter(
+                boutique=destination, reference__in=[p.reference for p in produits.values()]
+            ).order_by('id'):
+                correspondances.setdefault(produit.reference, produit)
+
+            maintenant = timezone.now()
+            manquants = [
+                Produit(
+                    boutique=destination, quantite=0, created_at=maintenant, updated_at=maintenant,
+                    **{champ: getattr(produit, champ) for champ in self.CHAMPS_COPIES},
+                )
+                for produit in produits.values() if produit.reference not in correspondances
+            ]
+            for produit in Produit.objects.bulk_create(manquants):
+                correspondances[produit.reference] = produit
+
+            # Sortie et entrée dans le même UPDATE : chaque ligne donne deux HistoriqueStock
+            variations = {}
+            for produit_id, quantite in quantites.items():
+                variations[produit_id] = -quantite
+                variations[correspondances[produits[produit_id].reference].id] = quantite
+            try:
+                stock.appliquer_mouvements(
+                    variations, f"Transfert {transfert.id} : {source.nom} -> {destination.nom}", user
+                )
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({'mouvements': e.detail})
+
+            LigneTransfert.objects.bulk_create([
+                LigneTransfert(
+                    transfert=transfert,
+                    produit_source_id=produit_id,
+                    produit_destination=correspondances[produits[produit_id].reference],
+                    quantite=quantite,
+                )
+                for produit_id, quantite in quantites.items()
+            ])
+
+        return transfert
@@ -0,0 +1,120 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Boutique, CommandeClient, CommandePartenaire, Facture, Partenaire, Produit, User, Versement
+from . import authentification, cache_api, synchro, ventes_journalieres as ventes
+
+# Contribution de chaque modèle au résumé VenteJournaliere
+CONTRIBUTIONS = {
+    Facture: ventes.contribution_facture,
+    CommandeClient: ventes.contribution_commande,
+    CommandePartenaire: ventes.contribution_commande,
+    Versement: ventes.contribution_versement,
+}
+
+
+@receiver(pre_save, sender=CommandeClient)
+@receiver(pre_save, sender=CommandePartenaire)
+def figer_prix_achat(sender, instance, raw=False, **kwargs):
+    # Lignes écrites hors serializers (admin, shell) : prix d'achat du produit à la vente
+    if raw or instance.prix_achat_fcfa is not None:
+        return
+    if sender.produit.is_cached(instance):
+        instance.prix_achat_fcfa = instance.produit.prix_achat
+    else:
+        instance.prix_achat_fcfa = (
+            Produit.objects.filter(pk=instance.produit_id).values_list('prix_achat', flat=True).first()
+        )
+
+
+@receiver(pre_save, sender=Facture)
+@receiver(pre_save, sender=CommandeClient)
+@receiver(pre_save, sender=CommandePartenaire)
+@receiver(pre_save, sender=Versement)
+def memoriser_contribution(sender, instance, raw=False, **kwargs):
+    # En modification, on retire l'ancienne contribution avant d'ajouter la nouvelle :
+    # un SELECT de plus par save() d'un objet existant (aucun pour une création)
+    instance._contribution_precedente = None
+    if raw or instance.pk is None:
+        return
+    ancien = sender.objects.filter(pk=instance.pk).first()
+    if ancien is not None:
+        instance._contribution_precedente = CONTRIBUTIONS[sender](ancien)
+
+
+@receiver(post_save, sender=Facture)
+@receiver(post_save, sender=CommandeClient)
+@receiver(post_save, sender=CommandePartenaire)
+@receiver(post_save, sender=Versement)
+def ajouter_contribution(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    precedente = getattr(instance, '_contribution_precedente', None)
+    ventes.appliquer(
+        ventes.inverser(precedente) if precedente else None,
+        CONTRIBUTIONS[sender](instance),
+    )
+
+
+@receiver(post_delete, sender=Facture)
+@receiver(post_delete, sender=CommandeClient)
+@receiver(post_delete, sender=CommandePartenaire)
+@receiver(post_delete, sender=Versement)
+def retirer_contribution(sender, instance, **kwargs):
+    contribution = CONTRIBUTIONS[sender](instance)
+    if contribution is not None:
+        ventes.appliquer(ventes.inverser(contribution))
+
+
+# Cache des lectures (core/cache_api.py) : toute écriture périme les réponses concernées
+@receiver(pre_save, sender=Produit)
+@receiver(pre_save, sender=User)
+def memoriser_boutique(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Changement de boutique : les réponses en cache de l'ancienne boutique sont aussi périmées
+    instance._boutique_precedente = None
+    if raw or instance.pk is None or (update_fields is not None and 'boutique' not in update_fields):
+        return
+    instance._boutique_precedente = (
+        sender.objects.filter(pk=instance.pk).values_list('boutique_id', flat=True).first()
+    )
+
+
+def boutiques_concernees(instance):
+    return {instance.boutique_id, getattr(instance, '_boutique_precedente', None)} - {None}
+
+
+@receiver(post_save, sender=Produit)
+@receiver(post_delete, sender=Produit)
+def invalider_cache_produit(sender, instance, **kwargs):
+    cache_api.invalider('produit', boutiques_concernees(instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalider_cache_utilisateur(sender, instance, **kwargs):
+    cache_api.invalider('user', boutiques_concernees(instance))
+    authentification.oublier(instance.pk)
+
+
+@receiver(post_save, sender=Boutique)
+@receiver(post_delete, sender=Boutique)
+def invalider_cache_boutique(sender, instance, **kwargs):
+    cache_api.invalider('boutique')
+    # Les utilisateurs en cache portent leur boutique
+    authentification.oublier()
+
+
+@receiver(post_save, sender=Partenaire)
+@receiver(post_delete, sender=Partenaire)
+def invalider_cache_partenaire(sender, instance, **kwargs):
+    cache_api.invalider('partenaire')
+
+
+# Synchronisation incrémentale (core/synchro.py) : trace des suppressions
+@receiver(post_delete, sender=Produit)
+@receiver(post_delete, sender=Facture)
+@receiver(post_delete, sender=CommandeClient)
+@receiver(post_delete, sender=CommandePartenaire)
+@receiver(post_delete, sender=Versement)
+def tracer_suppression(sender, instance, **kwargs):
+    synchro.tracer_suppression(instance)
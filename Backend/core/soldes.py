@@ -0,0 +1,86 @@
+"""
+Solde des factures : `verse`, `reste` et `status` tenus à jour côté serveur.
+
+Un versement ajoute son montant à `verse` et le retire de `reste` par un seul
+UPDATE avec F() : deux versements simultanés sur la même facture ne
+s'écrasent pas, et le statut est calculé dans la même requête à partir du
+reste lu par la base. Cet UPDATE ne passe pas par save() : `updated_at`
+(ETag, ?since=) et le résumé VenteJournaliere (encaissé et reste au jour de
+la facture) sont ajustés ici.
+
+`reconcilier` (manage.py reconcilier_factures) recalcule les trois champs
+depuis les versements enregistrés.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from . import ventes_journalieres
+from .models import Facture, Versement
+
+PAYE = 'payé'
+EN_COURS = 'encours'
+
+TAILLE_LOT = 500
+
+
+def statut(reste):
+    return PAYE if reste <= 0 else EN_COURS
+
+
+def appliquer_versement(facture, montant):
+    """
+    Reporte `montant` (négatif pour une annulation) sur `facture`, puis
+    recharge ses champs de solde.
+    """
+    if not montant:
+        return
+    Facture.objects.filter(pk=facture.pk).update(
+        verse=F('verse') + montant,
+        reste=F('reste') - montant,
+        # Le CASE lit le reste d'avant la mise à jour
+        status=Case(When(reste__lte=montant, then=Value(PAYE)), default=Value(EN_COURS)),
+        updated_at=Now(),
+    )
+    facture.refresh_from_db(fields=['verse', 'reste', 'status', 'updated_at'])
+    ventes_journalieres.ajuster(
+        facture.boutique_id, ventes_journalieres.jour(facture.created_at), facture.type,
+        encaisse=montant, reste=-montant,
+    )
+
+
+def reconcilier(simulation=False, boutique=None):
+    """
+    Recalcule verse (somme des versements), reste et status des factures qui
+    s'en écartent et renvoie le nombre de factures corrigées. Une facture sans
+    aucun versement garde son reste, payé hors versement à la création.
+    """
+    sommes = Versement.objects.filter(facture=OuterRef('pk')).order_by().values('facture')
+    factures = Facture.objects.annotate(
+        nombre_versements=Coalesce(Subquery(sommes.annotate(n=Count('id')).values('n')), 0),
+        somme_versements=Coalesce(Subquery(sommes.annotate(s=Sum('montant')).values('s')), Value(0.0)),
+    ).only('id', 'boutique_id', 'created_at', 'type', 'total', 'verse', 'reste', 'status')
+    if boutique:
+        factures = factures.filter(boutique_id=boutique)
+
+    corrigees, contributions = [], []
+    maintenant = timezone.now()
+    for facture in factures.iterator(chunk_size=TAILLE_LOT):
+        verse = facture.somme_versements if facture.nombre_versements else facture.total - facture.reste
+        reste = facture.total - verse
+        if (facture.verse, facture.reste, facture.status) == (verse, reste, statut(reste)):
+            continue
+        contributions.append((
+            (facture.boutique_id, ventes_journalieres.jour(facture.created_at), facture.type),
+            {'encaisse': facture.reste - reste, 'reste': reste - facture.reste},
+        ))
+        facture.verse, facture.reste, facture.status = verse, reste, statut(reste)
+        facture.updated_at = maintenant
+        corrigees.append(facture)
+
+    if not simulation:
+        with transaction.atomic():
+            Facture.objects.bulk_update(corrigees, ['verse', 'reste', 'status', 'updated_at'], batch_size=TAILLE_LOT)
+            ventes_journalieres.appliquer_cumul(contributions)
+    return len(corrigees)
@@ -0,0 +1,57 @@
+"""
+Mouvements de stock appliqués par la base : variations en F('quantite') + n, refus
+du stock négatif et écriture de HistoriqueStock dans la même transaction.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import cache_api
+from .models import HistoriqueStock, Produit
+
+
+def appliquer_mouvements(variations, motif, user=None):
+    """
+    Applique `variations` ({produit_id: variation}) en un seul UPDATE et renvoie
+    les nouvelles quantités {produit_id: quantite}. Lève ValidationError si un
+    produit est introuvable ou si un stock deviendrait négatif : rien n'est alors modifié.
+    """
+    variations = {produit_id: variation for produit_id, variation in variations.items() if variation}
+    if not variations:
+        return {}
+
+    with transaction.atomic():
+        produits = Produit.objects.filter(id__in=variations.keys())
+        if connection.features.has_select_for_update:
+            # Verrous pris dans l'ordre des id : deux mouvements multi-produits ne s'interbloquent pas
+            list(produits.select_for_update().order_by('id').values_list('id', flat=True))
+
+        modifies = produits.update(
+            quantite=Case(
+                *[When(id=produit_id, then=F('quantite') + variation) for produit_id, variation in variations.items()]
+            ),
+            # Sans save() : updated_at tenu à jour pour les requêtes conditionnelles
+            updated_at=timezone.now(),
+        )
+        if modifies != len(variations):
+            existants = set(produits.values_list('id', flat=True))
+            raise serializers.ValidationError(
+                [f"Produit {produit_id} introuvable" for produit_id in variations if produit_id not in existants]
+            )
+
+        lignes = list(produits.values_list('id', 'quantite', 'boutique_id'))
+        quantites = {produit_id: quantite for produit_id, quantite, _ in lignes}
+        en_rupture = [produit_id for produit_id, quantite in quantites.items() if quantite < 0]
+        if en_rupture:
+            noms = Produit.objects.filter(id__in=en_rupture).values_list('nom', flat=True)
+            # L'exception annule l'UPDATE ci-dessus
+            raise serializers.ValidationError([f"Stock insuffisant pour {nom}" for nom in noms])
+
+        HistoriqueStock.objects.bulk_create([
+            HistoriqueStock(produit_id=produit_id, variation=variation, motif=motif[:100], user=user)
+            for produit_id, variation in variations.items()
+        ])
+        # L'UPDATE ne passe pas par les signaux
+        cache_api.invalider('produit', {boutique_id for _, _, boutique_id in lignes})
+    return quantites
@@ -0,0 +1,67 @@
+"""
+Synchronisation incrémentale : « qu'est-ce qui a changé depuis T ? ».
+
+Les objets créés ou modifiés sont retrouvés par `updated_at` ; les suppressions
+sont tracées dans `Suppression` (modèle, id, boutique, date) par un signal
+post_delete. Le client applique d'abord les suppressions puis les
+modifications, et rappelle avec ?since= égal au `jusqu_a` reçu.
+
+La fenêtre interrogée commence MARGE_SECONDES avant ?since= : une transaction
+validée juste après la lecture précédente n'est pas perdue, au prix de
+quelques objets renvoyés deux fois (sans effet côté client). Les suppressions
+sont conservées RETENTION_SUPPRESSIONS_JOURS jours ; au-delà, le client doit
+tout recharger.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CommandeClient, CommandePartenaire, Facture, Produit, Suppression, Versement
+from .ventes_journalieres import facture_de
+
+CONFIGURATION_PAR_DEFAUT = {
+    'RETENTION_SUPPRESSIONS_JOURS': 30,
+    'MARGE_SECONDES': 5,
+}
+
+# Modèles suivis et leur nom dans Suppression
+MODELES = {
+    Produit: 'produit',
+    Facture: 'facture',
+    CommandeClient: 'commande_client',
+    CommandePartenaire: 'commande_partenaire',
+    Versement: 'versement',
+}
+
+
+def configuration():
+    return {**CONFIGURATION_PAR_DEFAUT, **getattr(settings, 'SYNCHRO', {})}
+
+
+def horizon():
+    # Date avant laquelle les suppressions ne sont plus garanties
+    return timezone.now() - timedelta(days=configuration()['RETENTION_SUPPRESSIONS_JOURS'])
+
+
+def debut_fenetre(depuis):
+    return depuis - timedelta(seconds=configuration()['MARGE_SECONDES'])
+
+
+def boutique_de(instance):
+    if hasattr(instance, 'boutique_id'):
+        return instance.boutique_id
+    facture = facture_de(instance)
+    return facture.boutique_id if facture is not None else None
+
+
+def tracer_suppression(instance):
+    Suppression.objects.create(
+        modele=MODELES[type(instance)],
+        objet_id=instance.pk,
+        boutique_id=boutique_de(instance),
+    )
+
+
+def purger(avant=None):
+    return Suppression.objects.filter(date__lt=avant or horizon()).delete()[0]
@@ -1,3 +1,1744 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archives_journal, authentification, cache_api, export, journal, profilage, soldes, stock, ventes_journalieres
+from .models import *
+from .serializers import CheckoutSerializer
+from .views import debut_journee
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class NombreRequetesTests(TestCase):
+    """
+    Le nombre de requêtes SQL d'une liste ne doit pas dépendre du nombre de lignes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.partenaire = Partenaire.objects.create(nom='Partenaire')
+        cls.facture = Facture.objects.create(
+            type='client', total=0, reste=0, created_by=cls.admin, boutique=cls.boutique
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def creer_lignes(self, nombre):
+        for i in range(nombre):
+            produit = Produit.objects.create(
+                nom=f'Produit {i}', reference=f'REF{i}', quantite=10,
+                prix_achat=10000, prix=20000, boutique=self.boutique
+            )
+            CommandeClient.objects.create(
+                facture=self.facture, produit=produit, quantite=1, prix_unitaire_fcfa=20000
+            )
+            CommandePartenaire.objects.create(
+                facture=self.facture, partenaire=self.partenaire, produit=produit,
+                quantite=1, prix_unitaire_fcfa=20000
+            )
+            Journal.objects.create(
+                utilisateur=self.admin, boutique=self.boutique,
+                type_operation='creation', description=f'Entrée {i}'
+            )
+
+    def nombre_requetes(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(requetes)
+
+    def assertNombreRequetesConstant(self, url):
+        self.creer_lignes(2)
+        peu = self.nombre_requetes(url)
+        self.creer_lignes(20)
+        beaucoup = self.nombre_requetes(url)
+        self.assertEqual(peu, beaucoup)
+        return beaucoup
+
+    def test_liste_commandes_client(self):
+        self.assertEqual(self.assertNombreRequetesConstant('/api/commandes-client/?page_size=50'), 1)
+
+    def test_liste_commandes_partenaire(self):
+        self.assertEqual(self.assertNombreRequetesConstant('/api/commandes-partenaire/?page_size=50'), 1)
+
+    def test_liste_journal(self):
+        self.assertEqual(self.assertNombreRequetesConstant('/api/journaux/?page_size=50'), 1)
+
+    def test_creation_commande_client_lit_le_produit_une_fois(self):
+        produit = Produit.objects.create(
+            nom='Produit', reference='REF', quantite=10, prix_achat=10000, prix=20000, boutique=self.boutique
+        )
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.post('/api/commandes-client/', {
+                'facture': self.facture.id, 'produit_id': produit.id,
+                'quantite': 1, 'prix_unitaire_fcfa': 20000,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        lectures_produit = [
+            requete for requete in requetes.captured_queries
+            if requete['sql'].startswith('SELECT') and 'FROM "core_produit"' in requete['sql']
+        ]
+        self.assertEqual(len(lectures_produit), 1)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class ProduitFormatTests(TestCase):
+    """
+    ?produit_format= sur les lignes de commande : champs du produit renvoyés et
+    nombre de requêtes indépendant du nombre de lignes.
+    """
+
+    CHAMPS_RESUME = {'id', 'nom', 'reference', 'prix_achat'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.partenaire = Partenaire.objects.create(nom='Partenaire')
+        cls.facture = Facture.objects.create(
+            type='client', total=0, reste=0, created_by=cls.admin, boutique=cls.boutique
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def creer_lignes(self, nombre):
+        for i in range(nombre):
+            produit = Produit.objects.create(
+                nom=f'Produit {i}', reference=f'REF{i}', quantite=10,
+                prix_achat=10000, prix=20000, boutique=self.boutique
+            )
+            CommandeClient.objects.create(
+                facture=self.facture, produit=produit, quantite=1, prix_unitaire_fcfa=20000
+            )
+            CommandePartenaire.objects.create(
+                facture=self.facture, partenaire=self.partenaire, produit=produit,
+                quantite=1, prix_unitaire_fcfa=20000
+            )
+
+    def lire(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(requetes)
+
+    def assertNombreRequetesConstant(self, url):
+        self.creer_lignes(2)
+        _, peu = self.lire(url)
+        self.creer_lignes(20)
+        donnees, beaucoup = self.lire(url)
+        self.assertEqual(peu, beaucoup)
+        self.assertEqual(len(donnees['results']), 22)
+        return donnees, beaucoup
+
+    def test_complet_par_defaut(self):
+        for url in ('/api/commandes-client/', '/api/commandes-partenaire/'):
+            with self.subTest(url=url):
+                donnees, nombre = self.assertNombreRequetesConstant(url)
+                self.assertEqual(nombre, 1)
+                produit = donnees['results'][0]['produit']
+                self.assertTrue(self.CHAMPS_RESUME < set(produit))
+                self.assertIn('quantite', produit)
+                self.assertNotIn('produits', donnees)
+                CommandeClient.objects.all().delete()
+                CommandePartenaire.objects.all().delete()
+
+    def test_resume(self):
+        for url in ('/api/commandes-client/', '/api/commandes-partenaire/'):
+            with self.subTest(url=url):
+                donnees, nombre = self.assertNombreRequetesConstant(url + '?produit_format=resume')
+                self.assertEqual(nombre, 1)
+                for ligne in donnees['results']:
+                    self.assertEqual(set(ligne['produit']), self.CHAMPS_RESUME)
+                self.assertNotIn('produits', donnees)
+                CommandeClient.objects.all().delete()
+                CommandePartenaire.objects.all().delete()
+
+    def test_resume_ne_lit_que_les_colonnes_utiles(self):
+        self.creer_lignes(1)
+        with CaptureQueriesContext(connection) as requetes:
+            self.client.get('/api/commandes-client/?produit_format=resume')
+        sql = requetes.captured_queries[0]['sql']
+        self.assertIn('"core_produit"."nom"', sql)
+        self.assertNotIn('"core_produit"."description"', sql)
+
+    def test_table(self):
+        for url in ('/api/commandes-client/', '/api/commandes-partenaire/'):
+            with self.subTest(url=url):
+                donnees, nombre = self.assertNombreRequetesConstant(url + '?produit_format=table')
+                # Une requête pour les lignes, une pour la table des produits
+                self.assertEqual(nombre, 2)
+                ids = {ligne['produit'] for ligne in donnees['results']}
+                self.assertTrue(all(isinstance(id_produit, int) for id_produit in ids))
+                self.assertEqual(set(donnees['produits']), ids)
+                for id_produit, produit in donnees['produits'].items():
+                    self.assertEqual(set(produit), self.CHAMPS_RESUME)
+                    self.assertEqual(produit['id'], id_produit)
+                CommandeClient.objects.all().delete()
+                CommandePartenaire.objects.all().delete()
+
+    def test_format_inconnu(self):
+        self.creer_lignes(1)
+        donnees, _ = self.lire('/api/commandes-client/?produit_format=xml')
+        self.assertIn('quantite', donnees['results'][0]['produit'])
+        self.assertNotIn('produits', donnees)
+
+    def test_ecriture_toujours_complete(self):
+        produit = Produit.objects.create(
+            nom='Produit', reference='REF', quantite=10, prix_achat=10000, prix=20000, boutique=self.boutique
+        )
+        response = self.client.post('/api/commandes-client/?produit_format=table', {
+            'facture': self.facture.id, 'produit_id': produit.id,
+            'quantite': 1, 'prix_unitaire_fcfa': 20000,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['produit']['id'], produit.id)
+        self.assertIn('quantite', response.data['produit'])
+        self.assertNotIn('produits', response.data)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class PerimetreBoutiqueTests(TestCase):
+    """
+    Un admin ne lit ni n'écrit hors de sa boutique ; le superadmin voit tout.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique 1', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Boutique 2', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.superadmin = User.objects.create_user('super', password='secret', role='superadmin')
+        cls.produit = Produit.objects.create(
+            nom='Téléphone', reference='TEL', quantite=10, prix_achat=10000, prix=20000, boutique=cls.boutique
+        )
+        cls.produit_autre = Produit.objects.create(
+            nom='Ordinateur', reference='PC', quantite=10, prix_achat=10000, prix=20000, boutique=cls.autre
+        )
+        cls.facture_autre = Facture.objects.create(
+            type='client', total=20000, reste=20000, created_by=cls.superadmin, boutique=cls.autre
+        )
+        CommandeClient.objects.create(
+            facture=cls.facture_autre, produit=cls.produit_autre, quantite=1, prix_unitaire_fcfa=20000
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {objet['id'] for objet in response.json()['results']}
+
+    def test_listes_limitees_a_la_boutique(self):
+        self.assertEqual(self.ids('/api/produits/'), {self.produit.id})
+        self.assertEqual(self.ids('/api/factures/'), set())
+        self.assertEqual(self.ids('/api/commandes-client/'), set())
+        self.assertEqual(self.client.get(f'/api/produits/{self.produit_autre.id}/').status_code, 404)
+
+    def test_superadmin_voit_tout_ou_une_boutique(self):
+        self.client.force_authenticate(self.superadmin)
+        self.assertEqual(self.ids('/api/produits/'), {self.produit.id, self.produit_autre.id})
+        self.assertEqual(self.ids(f'/api/produits/?boutique={self.autre.id}'), {self.produit_autre.id})
+        self.assertEqual(len(self.ids(f'/api/commandes-client/?boutique={self.autre.id}')), 1)
+
+    def test_creation_hors_boutique_refusee(self):
+        produit = {
+            'nom': 'Souris', 'reference': 'SOU', 'category': 'souris', 'quantite': 1,
+            'prix_achat': 1000, 'prix': 7000, 'boutique': self.autre.id,
+        }
+        self.assertEqual(self.client.post('/api/produits/', produit, format='json').status_code, 403)
+        self.assertEqual(self.client.post('/api/produits/bulk/', [produit], format='json').status_code, 403)
+        self.assertFalse(Produit.objects.filter(reference='SOU').exists())
+
+        response = self.client.post('/api/versements/', {'facture': self.facture_autre.id, 'montant': 1000}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_deplacement_hors_boutique_refuse(self):
+        response = self.client.patch(
+            '/api/produits/bulk/', [{'id': self.produit.id, 'boutique': self.autre.id}], format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.produit.refresh_from_db()
+        self.assertEqual(self.produit.boutique_id, self.boutique.id)
+
+    def test_checkout_hors_boutique_refuse(self):
+        response = self.client.post('/api/checkout/', {
+            'type': 'client', 'boutique': self.autre.id,
+            'lignes': [{'produit_id': self.produit_autre.id, 'quantite': 1, 'prix_unitaire_fcfa': 20000}],
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Facture.objects.count(), 1)
+
+    def test_mouvements_hors_boutique_refuses(self):
+        response = self.client.post('/api/produits/mouvements/', {
+            'motif': 'Inventaire',
+            'mouvements': [
+                {'produit_id': self.produit.id, 'variation': -1},
+                {'produit_id': self.produit_autre.id, 'variation': -1},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.produit.refresh_from_db()
+        self.produit_autre.refresh_from_db()
+        self.assertEqual((self.produit.quantite, self.produit_autre.quantite), (10, 10))
+
+    def test_transfert_depuis_autre_boutique_refuse(self):
+        response = self.client.post('/api/transferts/', {
+            'boutique_source': self.autre.id, 'boutique_destination': self.boutique.id,
+            'mouvements': [{'produit_id': self.produit_autre.id, 'quantite': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.produit_autre.refresh_from_db()
+        self.assertEqual(self.produit_autre.quantite, 10)
+
+    def test_ligne_avec_produit_d_une_autre_boutique_refusee(self):
+        facture = Facture.objects.create(
+            type='client', total=0, reste=0, created_by=self.admin, boutique=self.boutique
+        )
+        partenaire = Partenaire.objects.create(nom='Partenaire')
+        for url, ligne in (
+            ('/api/commandes-client/', {}),
+            ('/api/commandes-partenaire/', {'partenaire': partenaire.id}),
+        ):
+            response = self.client.post(url, {
+                'facture': facture.id, 'produit_id': self.produit_autre.id, 'quantite': 1,
+                'prix_unitaire_fcfa': 20000, **ligne,
+            }, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('produit_id', response.json())
+        self.assertFalse(CommandeClient.objects.filter(facture=facture).exists())
+        self.assertFalse(CommandePartenaire.objects.exists())
+
+        ligne = CommandeClient.objects.create(
+            facture=facture, produit=self.produit, quantite=1, prix_unitaire_fcfa=20000
+        )
+        response = self.client.patch(
+            f'/api/commandes-client/{ligne.id}/',
+            {'produit_id': self.produit_autre.id, 'prix_unitaire_fcfa': 20000}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('produit_id', response.json())
+        ligne.refresh_from_db()
+        self.assertEqual(ligne.produit_id, self.produit.id)
+
+    def test_import_hors_boutique_refuse(self):
+        fichier = SimpleUploadedFile(
+            'catalogue.csv', f'reference;nom;category;quantite;prix_achat;prix;boutique\n'
+                             f'SOU;Souris;souris;1;1000;7000;{self.autre.id}\n'.encode()
+        )
+        response = self.client.post('/api/produits/import/', {'fichier': fichier}, format='multipart')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Produit.objects.filter(reference='SOU').exists())
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class SoldeFactureTests(TestCase):
+    """
+    verse, reste et status suivent les versements et les corrections de la facture.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.facture = Facture.objects.create(
+            type='client', total=100000, reste=100000, status=soldes.EN_COURS,
+            created_by=self.admin, boutique=self.boutique
+        )
+
+    def solde(self):
+        self.facture.refresh_from_db()
+        return self.facture.verse, self.facture.reste, self.facture.status
+
+    def encaisse_du_jour(self):
+        return VenteJournaliere.objects.get(boutique=self.boutique, type='client').encaisse
+
+    def test_versement_cree_modifie_supprime(self):
+        response = self.client.post('/api/versements/', {'facture': self.facture.id, 'montant': 40000}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.solde(), (40000, 60000, soldes.EN_COURS))
+        self.assertEqual(self.encaisse_du_jour(), 40000)
+
+        versement = response.json()['id']
+        self.client.patch(f'/api/versements/{versement}/', {'montant': 100000}, format='json')
+        self.assertEqual(self.solde(), (100000, 0, soldes.PAYE))
+
+        self.client.delete(f'/api/versements/{versement}/')
+        self.assertEqual(self.solde(), (0, 100000, soldes.EN_COURS))
+        self.assertEqual(self.encaisse_du_jour(), 0)
+
+    def test_nouveau_total_garde_les_versements(self):
+        self.client.post('/api/versements/', {'facture': self.facture.id, 'montant': 40000}, format='json')
+        response = self.client.patch(f'/api/factures/{self.facture.id}/', {'total': 120000}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.solde(), (40000, 80000, soldes.EN_COURS))
+
+        self.client.patch(f'/api/factures/{self.facture.id}/', {'total': 40000}, format='json')
+        self.assertEqual(self.solde(), (40000, 0, soldes.PAYE))
+
+    def test_reste_saisi_donne_le_verse(self):
+        self.client.patch(f'/api/factures/{self.facture.id}/', {'reste': 25000}, format='json')
+        self.assertEqual(self.solde(), (75000, 25000, soldes.EN_COURS))
+
+        response = self.client.post('/api/factures/', {
+            'type': 'client', 'total': 50000, 'reste': 0, 'boutique': self.boutique.id, 'created_by': self.admin.id,
+        }, format='json')
+        facture = Facture.objects.get(id=response.json()['id'])
+        self.assertEqual((facture.verse, facture.reste, facture.status), (50000, 0, soldes.PAYE))
+
+    def test_reconcilier(self):
+        Versement.objects.create(facture=self.facture, montant=30000)
+        Versement.objects.create(facture=self.facture, montant=20000)
+        sans_versement = Facture.objects.create(
+            type='client', total=10000, reste=4000, status=soldes.EN_COURS,
+            created_by=self.admin, boutique=self.boutique
+        )
+
+        self.assertEqual(soldes.reconcilier(simulation=True), 2)
+        self.assertEqual(self.solde(), (0, 100000, soldes.EN_COURS))
+
+        self.assertEqual(soldes.reconcilier(), 2)
+        self.assertEqual(self.solde(), (50000, 50000, soldes.EN_COURS))
+        sans_versement.refresh_from_db()
+        self.assertEqual((sans_versement.verse, sans_versement.reste), (6000, 4000))
+        self.assertEqual(soldes.reconcilier(), 0)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class RequetesConditionnellesTests(TestCase):
+    """
+    Une liste inchangée répond 304 ; toute création, modification ou suppression change l'ETag.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.factures = [
+            Facture.objects.create(type='client', total=1000, reste=0, created_by=self.admin, boutique=self.boutique)
+            for _ in range(2)
+        ]
+        self.produit = Produit.objects.create(
+            nom='Souris', reference='SOU', quantite=1, prix_achat=1000, prix=7000, boutique=self.boutique
+        )
+
+    def revalider(self, url):
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        return response['ETag'], lambda: self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code
+
+    def test_suppression_change_l_etag(self):
+        _, statut = self.revalider('/api/factures/')
+        self.assertEqual(statut(), 304)
+        self.factures[0].delete()
+        self.assertEqual(statut(), 200)
+
+    def test_modification_change_l_etag(self):
+        _, statut = self.revalider('/api/factures/')
+        self.factures[1].save()
+        self.assertEqual(statut(), 200)
+
+    def test_liste_versionnee_sans_requete(self):
+        _, statut = self.revalider('/api/produits/')
+        with self.assertNumQueries(0):
+            self.assertEqual(statut(), 304)
+        self.produit.delete()
+        self.assertEqual(statut(), 200)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class SynchronisationTests(TestCase):
+    """
+    /changements/?since= : modifiés et supprimés depuis une date, dans le périmètre de l'appelant.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.sans_boutique = User.objects.create_user('admin2', password='secret', role='admin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.depuis = timezone.now().isoformat()
+        Produit.objects.create(
+            nom='Souris', reference='SOU', quantite=1, prix_achat=1000, prix=7000, boutique=self.boutique
+        ).delete()
+
+    def changements(self, since):
+        return self.client.get('/api/produits/changements/', {'since': since})
+
+    def test_supprimes_de_la_boutique(self):
+        response = self.changements(self.depuis)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['supprimes']), 1)
+
+    def test_date_invalide(self):
+        self.assertEqual(self.changements('2026-13-01T00:00:00').status_code, 400)
+        self.assertEqual(self.changements('hier').status_code, 400)
+
+    def test_utilisateur_sans_boutique(self):
+        self.client.force_authenticate(self.sans_boutique)
+        response = self.changements(self.depuis)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['supprimes'], response.json()['modifies']), ([], []))
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class CheckoutTests(TestCase):
+    """
+    /api/checkout/ : facture, lignes, versement et sortie de stock réussissent ou échouent ensemble.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.telephone = Produit.objects.create(
+            nom='Téléphone', reference='TEL', quantite=5, prix_achat=10000, prix=20000, boutique=self.boutique
+        )
+        self.chargeur = Produit.objects.create(
+            nom='Chargeur', reference='CHA', quantite=5, prix_achat=1000, prix=7000, boutique=self.boutique
+        )
+
+    def vendre(self, quantite_telephone, versement=0):
+        return self.client.post('/api/checkout/', {
+            'type': 'client', 'numero': 'F001', 'boutique': self.boutique.id, 'versement': versement,
+            'lignes': [
+                {'produit_id': self.telephone.id, 'quantite': quantite_telephone, 'prix_unitaire_fcfa': 20000},
+                {'produit_id': self.chargeur.id, 'quantite': 1, 'prix_unitaire_fcfa': 7000},
+            ],
+        }, format='json')
+
+    def quantites(self):
+        return list(Produit.objects.order_by('id').values_list('quantite', flat=True))
+
+    def assertRienEcrit(self):
+        self.assertEqual(self.quantites(), [5, 5])
+        self.assertFalse(Facture.objects.exists())
+        self.assertFalse(CommandeClient.objects.exists())
+        self.assertFalse(Versement.objects.exists())
+        self.assertFalse(HistoriqueStock.objects.exists())
+        self.assertFalse(VenteJournaliere.objects.filter(quantite_vendue__gt=0).exists())
+
+    def test_vente_complete(self):
+        response = self.vendre(2, versement=20000)
+        self.assertEqual(response.status_code, 201)
+        facture = Facture.objects.get()
+        self.assertEqual((facture.total, facture.verse, facture.reste), (47000, 20000, 27000))
+        self.assertEqual(CommandeClient.objects.filter(facture=facture).count(), 2)
+        self.assertEqual(Versement.objects.get().montant, 20000)
+        self.assertEqual(self.quantites(), [3, 4])
+        self.assertEqual(HistoriqueStock.objects.count(), 2)
+        vente = VenteJournaliere.objects.get(boutique=self.boutique, type='client')
+        self.assertEqual((vente.quantite_vendue, vente.marge), (3, 26000))
+
+    def test_stock_insuffisant(self):
+        response = self.vendre(6)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lignes', response.json())
+        self.assertRienEcrit()
+
+    def test_survente_concurrente_annule_la_facture(self):
+        # Une autre vente vide le stock entre la validation et l'écriture
+        validate = CheckoutSerializer.validate
+
+        def validate_puis_vente_concurrente(serializer, data):
+            data = validate(serializer, data)
+            Produit.objects.filter(id=self.chargeur.id).update(quantite=0)
+            return data
+
+        with mock.patch.object(CheckoutSerializer, 'validate', validate_puis_vente_concurrente):
+            response = self.vendre(2, versement=20000)
+        self.assertEqual(response.status_code, 400)
+        Produit.objects.filter(id=self.chargeur.id).update(quantite=5)
+        self.assertRienEcrit()
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class VentesJournalieresTests(TestCase):
+    """
+    Le résumé tenu à jour à chaque écriture égale celui recalculé par reconstruire_ventes_journalieres.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.partenaire = Partenaire.objects.create(nom='Partenaire')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produit = Produit.objects.create(
+            nom='Téléphone', reference='TEL', quantite=50, prix_achat=10000, prix=20000, boutique=self.boutique
+        )
+
+    def resume(self):
+        return list(VenteJournaliere.objects.order_by('boutique', 'date', 'type').values(
+            'boutique', 'date', 'type', *ventes_journalieres.CHAMPS
+        ))
+
+    def assertResumeReconstruit(self):
+        incremental = self.resume()
+        call_command('reconstruire_ventes_journalieres', stdout=StringIO())
+        self.assertEqual(incremental, self.resume())
+        return incremental
+
+    def facture(self, type='client'):
+        response = self.client.post('/api/factures/', {
+            'type': type, 'total': 60000, 'reste': 60000, 'boutique': self.boutique.id, 'created_by': self.admin.id,
+        }, format='json')
+        return response.json()['id']
+
+    def test_ecritures_unitaires(self):
+        facture = self.facture()
+        ligne = self.client.post('/api/commandes-client/', {
+            'facture': facture, 'produit_id': self.produit.id, 'quantite': 2, 'prix_unitaire_fcfa': 20000,
+        }, format='json').json()['id']
+        autre = self.client.post('/api/commandes-client/', {
+            'facture': facture, 'produit_id': self.produit.id, 'quantite': 1, 'prix_unitaire_fcfa': 20000,
+        }, format='json').json()['id']
+        self.client.post('/api/versements/', {'facture': facture, 'montant': 25000}, format='json')
+        self.client.patch(f'/api/commandes-client/{ligne}/', {'quantite': 3}, format='json')
+        self.client.delete(f'/api/commandes-client/{autre}/')
+
+        facture_partenaire = self.facture('partenaire')
+        self.client.post('/api/commandes-partenaire/', {
+            'facture': facture_partenaire, 'partenaire': self.partenaire.id, 'produit_id': self.produit.id,
+            'quantite': 1, 'prix_unitaire_fcfa': 18000,
+        }, format='json')
+
+        client, partenaire = self.assertResumeReconstruit()
+        self.assertEqual((client['quantite_vendue'], client['marge'], client['versements']), (3, 30000, 25000))
+        self.assertEqual((client['encaisse'], client['reste']), (25000, 35000))
+        self.assertEqual((partenaire['quantite_vendue'], partenaire['marge']), (1, 8000))
+
+    def test_checkout(self):
+        self.client.post('/api/checkout/', {
+            'type': 'client', 'boutique': self.boutique.id, 'versement': 10000,
+            'lignes': [{'produit_id': self.produit.id, 'quantite': 2, 'prix_unitaire_fcfa': 20000}],
+        }, format='json')
+        resume, = self.assertResumeReconstruit()
+        self.assertEqual((resume['nombre_factures'], resume['quantite_vendue'], resume['marge']), (1, 2, 20000))
+
+    def test_marge_au_prix_d_achat_de_la_vente(self):
+        facture = self.facture()
+        ligne = self.client.post('/api/commandes-client/', {
+            'facture': facture, 'produit_id': self.produit.id, 'quantite': 2, 'prix_unitaire_fcfa': 20000,
+        }, format='json').json()['id']
+
+        # Le produit est ensuite racheté plus cher : la marge déjà réalisée ne change pas
+        self.produit.prix_achat = 14000
+        self.produit.save()
+        self.client.patch(f'/api/commandes-client/{ligne}/', {'quantite': 1}, format='json')
+        resume, = self.assertResumeReconstruit()
+        self.assertEqual(resume['marge'], 10000)
+
+    def test_historique_rempli_par_la_migration(self):
+        self.client.post('/api/checkout/', {
+            'type': 'client', 'boutique': self.boutique.id, 'versement': 10000,
+            'lignes': [{'produit_id': self.produit.id, 'quantite': 2, 'prix_unitaire_fcfa': 20000}],
+        }, format='json')
+        attendu = self.resume()
+        # Factures antérieures à la table : résumé vide jusqu'à la migration 0025
+        VenteJournaliere.objects.all().delete()
+        etat = MigrationExecutor(connection).loader.project_state(('core', '0025_ventejournaliere_historique'))
+        importlib.import_module('core.migrations.0025_ventejournaliere_historique').remplir(etat.apps, None)
+        self.assertEqual(self.resume(), attendu)
+
+        autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        self.assertEqual(ventes_journalieres.reconstruire(autre.id), 0)
+        self.assertEqual(self.resume(), attendu)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class MouvementsStockTests(TestCase):
+    """
+    Les mouvements de stock passent par la base et ne laissent jamais un stock négatif.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produits = [
+            Produit.objects.create(
+                nom=f'Produit {i}', reference=f'REF{i}', quantite=3, prix_achat=1000, prix=7000, boutique=self.boutique
+            )
+            for i in range(2)
+        ]
+
+    def quantites(self):
+        return list(Produit.objects.order_by('id').values_list('quantite', flat=True))
+
+    def test_variations_appliquees_et_historisees(self):
+        premier, second = self.produits
+        quantites = stock.appliquer_mouvements({premier.id: -3, second.id: 4}, 'Inventaire', self.admin)
+        self.assertEqual(quantites, {premier.id: 0, second.id: 7})
+        self.assertEqual(self.quantites(), [0, 7])
+        self.assertEqual(
+            sorted(HistoriqueStock.objects.values_list('produit_id', 'variation', 'motif')),
+            [(premier.id, -3, 'Inventaire'), (second.id, 4, 'Inventaire')],
+        )
+
+    def test_stock_negatif_refuse_sans_rien_modifier(self):
+        premier, second = self.produits
+        with self.assertRaises(ValidationError):
+            stock.appliquer_mouvements({premier.id: 2, second.id: -4}, 'Casse', self.admin)
+        self.assertEqual(self.quantites(), [3, 3])
+        self.assertFalse(HistoriqueStock.objects.exists())
+
+    def test_produit_introuvable(self):
+        with self.assertRaises(ValidationError):
+            stock.appliquer_mouvements({self.produits[0].id: -1, 0: 1}, 'Casse', self.admin)
+        self.assertEqual(self.quantites(), [3, 3])
+
+    def test_points_d_acces(self):
+        premier, second = self.produits
+        response = self.client.post(
+            f'/api/produits/{premier.id}/mouvements/', {'variation': -4, 'motif': 'Casse'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            f'/api/produits/{premier.id}/mouvements/', {'variation': -1, 'motif': 'Casse'}, format='json'
+        )
+        self.assertEqual(response.json()['quantite'], 2)
+
+        response = self.client.post('/api/produits/mouvements/', {
+            'motif': 'Inventaire',
+            'mouvements': [{'produit_id': premier.id, 'variation': 1}, {'produit_id': second.id, 'variation': -5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantites(), [2, 3])
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class TransfertTests(TestCase):
+    """
+    Un transfert sort le stock de la source et l'entre sur le produit de même référence
+    à la destination, créé au besoin.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Boutique.objects.create(nom='Source', ville='Douala')
+        cls.destination = Boutique.objects.create(nom='Destination', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.source)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.telephone = Produit.objects.create(
+            nom='Téléphone', reference='TEL', category='telephone', quantite=5,
+            prix_achat=10000, prix=20000, boutique=self.source
+        )
+        self.chargeur = Produit.objects.create(
+            nom='Chargeur', reference='CHA', category='accessoire', quantite=5,
+            prix_achat=1000, prix=7000, boutique=self.source
+        )
+        self.telephone_destination = Produit.objects.create(
+            nom='Téléphone', reference='TEL', category='telephone', quantite=1,
+            prix_achat=10000, prix=21000, boutique=self.destination
+        )
+
+    def transferer(self, *mouvements):
+        return self.client.post('/api/transferts/', {
+            'boutique_source': self.source.id, 'boutique_destination': self.destination.id, 'motif': 'Réassort',
+            'mouvements': [{'produit_id': produit.id, 'quantite': quantite} for produit, quantite in mouvements],
+        }, format='json')
+
+    def test_rapprochement_et_creation(self):
+        response = self.transferer((self.telephone, 2), (self.chargeur, 3))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['lignes']), 2)
+
+        self.telephone.refresh_from_db()
+        self.telephone_destination.refresh_from_db()
+        self.assertEqual((self.telephone.quantite, self.telephone_destination.quantite), (3, 3))
+        # Produit existant à la destination : son prix n'est pas écrasé
+        self.assertEqual(self.telephone_destination.prix, 21000)
+
+        chargeur_destination = Produit.objects.get(boutique=self.destination, reference='CHA')
+        self.assertEqual(
+            (chargeur_destination.quantite, chargeur_destination.nom, chargeur_destination.prix_achat), (3, 'Chargeur', 1000)
+        )
+        self.assertEqual(
+            set(LigneTransfert.objects.values_list('produit_source_id', 'produit_destination_id', 'quantite')),
+            {(self.telephone.id, self.telephone_destination.id, 2), (self.chargeur.id, chargeur_destination.id, 3)},
+        )
+        self.assertEqual(HistoriqueStock.objects.count(), 4)
+
+    def test_stock_insuffisant(self):
+        response = self.transferer((self.telephone, 2), (self.chargeur, 6))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transfert.objects.exists())
+        self.assertFalse(Produit.objects.filter(boutique=self.destination, reference='CHA').exists())
+        self.assertEqual(
+            list(Produit.objects.order_by('id').values_list('quantite', flat=True)), [5, 5, 1]
+        )
+
+    def test_meme_boutique_refusee(self):
+        response = self.client.post('/api/transferts/', {
+            'boutique_source': self.source.id, 'boutique_destination': self.source.id,
+            'mouvements': [{'produit_id': self.telephone.id, 'quantite': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class EnMasseTests(TestCase):
+    """
+    /bulk/ : un lot est appliqué entièrement ou pas du tout.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produits = [
+            Produit.objects.create(
+                nom=f'Produit {i}', reference=f'REF{i}', category='accessoire', quantite=3,
+                prix_achat=1000, prix=7000, boutique=self.boutique
+            )
+            for i in range(2)
+        ]
+
+    def nouveau(self, reference, **champs):
+        return {
+            'nom': reference, 'reference': reference, 'category': 'accessoire', 'quantite': 1,
+            'prix_achat': 1000, 'prix': 7000, 'boutique': self.boutique.id, **champs,
+        }
+
+    def noms(self):
+        return list(Produit.objects.order_by('id').values_list('nom', flat=True))
+
+    def test_creation(self):
+        response = self.client.post('/api/produits/bulk/', [self.nouveau('A'), self.nouveau('B')], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Produit.objects.count(), 4)
+        self.assertEqual(Journal.objects.filter(type_operation='creation').count(), 1)
+
+    def test_creation_un_element_invalide(self):
+        response = self.client.post(
+            '/api/produits/bulk/', [self.nouveau('A'), self.nouveau('B', prix='cher')], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Produit.objects.count(), 2)
+
+    def test_modification(self):
+        premier, second = self.produits
+        response = self.client.patch('/api/produits/bulk/', [
+            {'id': premier.id, 'nom': 'Souris'}, {'id': second.id, 'nom': 'Clavier'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.noms(), ['Souris', 'Clavier'])
+
+    def test_modification_un_element_invalide_ou_absent(self):
+        premier, second = self.produits
+        for lot in (
+            [{'id': premier.id, 'nom': 'Souris'}, {'id': second.id, 'quantite': 'beaucoup'}],
+            [{'id': premier.id, 'nom': 'Souris'}, {'id': 0, 'nom': 'Clavier'}],
+            [{'id': premier.id, 'nom': 'Souris'}, {'id': premier.id, 'nom': 'Clavier'}],
+        ):
+            response = self.client.patch('/api/produits/bulk/', lot, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.noms(), ['Produit 0', 'Produit 1'])
+
+    def test_suppression(self):
+        response = self.client.delete('/api/produits/bulk/', [0, self.produits[0].id], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Produit.objects.count(), 2)
+
+        response = self.client.delete('/api/produits/bulk/', [produit.id for produit in self.produits], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Produit.objects.exists())
+
+    def test_factures(self):
+        factures = [
+            {'type': 'client', 'total': total, 'reste': total, 'boutique': self.boutique.id, 'created_by': self.admin.id}
+            for total in (10000, 20000)
+        ]
+        response = self.client.post('/api/factures/bulk/', factures + [{'type': 'client'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Facture.objects.exists())
+        self.assertFalse(VenteJournaliere.objects.exists())
+
+        response = self.client.post('/api/factures/bulk/', factures, format='json')
+        self.assertEqual(response.status_code, 201)
+        resume = VenteJournaliere.objects.get(boutique=self.boutique, type='client')
+        self.assertEqual((resume.nombre_factures, resume.chiffre_affaires), (2, 30000))
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class CacheLectureTests(TestCase):
+    """
+    Les écritures qui contournent save() (UPDATE avec F(), bulk) périment aussi le cache des lectures.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        cache_api.cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produit = Produit.objects.create(
+            nom='Souris', reference='SOU', category='accessoire', quantite=5,
+            prix_achat=1000, prix=7000, boutique=self.boutique
+        )
+        self.url = f'/api/produits/{self.produit.id}/'
+
+    def lire(self):
+        response = self.client.get(self.url)
+        return response['X-Cache'], response.json()['quantite']
+
+    def assertPerime(self, quantite):
+        self.assertEqual(self.lire(), ('MISS', quantite))
+        self.assertEqual(self.lire(), ('HIT', quantite))
+
+    def test_mise_en_cache(self):
+        self.assertPerime(5)
+        self.produit.quantite = 4
+        self.produit.save()
+        self.assertPerime(4)
+
+    def test_mouvement_de_stock(self):
+        self.assertPerime(5)
+        stock.appliquer_mouvements({self.produit.id: -2}, 'Casse', self.admin)
+        self.assertPerime(3)
+
+    def test_checkout(self):
+        self.assertPerime(5)
+        self.client.post('/api/checkout/', {
+            'type': 'client', 'boutique': self.boutique.id,
+            'lignes': [{'produit_id': self.produit.id, 'quantite': 1, 'prix_unitaire_fcfa': 7000}],
+        }, format='json')
+        self.assertPerime(4)
+
+    def test_modification_en_masse(self):
+        self.assertPerime(5)
+        self.client.patch('/api/produits/bulk/', [{'id': self.produit.id, 'quantite': 8}], format='json')
+        self.assertPerime(8)
+
+    def test_liste_de_la_destination_apres_transfert(self):
+        url = f'/api/produits/?boutique={self.autre.id}'
+        self.client.force_authenticate(User.objects.create_user('super', password='secret', role='superadmin'))
+        self.assertEqual(self.client.get(url).json()['results'], [])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.client.post('/api/transferts/', {
+            'boutique_source': self.boutique.id, 'boutique_destination': self.autre.id,
+            'mouvements': [{'produit_id': self.produit.id, 'quantite': 2}],
+        }, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([produit['quantite'] for produit in response.json()['results']], [2])
+
+    def test_changement_de_boutique(self):
+        # Les listes de l'ancienne boutique ne doivent plus montrer le produit ni l'utilisateur déplacés
+        self.client.force_authenticate(User.objects.create_user('super', password='secret', role='superadmin'))
+        vendeur = User.objects.create_user('vendeur', password='secret', role='user', boutique=self.boutique)
+        produits = f'/api/produits/?boutique={self.boutique.id}'
+        utilisateurs = f'/api/users/?boutique={self.boutique.id}'
+        for url in (produits, utilisateurs):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.produit.boutique = self.autre
+        self.produit.save()
+        vendeur.boutique = self.autre
+        vendeur.save()
+        for url in (produits, utilisateurs):
+            response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertNotIn('vendeur', [ligne.get('username') for ligne in response.json()['results']])
+        self.assertEqual(self.client.get(produits).json()['results'], [])
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class DetailsJournalTests(TestCase):
+    """
+    Les entrées écrites par les vues sont compactées comme celles du middleware.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.produit = Produit.objects.create(
+            nom='Souris', reference='SOU', category='accessoire', quantite=5,
+            prix_achat=1000, prix=7000, boutique=self.boutique
+        )
+
+    def test_modifications_d_un_produit(self):
+        self.client.patch(f'/api/produits/{self.produit.id}/', {'prix': 8000, 'quantite': 5}, format='json')
+        details = Journal.objects.get(type_operation='modification').details
+        self.assertEqual(details['modifications'], {'prix': {'avant': 7000, 'apres': 8000}})
+        self.assertEqual(details['method'], 'PATCH')
+
+    def test_modifications_d_une_facture(self):
+        facture = Facture.objects.create(
+            type='client', total=1000, reste=1000, status=soldes.EN_COURS, created_by=self.admin, boutique=self.boutique
+        )
+        self.client.patch(f'/api/factures/{facture.id}/', {'reste': 0}, format='json')
+        modifications = Journal.objects.get(type_operation='modification').details['modifications']
+        self.assertEqual(set(modifications), {'reste', 'verse', 'status'})
+
+    @override_settings(JOURNAL={'ASYNCHRONE': False, 'TAILLE_MAX_TEXTE': 10, 'TAILLE_MAX_LISTE': 2})
+    def test_entree_de_vue_compactee(self):
+        self.client.post('/api/produits/mouvements/', {
+            'motif': 'Inventaire annuel du dépôt',
+            'mouvements': [{'produit_id': self.produit.id, 'variation': 1}],
+        }, format='json')
+        details = Journal.objects.get(type_operation='modification').details
+        self.assertEqual(details['motif'], 'Inventaire[+16 caractères]')
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class TableauDeBordTests(TestCase):
+    """
+    /api/dashboard/ : agrégats du stock et des ventes, filtrés par dates et par boutique.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.superadmin = User.objects.create_user('super', password='secret', role='superadmin')
+        cls.telephone = Produit.objects.create(
+            nom='Téléphone', reference='TEL', category='telephone', quantite=4,
+            prix_achat=10000, prix=20000, boutique=cls.boutique
+        )
+        Produit.objects.create(
+            nom='Souris', reference='SOU', category='souris', quantite=10, prix_achat=1000, prix=7000, boutique=cls.boutique
+        )
+        Produit.objects.create(
+            nom='PC', reference='PC', category='ordinateur', quantite=1, prix_achat=200000, prix=300000, boutique=cls.autre
+        )
+        cls.jour = date(2026, 3, 10)
+        for jour, total, reste in ((cls.jour, 40000, 10000), (cls.jour - timedelta(days=5), 20000, 0)):
+            facture = Facture.objects.create(
+                type='client', total=total, reste=reste, created_by=cls.admin, boutique=cls.boutique
+            )
+            Facture.objects.filter(pk=facture.pk).update(created_at=debut_journee(jour) + timedelta(hours=12))
+            CommandeClient.objects.create(
+                facture=facture, produit=cls.telephone, quantite=total // 20000, prix_unitaire_fcfa=20000
+            )
+        Facture.objects.create(type='partenaire', total=99000, reste=0, created_by=cls.superadmin, boutique=cls.autre)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def tableau(self, **parametres):
+        response = self.client.get('/api/dashboard/', parametres)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_agregats_de_la_boutique(self):
+        tableau = self.tableau()
+        self.assertEqual(tableau['boutique'], self.boutique.id)
+        self.assertEqual(tableau['produits']['total'], 2)
+        self.assertEqual(tableau['produits']['accessoires'], 1)
+        self.assertEqual(tableau['produits']['quantite_stock'], 14)
+        self.assertEqual(tableau['produits']['valeur_stock'], 50000)
+        self.assertEqual(tableau['produits']['par_categorie'], {'telephone': 1, 'souris': 1})
+        self.assertEqual(tableau['factures'], {'total': 2, 'client': 2, 'partenaire': 0})
+        self.assertEqual(tableau['chiffre_affaires'], {'total': 60000, 'encaisse': 50000, 'dette': 10000})
+        self.assertEqual(tableau['marge_totale'], 30000)
+
+    def test_admin_ne_choisit_pas_sa_boutique(self):
+        self.assertEqual(self.tableau(boutique=self.autre.id)['boutique'], self.boutique.id)
+
+    def test_superadmin(self):
+        self.client.force_authenticate(self.superadmin)
+        self.assertEqual(self.tableau()['factures']['total'], 3)
+        tableau = self.tableau(boutique=self.autre.id)
+        self.assertEqual((tableau['produits']['ordinateurs'], tableau['factures']['partenaire']), (1, 1))
+
+    def test_filtre_par_dates(self):
+        tableau = self.tableau(date_debut=self.jour.isoformat(), date_fin=self.jour.isoformat())
+        self.assertEqual(tableau['factures']['total'], 1)
+        self.assertEqual(tableau['chiffre_affaires']['total'], 40000)
+        self.assertEqual(tableau['marge_totale'], 20000)
+        self.assertEqual(self.tableau(date_fin=(self.jour - timedelta(days=1)).isoformat())['factures']['total'], 1)
+
+    def test_marge_au_prix_d_achat_de_la_vente(self):
+        Produit.objects.filter(pk=self.telephone.pk).update(prix_achat=15000)
+        self.assertEqual(self.tableau()['marge_totale'], 30000)
+
+    def test_dates_invalides(self):
+        for valeur in ('2024-02-30', '10/03/2026'):
+            response = self.client.get('/api/dashboard/', {'date_debut': valeur})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('date_debut', response.json())
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False},
+                   PROFILAGE={'ACTIF': True, 'SEUIL_REQUETE_LENTE_MS': 200, 'EN_TETE_SERVER_TIMING': True})
+class ProfilageTests(TestCase):
+    """
+    ProfilageMiddleware : en-tête Server-Timing, requêtes lentes et métriques Prometheus.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        for i in range(3):
+            Produit.objects.create(nom=f'Produit {i}', reference=f'P{i}', quantite=1, prix_achat=500, prix=1000,
+                                   boutique=cls.boutique)
+
+    def setUp(self):
+        profilage.metriques.reinitialiser()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_en_tete_server_timing(self):
+        response = self.client.get('/api/produits/')
+        entrees = [entree.split(';')[0] for entree in response['Server-Timing'].split(', ')]
+        self.assertEqual(entrees, ['db', 'serialisation', 'rendu', 'total'])
+        duree = dict(
+            (entree.split(';')[0], float(entree.split('dur=')[1].split(';')[0]))
+            for entree in response['Server-Timing'].split(', ')
+        )
+        self.assertGreater(duree['serialisation'], 0)
+        self.assertLessEqual(duree['serialisation'], duree['total'])
+
+    def test_sans_en_tete(self):
+        with self.settings(PROFILAGE={'ACTIF': True, 'EN_TETE_SERVER_TIMING': False}):
+            response = APIClient().get('/api/boutiques/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_requetes_lentes_journalisees(self):
+        with self.settings(PROFILAGE={'ACTIF': True, 'SEUIL_REQUETE_LENTE_MS': 0}):
+            client = APIClient()
+            client.force_authenticate(self.admin)
+            with self.assertLogs('core.profilage', 'WARNING') as logs:
+                client.get('/api/produits/')
+        self.assertTrue(any('Requête SQL lente' in ligne and 'core_produit' in ligne for ligne in logs.output))
+        self.assertIn('api_requetes_sql_lentes_total{vue="produit-list",methode="GET"}', profilage.metriques.format_prometheus())
+
+    def test_format_prometheus(self):
+        self.client.get('/api/produits/')
+        self.client.get('/api/produits/')
+        texte = self.client.get('/api/_metrics/').content.decode()
+        self.assertIn('# TYPE api_requete_duree_secondes histogram', texte)
+        self.assertIn('api_requete_duree_secondes_bucket{vue="produit-list",methode="GET",le="+Inf"} 2', texte)
+        self.assertIn('api_requete_duree_secondes_count{vue="produit-list",methode="GET"} 2', texte)
+        for nom in ('api_requetes_sql_total', 'api_serialisation_secondes_total', 'api_rendu_secondes_total',
+                    'api_reponse_octets_total'):
+            self.assertIn(f'# TYPE {nom} counter', texte)
+            self.assertRegex(texte, nom + r'\{vue="produit-list",methode="GET"\} [0-9.]+\n')
+        # Buckets cumulés et croissants
+        buckets = [int(ligne.rsplit(' ', 1)[1]) for ligne in texte.splitlines()
+                   if ligne.startswith('api_requete_duree_secondes_bucket{vue="produit-list"')]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_metriques_reservees_aux_admins(self):
+        utilisateur = User.objects.create_user('vendeur', password='secret', role='user', boutique=self.boutique)
+        self.client.force_authenticate(utilisateur)
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, 403)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False})
+class RechercheTests(TestCase):
+    """
+    ?search= des produits sur l'index FTS5 : triggers, préfixes, pertinence et pagination sur `rang`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.thinkpad = cls.produit('Lenovo ThinkPad', marque='Lenovo', modele='T14')
+        cls.ideapad = cls.produit('IdeaPad', marque='Lenovo', description='Portable Lenovo pour la bureautique')
+        cls.sacoche = cls.produit(
+            'Sacoche', description='Sacoche en toile pour portables Dell, HP, Asus, Acer, Lenovo et bien d\'autres'
+        )
+        cls.souris = cls.produit('Souris sans fil', marque='Logitech')
+
+    @classmethod
+    def produit(cls, nom, **champs):
+        return Produit.objects.create(
+            nom=nom, reference=nom[:3].upper(), quantite=1, prix_achat=1000, prix=2000, boutique=cls.boutique, **champs
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def noms(self, terme, **parametres):
+        response = self.client.get('/api/produits/', {'search': terme, **parametres})
+        self.assertEqual(response.status_code, 200)
+        return [produit['nom'] for produit in response.json()['results']]
+
+    def test_prefixe_et_accents(self):
+        self.assertEqual(set(self.noms('leno')), {'Lenovo ThinkPad', 'IdeaPad', 'Sacoche'})
+        self.assertEqual(self.noms('logi SANS'), ['Souris sans fil'])
+        self.assertEqual(self.noms('bureautiqué'), ['IdeaPad'])
+        self.assertEqual(self.noms('inconnu'), [])
+
+    def test_tri_par_pertinence(self):
+        noms = self.noms('lenovo')
+        self.assertEqual(noms[-1], 'Sacoche')
+        self.assertEqual(set(noms[:2]), {'Lenovo ThinkPad', 'IdeaPad'})
+        self.assertEqual(self.noms('lenovo', ordering='nom'), ['IdeaPad', 'Lenovo ThinkPad', 'Sacoche'])
+
+    def test_pagination_sur_le_rang(self):
+        attendus = self.noms('lenovo')
+        noms, url = [], '/api/produits/?search=lenovo&page_size=1'
+        while url:
+            page = self.client.get(url).json()
+            noms += [produit['nom'] for produit in page['results']]
+            url = page['next']
+        self.assertEqual(noms, attendus)
+
+    def test_index_suit_les_ecritures(self):
+        # Trigger d'insertion (bulk_create compris), de mise à jour (update() compris) et de suppression
+        Produit.objects.bulk_create([Produit(
+            nom='Clavier', reference='CLA', marque='Lenovo', quantite=1, prix_achat=1, prix=2, boutique=self.boutique
+        )])
+        self.assertIn('Clavier', self.noms('lenovo'))
+
+        Produit.objects.filter(pk=self.souris.pk).update(nom='Souris Lenovo')
+        self.assertIn('Souris Lenovo', self.noms('lenovo'))
+        self.assertEqual(self.noms('logitech'), ['Souris Lenovo'])
+        self.assertEqual(self.noms('fil'), [])
+
+        self.thinkpad.delete()
+        self.assertEqual(self.noms('thinkpad'), [])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM core_produit_fts WHERE core_produit_fts MATCH 'thinkpad'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False})
+class ArchivesJournalTests(TestCase):
+    """
+    archiver_journal : rétention par type, fichiers gzip JSON Lines par mois, index et relecture.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        cls.superadmin = User.objects.create_user('super', password='secret', role='superadmin')
+        cls.maintenant = timezone.make_aware(datetime(2026, 6, 15, 12))
+
+    def setUp(self):
+        repertoire = tempfile.TemporaryDirectory()
+        self.addCleanup(repertoire.cleanup)
+        self.enterContext(self.settings(ARCHIVES_JOURNAL={
+            'REPERTOIRE': repertoire.name, 'RETENTION_JOURS': {'connexion': 30}, 'RETENTION_PAR_DEFAUT': 365,
+        }))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def entree(self, jours, type_operation='vente', boutique=None):
+        return Journal.objects.create(
+            utilisateur=self.admin, boutique=boutique or self.boutique, type_operation=type_operation,
+            description=f'{type_operation} J-{jours}', date_operation=self.maintenant - timedelta(days=jours),
+        )
+
+    def test_retention_par_type(self):
+        connexion_echue = self.entree(31, 'connexion')
+        self.entree(29, 'connexion')
+        self.entree(100)
+        vente_echue = self.entree(366)
+        rapport_simulation = archives_journal.archiver(self.maintenant, simulation=True)
+        self.assertEqual(sum(rapport_simulation.values()), 2)
+        self.assertEqual(Journal.objects.count(), 4)
+
+        rapport = archives_journal.archiver(self.maintenant)
+        self.assertEqual(rapport, rapport_simulation)
+        self.assertEqual(rapport, {'2025-06': 1, '2026-05': 1})
+        self.assertEqual(Journal.objects.count(), 2)
+        self.assertFalse(Journal.objects.filter(id__in=[connexion_echue.id, vente_echue.id]).exists())
+
+    def test_ajout_a_une_archive_existante(self):
+        premiere = self.entree(45, 'connexion')
+        archives_journal.archiver(self.maintenant)
+        # Second passage, paquets d'une entrée : même mois, nouveaux membres gzip dans le même fichier
+        seconde, troisieme = self.entree(40, 'connexion'), self.entree(35, 'connexion')
+        archives_journal.archiver(self.maintenant, taille_paquet=1)
+
+        archive = ArchiveJournal.objects.get()
+        self.assertEqual((archive.mois, archive.fichier, archive.nombre), ('2026-05', 'journal-2026-05.jsonl.gz', 3))
+        self.assertEqual(archive.premiere_operation, premiere.date_operation)
+        self.assertEqual(archive.derniere_operation, troisieme.date_operation)
+        with gzip.open(archives_journal.chemin('2026-05'), 'rt', encoding='utf-8') as flux:
+            ids = [json.loads(ligne)['id'] for ligne in flux]
+        self.assertEqual(ids, [premiere.id, seconde.id, troisieme.id])
+
+    def test_relecture_dedoublonnee(self):
+        entree = self.entree(45, 'connexion')
+        valeurs = list(Journal.objects.values(*archives_journal.CHAMPS))
+        # Fichier écrit mais lignes non supprimées (interruption) : archivées une seconde fois
+        archives_journal.ecrire('2026-05', valeurs)
+        archives_journal.archiver(self.maintenant)
+        relues = list(archives_journal.lire('2026-05'))
+        self.assertEqual(len(relues), 1)
+        self.assertEqual(relues[0]['description'], entree.description)
+        self.assertEqual(relues[0]['utilisateur__username'], 'admin')
+        self.assertEqual(list(archives_journal.lire('2026-05', type_operation='vente')), [])
+        self.assertEqual(list(archives_journal.lire('1999-01')), [])
+
+    def test_perimetre_boutique_des_archives(self):
+        self.entree(45, 'connexion')
+        self.entree(44, 'connexion', boutique=self.autre)
+        self.entree(43, 'connexion', boutique=self.autre)
+        archives_journal.archiver(self.maintenant)
+
+        index = self.client.get('/api/journaux/archives/').json()
+        self.assertEqual([(archive['mois'], archive['nombre']) for archive in index], [('2026-05', 3)])
+
+        response = self.client.get('/api/journaux/archives/2026-05/', {'boutique': self.autre.id})
+        self.assertEqual([entree['boutique_id'] for entree in response.json()['results']], [self.boutique.id])
+
+        self.client.force_authenticate(self.superadmin)
+        response = self.client.get('/api/journaux/archives/2026-05/', {'boutique': self.autre.id, 'limite': 1})
+        self.assertEqual(response.json()['suivant'], 1)
+        self.assertEqual(response.json()['results'][0]['boutique_id'], self.autre.id)
+        self.assertEqual(self.client.get('/api/journaux/archives/2026-04/').status_code, 404)
+        self.assertEqual(self.client.get('/api/journaux/archives/2026-05/', {'date_fin': 'hier'}).status_code, 400)
+
+
+class EcritureJournalTests(TestCase):
+    """
+    JournalWriter : file bornée, saturation, vidage à l'arrêt ; fusion des entrées de vue et du middleware.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.ecrivain = journal.JournalWriter()
+        # Thread de fond sans effet : la file n'est consommée que par vider() / arreter()
+        self.enterContext(mock.patch.object(self.ecrivain, '_boucle'))
+
+    def entree(self, description='Opération'):
+        return Journal(utilisateur=self.admin, boutique=self.boutique, type_operation='vente', description=description)
+
+    @override_settings(JOURNAL={'ASYNCHRONE': True, 'TAILLE_FILE': 2})
+    def test_file_videe_a_l_arret(self):
+        self.ecrivain.ajouter(self.entree('a'))
+        self.ecrivain.ajouter(self.entree('b'))
+        self.assertEqual(Journal.objects.count(), 0)
+        self.ecrivain.arreter()
+        self.assertEqual(list(Journal.objects.order_by('id').values_list('description', flat=True)), ['a', 'b'])
+        self.assertTrue(self.ecrivain._file.empty())
+
+    @override_settings(JOURNAL={'ASYNCHRONE': True, 'TAILLE_FILE': 2, 'SATURATION': 'synchrone'})
+    def test_file_pleine_ecriture_synchrone(self):
+        for description in 'abc':
+            self.ecrivain.ajouter(self.entree(description))
+        self.assertEqual(list(Journal.objects.values_list('description', flat=True)), ['c'])
+        self.assertEqual(self.ecrivain._file.qsize(), 2)
+
+    @override_settings(JOURNAL={'ASYNCHRONE': True, 'TAILLE_FILE': 2, 'SATURATION': 'ignorer'})
+    def test_file_pleine_entree_ignoree(self):
+        for description in 'abc':
+            self.ecrivain.ajouter(self.entree(description))
+        self.assertEqual(self.ecrivain.entrees_ignorees, 1)
+        self.ecrivain.vider()
+        self.assertEqual(Journal.objects.count(), 2)
+
+    @override_settings(JOURNAL={'ASYNCHRONE': True})
+    def test_lots_par_taille(self):
+        for description in 'abc':
+            self.ecrivain.ajouter(self.entree(description))
+        self.assertEqual([entree.description for entree in self.ecrivain._collecter(2, 0.01)], ['a', 'b'])
+        self.assertEqual([entree.description for entree in self.ecrivain._collecter(2, 0.01)], ['c'])
+        self.assertEqual(self.ecrivain._collecter(2, 0.01), [])
+
+    def test_lot_en_echec_ecrit_entree_par_entree(self):
+        with mock.patch.object(Journal.objects, 'bulk_create', side_effect=DatabaseError('verrou')):
+            with self.assertLogs('core.journal', 'WARNING') as logs:
+                self.ecrivain._ecrire([self.entree('a'), self.entree('b')])
+        self.assertIn("Échec de l'écriture d'un lot de 2 entrées du journal", logs.output[0])
+        self.assertEqual(Journal.objects.count(), 2)
+
+    @override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False})
+    def test_entree_de_vue_fusionnee_avec_le_middleware(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.post('/api/produits/', {
+            'nom': 'Souris', 'reference': 'SOU', 'category': 'accessoire', 'quantite': 1,
+            'prix_achat': 1000, 'prix': 2000, 'boutique': self.boutique.id,
+        }, format='json', REMOTE_ADDR='10.0.0.7')
+        entree = Journal.objects.get()
+        self.assertEqual(entree.description, 'Création du produit Souris')
+        self.assertEqual(entree.ip_address, '10.0.0.7')
+        self.assertEqual(
+            (entree.details['method'], entree.details['path'], entree.details['status_code'], entree.details['nom']),
+            ('POST', '/api/produits/', 201, 'Souris'),
+        )
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False})
+class ImportationTests(TestCase):
+    """
+    Import de catalogue : mise à jour par référence, ajout de quantité, rapport d'erreurs et simulation.
+    """
+
+    ENTETES = 'reference;nom;category;quantite;prix_achat;prix\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.souris = Produit.objects.create(
+            nom='Souris', reference='SOU', category='souris', quantite=5, prix_achat=1000, prix=7000,
+            boutique=self.boutique
+        )
+
+    def importer(self, lignes, **parametres):
+        fichier = SimpleUploadedFile('catalogue.csv', (self.ENTETES + lignes).encode())
+        response = self.client.post(
+            '/api/produits/import/', {'fichier': fichier, 'boutique': self.boutique.id, **parametres},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_creation_et_mise_a_jour_par_reference(self):
+        rapport = self.importer('SOU;Souris optique;souris;8;1200;7500\nCLA;Clavier;clavier;3;2000;9000\n')
+        self.assertEqual((rapport['lignes'], rapport['crees'], rapport['mis_a_jour']), (2, 1, 1))
+        self.souris.refresh_from_db()
+        self.assertEqual((self.souris.nom, self.souris.quantite, self.souris.prix), ('Souris optique', 8, 7500))
+        self.assertEqual(Produit.objects.get(reference='CLA').boutique_id, self.boutique.id)
+        self.assertEqual(Produit.objects.count(), 2)
+        self.assertTrue(Journal.objects.filter(description__startswith='Import catalogue.csv').exists())
+
+    def test_ajout_de_quantite(self):
+        rapport = self.importer('SOU;Souris;souris;3;1000;7000\n', quantite='ajouter')
+        self.assertEqual(rapport['mis_a_jour'], 1)
+        self.souris.refresh_from_db()
+        self.assertEqual(self.souris.quantite, 8)
+        historique = HistoriqueStock.objects.get(produit=self.souris)
+        self.assertEqual((historique.variation, historique.motif), (3, 'Import catalogue.csv'))
+
+    def test_rapport_d_erreurs_par_ligne(self):
+        rapport = self.importer(
+            'CLA;Clavier;clavier;3;2000;9000\n'
+            'ECR;Écran;ecran;1;abc;90000\n'
+            ';;souris;1;1000;2000\n'
+            'CLA;Clavier bis;clavier;1;2000;9000\n'
+        )
+        self.assertEqual((rapport['lignes'], rapport['crees']), (4, 1))
+        erreurs = {erreur['ligne']: erreur['erreurs'] for erreur in rapport['erreurs']}
+        self.assertEqual(set(erreurs), {3, 4, 5})
+        self.assertIn('prix_achat', erreurs[3])
+        self.assertIn('nom', erreurs[4])
+        self.assertIn('reference', erreurs[5])
+        self.assertFalse(Produit.objects.filter(reference='ECR').exists())
+
+    def test_simulation(self):
+        rapport = self.importer('SOU;Souris optique;souris;8;1200;7500\nCLA;Clavier;clavier;3;2000;9000\n',
+                                simulation='true')
+        self.assertEqual((rapport['simulation'], rapport['crees'], rapport['mis_a_jour']), (True, 1, 1))
+        self.assertEqual(Produit.objects.count(), 1)
+        self.souris.refresh_from_db()
+        self.assertEqual(self.souris.nom, 'Souris')
+        self.assertFalse(Journal.objects.filter(description__startswith='Import catalogue.csv').exists())
+
+    def test_fichier_manquant_ou_vide(self):
+        response = self.client.post('/api/produits/import/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            '/api/produits/import/', {'fichier': SimpleUploadedFile('vide.csv', b'')}, format='multipart'
+        )
+        self.assertEqual(response.json(), {'fichier': 'Fichier vide.'})
+
+    def test_commande(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as fichier:
+            fichier.write(self.ENTETES + 'SOU;Souris;souris;2;1000;7000\nECR;Écran;ecran;1;abc;90000\n')
+        self.addCleanup(os.remove, fichier.name)
+        sortie, erreurs = StringIO(), StringIO()
+
+        call_command('importer_produits', fichier.name, boutique=self.boutique.id, ajouter_quantite=True,
+                     utilisateur='admin', stdout=sortie, stderr=erreurs)
+        self.assertIn('2 ligne(s) lue(s) : 0 produit(s) créé(s), 1 mis à jour, 1 erreur(s).', sortie.getvalue())
+        self.assertIn('Ligne 3 : prix_achat', erreurs.getvalue())
+        self.souris.refresh_from_db()
+        self.assertEqual(self.souris.quantite, 7)
+        self.assertEqual(HistoriqueStock.objects.get().user, self.admin)
+
+        call_command('importer_produits', fichier.name, boutique=self.boutique.id, simulation=True,
+                     stdout=sortie, stderr=StringIO())
+        self.assertIn("Simulation : rien n'a été enregistré.", sortie.getvalue())
+        self.souris.refresh_from_db()
+        self.assertEqual(self.souris.quantite, 7)
+
+        with self.assertRaisesMessage(CommandError, 'Utilisateur inconnu introuvable.'):
+            call_command('importer_produits', fichier.name, utilisateur='inconnu')
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False},
+                   AUTHENTIFICATION={'DUREE_CACHE': 60, 'TAILLE_CACHE': 100})
+class AuthentificationTests(TestCase):
+    """
+    Jetons JWT : claims rôle et boutique, utilisateur gardé en cache et oublié quand il change.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        Produit.objects.create(nom='Souris', quantite=1, prix_achat=1000, prix=2000, boutique=cls.autre)
+
+    def setUp(self):
+        authentification.oublier()
+        self.addCleanup(authentification.oublier)
+        response = APIClient().post('/api/token/', {'username': 'admin', 'password': 'secret'}, format='json')
+        self.jeton, self.rafraichissement = response.json()['access'], response.json()['refresh']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.jeton}')
+
+    def requetes_utilisateur(self, url='/api/produits/'):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [requete['sql'] for requete in requetes if '"core_user"' in requete['sql']
+                or 'FROM "core_boutique"' in requete['sql']]
+
+    def test_claims_du_jeton(self):
+        jeton = AccessToken(self.jeton)
+        self.assertEqual((jeton['role'], jeton['boutique']), ('admin', self.boutique.id))
+        # Claims repris par le jeton d'accès renouvelé
+        rafraichi = APIClient().post('/api/token/refresh/', {'refresh': self.rafraichissement}, format='json')
+        jeton = AccessToken(rafraichi.json()['access'])
+        self.assertEqual((jeton['role'], jeton['boutique']), ('admin', self.boutique.id))
+
+    def test_utilisateur_en_cache(self):
+        self.assertEqual(len(self.requetes_utilisateur()), 2)
+        self.assertEqual(self.requetes_utilisateur(), [])
+
+    def test_changement_de_boutique_pris_en_compte(self):
+        self.requetes_utilisateur()
+        self.assertEqual(self.client.get('/api/produits/').json()['results'], [])
+        self.admin.boutique = self.autre
+        self.admin.save()
+        self.assertEqual([produit['nom'] for produit in self.client.get('/api/produits/').json()['results']],
+                         ['Souris'])
+
+    def test_changement_de_role_pris_en_compte(self):
+        self.requetes_utilisateur()
+        self.admin.role = 'user'
+        self.admin.save()
+        self.assertEqual(self.client.get('/api/produits/').status_code, 403)
+
+    def test_utilisateur_supprime(self):
+        self.requetes_utilisateur()
+        User.objects.get(pk=self.admin.pk).delete()
+        # Jeton refusé (403 : SessionAuthentication, première classe, ne propose pas d'en-tête WWW-Authenticate)
+        response = self.client.get('/api/produits/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['code'], 'user_not_found')
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False})
+class PaginationTests(TestCase):
+    """
+    Pagination par curseur : taille de page plafonnée, liens next / previous, total optionnel.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        Partenaire.objects.bulk_create([Partenaire(nom=f'Partenaire {i}') for i in range(505)])
+        # Même created_at pour tous : l'ordre se départage sur l'id
+        cls.creation = timezone.now()
+        Produit.objects.bulk_create([
+            Produit(nom=f'Produit {i}', quantite=1, prix_achat=1, prix=2, boutique=cls.boutique, created_at=cls.creation)
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_taille_de_page(self):
+        self.assertEqual(len(self.client.get('/api/partenaires/').json()['results']), 50)
+        self.assertEqual(len(self.client.get('/api/partenaires/?page_size=10').json()['results']), 10)
+        page = self.client.get('/api/partenaires/?page_size=600').json()
+        self.assertEqual(len(page['results']), 500)
+        self.assertIsNotNone(page['next'])
+        self.assertNotIn('count', page)
+        self.assertEqual(self.client.get('/api/partenaires/?page_size=10&count=true').json()['count'], 505)
+
+    def test_curseur_suivant_et_precedent(self):
+        ids, pages, url = [], [], '/api/produits/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            ids += [produit['id'] for produit in page['results']]
+            url = page['next']
+        self.assertEqual(ids, sorted(Produit.objects.values_list('id', flat=True), reverse=True))
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+        self.assertIsNone(pages[0]['previous'])
+
+        # Retour en arrière depuis la dernière page, alors que tout le monde partage le même created_at
+        page, retour = pages[-1], []
+        while page['previous']:
+            page = self.client.get(page['previous']).json()
+            retour.insert(0, [produit['id'] for produit in page['results']])
+        self.assertEqual(retour, [[produit['id'] for produit in page['results']] for page in pages[:-1]])
+
+    def test_curseur_sur_un_tri_choisi(self):
+        Produit.objects.filter(nom__in=['Produit 1', 'Produit 3']).update(nom='Produit 0')
+        for ordering in ('nom', '-nom'):
+            noms, url = [], f'/api/produits/?page_size=2&ordering={ordering}'
+            while url:
+                page = self.client.get(url).json()
+                noms += [(produit['nom'], produit['id']) for produit in page['results']]
+                url = page['next']
+            attendus = Produit.objects.order_by(ordering, 'id' if ordering == 'nom' else '-id')
+            self.assertEqual(noms, [(produit.nom, produit.id) for produit in attendus])
+
+    def test_curseur_invalide(self):
+        self.assertEqual(self.client.get('/api/produits/?cursor=inconnu').status_code, 404)
+
+
+@override_settings(JOURNAL={'ASYNCHRONE': False}, CACHE_API={'ACTIF': False})
+class ExportTests(TestCase):
+    """
+    Exports CSV du stock, des factures et du journal : entêtes, périmètre, filtres et flux.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boutique = Boutique.objects.create(nom='Boutique', ville='Douala')
+        cls.autre = Boutique.objects.create(nom='Autre', ville='Yaoundé')
+        cls.admin = User.objects.create_user('admin', password='secret', role='admin', boutique=cls.boutique)
+        for nom, category, boutique in (('Souris', 'souris', cls.boutique), ('Clavier', 'clavier', cls.boutique),
+                                        ('PC', 'ordinateur', cls.autre)):
+            Produit.objects.create(
+                nom=nom, reference=nom[:3].upper(), category=category, quantite=2, prix_achat=1000, prix=2000,
+                boutique=boutique,
+            )
+        for type, boutique in (('client', cls.boutique), ('partenaire', cls.boutique), ('client', cls.autre)):
+            Facture.objects.create(
+                type=type, nom=f'{type} {boutique.nom}', total=1000, reste=0, created_by=cls.admin, boutique=boutique
+            )
+        Journal.objects.create(
+            utilisateur=cls.admin, boutique=cls.boutique, type_operation='vente', description='Vente ; "comptoir"',
+            details={'lignes': 2},
+        )
+        Journal.objects.create(utilisateur=cls.admin, boutique=cls.autre, type_operation='vente', description='Ailleurs')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def exporter(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="\w+-\d{8}-\d{4}\.csv"$')
+        contenu = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(contenu.startswith('\ufeff'))
+        return list(csv.reader(StringIO(contenu[1:]), delimiter=';'))
+
+    def test_stock(self):
+        lignes = self.exporter('/api/produits/export/')
+        self.assertEqual(lignes[0], [
+            'ID', 'Référence', 'Nom', 'Catégorie', 'Boutique', 'Quantité', "Prix d'achat", 'Prix', 'Actif', 'Mis à jour le',
+        ])
+        self.assertEqual(sorted(ligne[2] for ligne in lignes[1:]), ['Clavier', 'Souris'])
+        self.assertEqual({ligne[4] for ligne in lignes[1:]}, {'Boutique'})
+        self.assertEqual([ligne[2] for ligne in self.exporter('/api/produits/export/?category=souris')[1:]], ['Souris'])
+
+    def test_factures(self):
+        lignes = self.exporter('/api/factures/export/')
+        self.assertEqual(lignes[0][:4], ['ID', 'Numéro', 'Type', 'Nom'])
+        self.assertEqual(sorted(ligne[3] for ligne in lignes[1:]), ['client Boutique', 'partenaire Boutique'])
+        lignes = self.exporter('/api/factures/export/?type=partenaire')
+        self.assertEqual([(ligne[2], ligne[5]) for ligne in lignes[1:]], [('partenaire', 'admin')])
+
+    def test_journal(self):
+        lignes = self.exporter('/api/journaux/export/?type_operation=vente')
+        self.assertEqual(lignes[0], ['Date', 'Type', 'Utilisateur', 'Boutique', 'Description', 'Adresse IP', 'Détails'])
+        # Séparateur et guillemets échappés, détails en JSON, date locale sans fuseau ni microsecondes
+        self.assertEqual(len(lignes), 2)
+        self.assertEqual(lignes[1][1:5], ['vente', 'admin', 'Boutique', 'Vente ; "comptoir"'])
+        self.assertEqual(json.loads(lignes[1][6]), {'lignes': 2})
+        self.assertRegex(lignes[1][0], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+    def test_flux_par_morceaux(self):
+        with mock.patch('core.export.LIGNES_PAR_MORCEAU', 1):
+            response = self.client.get('/api/produits/export/')
+            morceaux = list(response.streaming_content)
+        # Entêtes puis une ligne par morceau
+        self.assertEqual(len(morceaux), 3)
+
+    def test_format_inconnu(self):
+        self.assertEqual(self.client.get('/api/produits/export/?fichier=pdf').status_code, 400)
+        if export.Workbook is None:
+            self.assertEqual(self.client.get('/api/produits/export/?fichier=xlsx').status_code, 400)
@@ -14,9 +14,14 @@ router.register(r'commandes-client', CommandeClientViewSet)
 router.register(r'commandes-partenaire', CommandePartenaireViewSet)
 router.register(r'versements', VersementViewSet)
 router.register(r'historiques-stock', HistoriqueStockViewSet)
+router.register(r'transferts', TransfertViewSet)
 router.register(r'journaux', JournalViewSet)
+router.register(r'ventes-journalieres', VenteJournaliereViewSet)
 router.register(r'users', UserViewSet)
 
 urlpatterns = [
+    path('checkout/', CheckoutView.as_view(), name='checkout'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('_metrics/', MetriquesView.as_view(), name='metriques'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Maintenance incrémentale de `VenteJournaliere`.
+
+Chaque écriture sur Facture, CommandeClient, CommandePartenaire ou Versement
+ajoute sa contribution (positive ou négative) à la ligne (boutique, jour, type)
+concernée, par un UPDATE avec F() : pas de relecture ni de recalcul.
+
+- Facture : nombre, chiffre d'affaires, encaissé (total - reste) et reste,
+  au jour de création de la facture ;
+- lignes de commande : quantité et marge, au jour de la facture, avec le prix
+  d'achat enregistré sur la ligne à la vente (prix_achat_fcfa) : un changement
+  ultérieur du prix d'achat du produit ne modifie pas la marge ;
+- Versement : montant, au jour du versement.
+
+Coût : en modification, le pre_save (core/signals.py) relit l'ancienne ligne pour
+retirer sa contribution, soit un SELECT de plus par save() ; les lignes de commande
+et les versements relisent aussi leur facture si elle n'est pas déjà chargée. Les
+créations n'ajoutent que l'UPDATE (ou l'INSERT) du résumé.
+
+Les écritures en masse (bulk_create, update) ne déclenchent pas les signaux :
+elles appellent directement `ajuster`. `reconstruire` (commande
+`reconstruire_ventes_journalieres`, migration 0025 pour l'historique antérieur à
+la table) recalcule tout depuis les factures, lignes et versements.
+"""
+from collections import defaultdict
+
+from django.apps import apps as apps_django
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Facture, VenteJournaliere
+
+CHAMPS = ('nombre_factures', 'chiffre_affaires', 'encaisse', 'reste', 'versements', 'quantite_vendue', 'marge')
+
+
+def jour(date_heure):
+    return timezone.localdate(date_heure) if date_heure else timezone.localdate()
+
+
+def ajuster(boutique_id, date, type, **deltas):
+    deltas = {champ: valeur for champ, valeur in deltas.items() if valeur}
+    if not deltas:
+        return
+    lignes = VenteJournaliere.objects.filter(boutique_id=boutique_id, date=date, type=type)
+    increments = {champ: F(champ) + valeur for champ, valeur in deltas.items()}
+    if lignes.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            VenteJournaliere.objects.create(boutique_id=boutique_id, date=date, type=type, **deltas)
+    except IntegrityError:
+        # Créée entre-temps par une écriture concurrente
+        lignes.update(**increments)
+
+
+def inverser(contribution):
+    cle, deltas = contribution
+    return cle, {champ: -valeur for champ, valeur in deltas.items()}
+
+
+def appliquer(*contributions):
+    for contribution in contributions:
+        if contribution is not None:
+            cle, deltas = contribution
+            ajuster(*cle, **deltas)
+
+
+def appliquer_cumul(contributions):
+    # Écritures en masse : une seule mise à jour par (boutique, jour, type) pour tout le lot
+    cumul = {}
+    for contribution in contributions:
+        if contribution is not None:
+            cle, deltas = contribution
+            total = cumul.setdefault(cle, dict.fromkeys(CHAMPS, 0))
+            for champ, valeur in deltas.items():
+                total[champ] += valeur
+    for cle, deltas in cumul.items():
+        ajuster(*cle, **deltas)
+
+
+# Contributions : ((boutique_id, date, type), {champ: valeur})
+
+def contribution_facture(facture):
+    return (
+        (facture.boutique_id, jour(facture.created_at), facture.type),
+        {
+            'nombre_factures': 1,
+            'chiffre_affaires': facture.total,
+            'encaisse': facture.total - facture.reste,
+            'reste': facture.reste,
+        },
+    )
+
+
+def contribution_ligne(facture, quantite, prix_unitaire, prix_achat):
+    return (
+        (facture.boutique_id, jour(facture.created_at), facture.type),
+        {
+            'quantite_vendue': quantite,
+            'marge': (prix_unitaire - (prix_achat or 0)) * quantite,
+        },
+    )
+
+
+def facture_de(objet):
+    # Réutilise la facture déjà chargée sur l'objet si possible
+    if type(objet).facture.is_cached(objet):
+        return objet.facture
+    return Facture.objects.only('boutique_id', 'created_at', 'type').filter(pk=objet.facture_id).first()
+
+
+def contribution_commande(commande):
+    facture = facture_de(commande)
+    if facture is None:
+        return None
+    return contribution_ligne(facture, commande.quantite, commande.prix_unitaire_fcfa, commande.prix_achat_fcfa)
+
+
+def contribution_versement(versement):
+    facture = facture_de(versement)
+    if facture is None:
+        return None
+    return (
+        (facture.boutique_id, jour(versement.date_versement), facture.type),
+        {'versements': versement.montant},
+    )
+
+
+def reconstruire(boutique=None, apps=apps_django):
+    """
+    Recalcule VenteJournaliere (toutes les boutiques ou `boutique`) par une requête
+    GROUP BY par source, et renvoie le nombre de lignes écrites. `apps` : registre des
+    modèles, celui de la migration lors d'un RunPython.
+    """
+    Facture = apps.get_model('core', 'Facture')
+    VenteJournaliere = apps.get_model('core', 'VenteJournaliere')
+    resumes = defaultdict(lambda: dict.fromkeys(CHAMPS, 0))
+
+    factures = Facture.objects.all()
+    commandes_client = apps.get_model('core', 'CommandeClient').objects.all()
+    commandes_partenaire = apps.get_model('core', 'CommandePartenaire').objects.all()
+    versements = apps.get_model('core', 'Versement').objects.all()
+    if boutique:
+        factures = factures.filter(boutique_id=boutique)
+        commandes_client = commandes_client.filter(facture__boutique_id=boutique)
+        commandes_partenaire = commandes_partenaire.filter(facture__boutique_id=boutique)
+        versements = versements.filter(facture__boutique_id=boutique)
+
+    for ligne in factures.annotate(jour=TruncDate('created_at')).values('boutique_id', 'jour', 'type').annotate(
+        nombre=Count('id'), total=Sum('total'), reste=Sum('reste'),
+    ).order_by():
+        resume = resumes[(ligne['boutique_id'], ligne['jour'], ligne['type'])]
+        resume['nombre_factures'] = ligne['nombre']
+        resume['chiffre_affaires'] = ligne['total']
+        resume['encaisse'] = ligne['total'] - ligne['reste']
+        resume['reste'] = ligne['reste']
+
+    # Prix d'achat enregistré sur chaque ligne à la vente, comme contribution_ligne
+    marge = Sum(
+        (F('prix_unitaire_fcfa') - Coalesce('prix_achat_fcfa', Value(0.0))) * F('quantite'), output_field=FloatField()
+    )
+    for commandes in (commandes_client, commandes_partenaire):
+        for ligne in commandes.annotate(
+            boutique_id=F('facture__boutique_id'), jour=TruncDate('facture__created_at'), type=F('facture__type'),
+        ).values('boutique_id', 'jour', 'type').annotate(quantite_vendue=Sum('quantite'), marge=marge).order_by():
+            resume = resumes[(ligne['boutique_id'], ligne['jour'], ligne['type'])]
+            resume['quantite_vendue'] += ligne['quantite_vendue']
+            resume['marge'] += ligne['marge'] or 0
+
+    for ligne in versements.annotate(
+        boutique_id=F('facture__boutique_id'), jour=TruncDate('date_versement'), type=F('facture__type'),
+    ).values('boutique_id', 'jour', 'type').annotate(montant=Sum('montant')).order_by():
+        resumes[(ligne['boutique_id'], ligne['jour'], ligne['type'])]['versements'] = ligne['montant']
+
+    with transaction.atomic():
+        anciens = VenteJournaliere.objects.all()
+        if boutique:
+            anciens = anciens.filter(boutique_id=boutique)
+        anciens.delete()
+        VenteJournaliere.objects.bulk_create(
+            [
+                VenteJournaliere(boutique_id=boutique_id, date=jour, type=type, **valeurs)
+                for (boutique_id, jour, type), valeurs in resumes.items()
+            ],
+            batch_size=1000,
+        )
+    return len(resumes)
@@ -1,43 +1,369 @@
-from rest_framework import viewsets, filters
+import calendar
+import hashlib
+from datetime import datetime, time, timedelta
+from rest_framework import viewsets, filters, mixins, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import *
-from django.db.models.functions import TruncDate
+from django.db import models, transaction
+from django.http import HttpResponse
+from django.db.models import Count, F, FloatField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.dateparse import parse_date, parse_datetime
 from .serializers import *
 from .permissions import *
+from . import archives_journal, cache_api, journal, profilage, soldes, stock, synchro, ventes_journalieres
+from .export import reponse_export
+from .importation import FichierInvalide, importer_produits, lire_lignes
+from .recherche import CHAMPS_RECHERCHE, RechercheProduitFilter
+
+def debut_journee(date):
+    # Minuit (fuseau courant) du jour donné, pour filtrer un DateTimeField par plage
+    return timezone.make_aware(datetime.combine(date, time.min))
 
 class FactureFilter(django_filters.FilterSet):
     created_at = django_filters.DateFilter(method='filter_by_date')
 
     class Meta:
         model = Facture
-        fields = ['type', 'status', 'boutique', 'created_at']
+        fields = ['type', 'status', 'created_at']
 
     def filter_by_date(self, queryset, name, value):
-        return queryset.annotate(date_only=TruncDate('created_at')).filter(date_only=value)
+        # Plage semi-ouverte sur created_at (utilise l'index), plutôt que TruncDate(created_at) = jour
+        return queryset.filter(
+            created_at__gte=debut_journee(value),
+            created_at__lt=debut_journee(value + timedelta(days=1)),
+        )
+
+# Périmètre boutique : un admin ou un utilisateur ne lit et n'écrit que les lignes de sa
+# boutique, le superadmin voit tout ou une boutique choisie par ?boutique=. `champ_boutique`
+# suit les relations (facture__boutique...) ; avec plusieurs champs, l'un d'eux suffit en
+# lecture et le premier (boutique source d'un transfert) est vérifié en écriture.
+class PerimetreBoutiqueMixin:
+    champ_boutique = 'boutique'
+
+    def get_queryset(self):
+        return self.restreindre_a_boutique(super().get_queryset())
+
+    def restreindre_a_boutique(self, queryset):
+        user = self.request.user
+        if getattr(user, 'role', None) == 'superadmin':
+            boutique = self.request.query_params.get('boutique')
+            if not boutique:
+                return queryset
+            if not boutique.isdigit():
+                raise ValidationError({'boutique': "Identifiant de boutique attendu."})
+        else:
+            boutique = getattr(user, 'boutique_id', None)
+            if boutique is None:
+                return queryset.none()
+
+        champs = self.champ_boutique if isinstance(self.champ_boutique, tuple) else (self.champ_boutique,)
+        condition = Q()
+        for champ in champs:
+            condition |= Q(**{champ: boutique})
+        return queryset.filter(condition)
+
+    def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
+        super().perform_update(serializer)
+
+    def verifier_boutiques(self, boutique_ids):
+        verifier_boutiques(self.request.user, boutique_ids)
+
+    def boutique_des_donnees(self, donnees):
+        # Suit champ_boutique sur les données validées : facture__boutique -> facture.boutique_id
+        champ = self.champ_boutique[0] if isinstance(self.champ_boutique, tuple) else self.champ_boutique
+        *relations, dernier = champ.split('__')
+        objet = donnees
+        for relation in relations:
+            objet = objet.get(relation) if isinstance(objet, dict) else getattr(objet, relation, None)
+            if objet is None:
+                return None
+        if isinstance(objet, dict):
+            valeur = objet.get(dernier)
+            return valeur.pk if isinstance(valeur, models.Model) else valeur
+        return getattr(objet, f'{dernier}_id', None)
+
+    def verifier_ecriture(self, *donnees):
+        # Données validées d'un ou plusieurs objets ; un champ absent (PATCH partiel) n'est pas vérifié
+        self.verifier_boutiques([
+            boutique for boutique in map(self.boutique_des_donnees, donnees) if boutique is not None
+        ])
+
+# Écritures en masse sur /bulk/ : une requête, une transaction, une entrée de journal
+#   POST   : liste d'objets à créer
+#   PATCH  : liste de modifications partielles, chacune avec son `id`
+#   DELETE : liste d'identifiants
+# La moindre erreur de validation annule tout le lot.
+class EnMasseMixin:
+    nom_ressource = 'objet'
+    taille_max_lot = 1000
+
+    def verifier_liste(self, donnees):
+        if not isinstance(donnees, list) or not donnees:
+            raise ValidationError({'non_field_errors': ["Une liste non vide est attendue."]})
+        if len(donnees) > self.taille_max_lot:
+            raise ValidationError({'non_field_errors': [f"{self.taille_max_lot} éléments au maximum par lot."]})
+
+    def charger_instances(self, ids):
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'id': ["Identifiant présent plusieurs fois dans le lot."]})
+        instances = self.get_queryset().in_bulk(ids)
+        manquants = [pk for pk in ids if pk not in instances]
+        if manquants:
+            raise ValidationError({'id': [f"{self.nom_ressource.capitalize()} {pk} introuvable" for pk in manquants]})
+        return [instances[pk] for pk in ids]
+
+    def boutique_du_lot(self, instances):
+        boutiques = {instance.boutique_id for instance in instances}
+        return instances[0].boutique if len(boutiques) == 1 else None
+
+    def perform_bulk_create(self, serializer):
+        return serializer.save()
+
+    def perform_bulk_update(self, serializer):
+        return serializer.save()
+
+    def perform_bulk_destroy(self, instances):
+        self.get_queryset().filter(id__in=[instance.id for instance in instances]).delete()
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        donnees = request.data
+        self.verifier_liste(donnees)
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=donnees, many=True)
+            serializer.is_valid(raise_exception=True)
+            # Avec PerimetreBoutiqueMixin : chaque objet doit rester dans le périmètre de l'appelant
+            self.verifier_ecriture(*serializer.validated_data)
+            with transaction.atomic():
+                instances = self.perform_bulk_create(serializer)
+            type_operation, action_journal, code = 'creation', 'Création', status.HTTP_201_CREATED
+        elif request.method == 'PATCH':
+            if not all(isinstance(element, dict) and isinstance(element.get('id'), int) for element in donnees):
+                raise ValidationError({'id': ["Chaque élément doit porter l'`id` de l'objet à modifier."]})
+            serializer = self.get_serializer(
+                self.charger_instances([element['id'] for element in donnees]), data=donnees, many=True, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            self.verifier_ecriture(*serializer.validated_data)
+            with transaction.atomic():
+                instances = self.perform_bulk_update(serializer)
+            type_operation, action_journal, code = 'modification', 'Modification', status.HTTP_200_OK
+        else:
+            if not all(isinstance(pk, int) for pk in donnees):
+                raise ValidationError({'id': ["Une liste d'identifiants est attendue."]})
+            instances = self.charger_instances(donnees)
+            with transaction.atomic():
+                self.perform_bulk_destroy(instances)
+            type_operation, action_journal, code = 'suppression', 'Suppression', status.HTTP_204_NO_CONTENT
+
+        details = {'ids': [instance.id for instance in instances]}
+        if request.method == 'PATCH':
+            details['champs'] = sorted({champ for element in donnees for champ in element} - {'id'})
+        create_journal_entry(
+            user=request.user,
+            type_operation=type_operation,
+            description=f"{action_journal} en masse de {len(instances)} {self.nom_ressource}(s)",
+            boutique=self.boutique_du_lot(instances),
+            details=details
+        )
+        if code == status.HTTP_204_NO_CONTENT:
+            return Response(status=code)
+        return Response(serializer.data, status=code)
+
+# Synchronisation incrémentale (core/synchro.py) :
+#   GET .../changements/?since=<date ISO 8601>[&boutique=<id>]
+#   -> objets modifiés depuis `since`, identifiants supprimés, et `jusqu_a` pour l'appel suivant
+# Les objets modifiés suivent le périmètre de PerimetreBoutiqueMixin, les suppressions aussi.
+class SynchroMixin:
+
+    @action(detail=False, methods=['get'], url_path='changements')
+    def changements(self, request):
+        try:
+            depuis = parse_datetime(request.query_params.get('since', ''))
+        except ValueError:  # bien formée mais impossible (mois 13...)
+            depuis = None
+        if depuis is None:
+            raise ValidationError({'since': "Date ISO 8601 attendue, ex. 2025-01-31T08:00:00Z."})
+        if timezone.is_naive(depuis):
+            depuis = timezone.make_aware(depuis)
+        if depuis < synchro.horizon():
+            return Response(
+                {'detail': "Suppressions plus conservées pour cette date : rechargez la liste complète."},
+                status=status.HTTP_410_GONE,
+            )
+
+        jusqu_a = timezone.now()
+        debut = synchro.debut_fenetre(depuis)
+        modifies = self.filter_queryset(self.get_queryset()).filter(updated_at__gte=debut)
+        supprimes = Suppression.objects.filter(modele=synchro.MODELES[self.get_queryset().model], date__gte=debut)
+        if request.user.role == 'superadmin':
+            boutique = request.query_params.get('boutique')
+            if boutique:
+                supprimes = supprimes.filter(boutique_id=boutique)
+        elif request.user.boutique_id is None:
+            # Sans boutique, rien n'est visible : ni modifiés (get_queryset) ni supprimés
+            supprimes = supprimes.none()
+        else:
+            supprimes = supprimes.filter(boutique_id=request.user.boutique_id)
+
+        return Response({
+            'jusqu_a': jusqu_a,
+            'supprimes': list(supprimes.values_list('objet_id', flat=True)),
+            'modifies': self.get_serializer(modifies.order_by('updated_at', 'id'), many=True).data,
+        })
+
+# Requêtes conditionnelles (If-None-Match / If-Modified-Since) sur liste et fiche : si rien
+# n'a changé, réponse 304 sans charger ni sérialiser les objets.
+# - Liste d'une ressource versionnée par core/cache_api.py (`ressource_cache`, cache actif) :
+#   l'ETag suit le numéro de version, lu dans le cache sans requête SQL.
+# - Sinon : une agrégation max(updated_at) + count qui parcourt toutes les lignes filtrées
+#   (~3 ms pour 3 000 factures d'une boutique, ~4 ms pour 10 000 sous SQLite), contre ~15 ms
+#   pour servir une page ; voir les scénarios factures_revalidation et factures_par_date de
+#   manage.py benchmark.
+# Une suppression ne fait pas avancer max(updated_at) : les listes n'ont donc pas de
+# Last-Modified, seul l'ETag (qui change avec le nombre de lignes) les valide.
+class ConditionnelMixin:
+    def empreinte(self, request, *valeurs):
+        return quote_etag(hashlib.md5('|'.join([
+            request.get_full_path(), str(request.user.pk), *map(str, valeurs),
+        ]).encode()).hexdigest())
+
+    def validateurs(self, request, queryset, liste=False):
+        ressource = getattr(self, 'ressource_cache', None)
+        if liste and ressource and cache_api.configuration()['ACTIF']:
+            boutique = (request.query_params.get('boutique') if self.boutique_cache else None) or cache_api.TOUTES
+            return self.empreinte(request, 'version', cache_api.version(ressource, boutique)), None
+        resultat = queryset.order_by().aggregate(dernier=Max('updated_at'), nombre=Count('id'))
+        dernier = resultat['dernier']
+        etag = self.empreinte(request, dernier.isoformat() if dernier else '', resultat['nombre'])
+        return etag, None if liste else dernier
+
+    def reponse_conditionnelle(self, request, queryset, calculer, liste=False):
+        etag, dernier = self.validateurs(request, queryset, liste)
+        derniere_modification = calendar.timegm(dernier.utctimetuple()) if dernier else None
+        response = get_conditional_response(request, etag=etag, last_modified=derniere_modification)
+        if response is None:
+            response = calculer()
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if derniere_modification is not None:
+                response['Last-Modified'] = http_date(derniere_modification)
+            # Revalidation à chaque affichage, réponse propre à l'utilisateur
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.reponse_conditionnelle(
+            request, self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionnelMixin, self).list(request, *args, **kwargs),
+            liste=True,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        return self.reponse_conditionnelle(
+            request, self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup]}),
+            lambda: super(ConditionnelMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+# Lectures (liste et fiche) servies par core/cache_api.py tant que la ressource n'a pas changé.
+# `boutique_cache` : la ressource appartient à une boutique, la clé suit alors ?boutique=.
+class CacheLectureMixin:
+    ressource_cache = None
+    boutique_cache = False
+
+    def lire_depuis_cache(self, request, calculer):
+        configuration = cache_api.configuration()
+        if not configuration['ACTIF']:
+            return calculer()
+        boutique = cache_api.TOUTES
+        if self.boutique_cache:
+            boutique = request.query_params.get('boutique') or cache_api.TOUTES
+        cle = cache_api.cle_reponse(request, self.ressource_cache, boutique)
+        donnees = cache_api.cache().get(cle)
+        if donnees is not None:
+            return Response(donnees, headers={'X-Cache': 'HIT'})
+        response = calculer()
+        if response.status_code == status.HTTP_200_OK:
+            cache_api.cache().set(cle, response.data, configuration['DUREE'])
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.lire_depuis_cache(request, lambda: super(CacheLectureMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.lire_depuis_cache(request, lambda: super(CacheLectureMixin, self).retrieve(request, *args, **kwargs))
+
+# PUT/PATCH : note les champs réellement modifiés (avant / après) pour l'entrée du journal
+# écrite par JournalMiddleware, au lieu du corps complet de la requête
+class ModificationsJournalMixin:
+    def perform_update(self, serializer):
+        avant = self.valeurs_avant(serializer)
+        super().perform_update(serializer)
+        self.noter_modifications(serializer, avant)
+
+    def valeurs_avant(self, serializer):
+        return journal.valeurs_champs(serializer.instance, serializer.validated_data)
+
+    def noter_modifications(self, serializer, avant):
+        # Pour l'entrée du middleware ; renvoyées aussi aux vues qui écrivent leur propre entrée
+        modifications = journal.differences(avant, journal.valeurs_champs(serializer.instance, avant))
+        self.request._request.journal_modifications = modifications
+        return {'modifications': modifications} if journal.configuration()['DIFF_MODIFICATIONS'] else {}
+
+# Sérialisation (serializer.data) mesurée à part pour ProfilageMiddleware quand il est actif
+class ProfilageSerialisationMixin:
+    def get_serializer(self, *args, **kwargs):
+        return profilage.mesurer_serialisation(self.request._request, super().get_serializer(*args, **kwargs))
 
 # Boutique : uniquement superadmin peut y toucher
-class BoutiqueViewSet(viewsets.ModelViewSet):
+class BoutiqueViewSet(CacheLectureMixin, ModificationsJournalMixin, ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Boutique.objects.all()
     serializer_class = BoutiqueSerializer
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nom', 'ville']
     ordering_fields = ['nom']
+    ressource_cache = 'boutique'
     
 
 # Produit : filtré par boutique + actif, tous les rôles sauf superadmin
-class ProduitViewSet(viewsets.ModelViewSet):
+class ProduitViewSet(PerimetreBoutiqueMixin, ConditionnelMixin, CacheLectureMixin, EnMasseMixin, SynchroMixin,
+                     ModificationsJournalMixin, ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Produit.objects.all()
     serializer_class = ProduitSerializer
     permission_classes = [IsAdminOrSuperAdmin]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['boutique', 'actif', 'category']
-    search_fields = ['nom', 'description', 'marque', 'modele', 'processeur']
+    # ?search= passe par l'index plein texte (core/recherche.py)
+    filter_backends = [DjangoFilterBackend, RechercheProduitFilter, filters.OrderingFilter]
+    filterset_fields = ['actif', 'category']
+    search_fields = CHAMPS_RECHERCHE
     ordering_fields = ['nom', 'quantite', 'prix', 'created_at']
+    ordering = ['-created_at']
+    nom_ressource = 'produit'
+    ressource_cache = 'produit'
+    boutique_cache = True
 
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         try:
             instance = serializer.save()
             create_journal_entry(
@@ -59,7 +385,9 @@ class ProduitViewSet(viewsets.ModelViewSet):
             raise
 
     def perform_update(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         try:
+            avant = self.valeurs_avant(serializer)
             instance = serializer.save()
             create_journal_entry(
                 user=self.request.user,
@@ -72,33 +400,136 @@ class ProduitViewSet(viewsets.ModelViewSet):
                     'reference': instance.reference,
                     'category': instance.category,
                     'quantite': instance.quantite,
-                    'prix': instance.prix
+                    'prix': instance.prix,
+                    **self.noter_modifications(serializer, avant),
                 }
             )
         except Exception as e:
             print(f"Erreur lors de la mise à jour du produit: {str(e)}")
             raise
 
+    # Mouvement de stock d'un produit : variation appliquée par la base, jamais de stock négatif
+    @action(detail=True, methods=['post'], url_path='mouvements')
+    def mouvement(self, request, pk=None):
+        produit = self.get_object()
+        serializer = MouvementStockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variation = serializer.validated_data['variation']
+        motif = serializer.validated_data['motif']
+
+        quantites = stock.appliquer_mouvements({produit.id: variation}, motif, request.user)
+        create_journal_entry(
+            user=request.user,
+            type_operation='modification',
+            description=f"Mouvement de stock ({variation:+d}) sur {produit.nom}",
+            boutique=produit.boutique,
+            details={'produit_id': produit.id, 'variation': variation, 'motif': motif, 'quantite': quantites[produit.id]}
+        )
+        return Response({'produit': produit.id, 'variation': variation, 'quantite': quantites[produit.id]})
+
+    # Mouvements de plusieurs produits en une requête et une transaction
+    @action(detail=False, methods=['post'], url_path='mouvements')
+    def mouvements(self, request):
+        serializer = MouvementsStockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variations = serializer.validated_data['mouvements']
+        motif = serializer.validated_data['motif']
+
+        # Produits résolus dans le périmètre de l'appelant avant tout mouvement
+        existants = set(self.get_queryset().filter(id__in=variations).values_list('id', flat=True))
+        manquants = [produit_id for produit_id in variations if produit_id not in existants]
+        if manquants:
+            raise ValidationError({'mouvements': [f"Produit {produit_id} introuvable" for produit_id in manquants]})
+
+        quantites = stock.appliquer_mouvements(variations, motif, request.user)
+        create_journal_entry(
+            user=request.user,
+            type_operation='modification',
+            description=f"Mouvements de stock sur {len(variations)} produit(s) : {motif}",
+            details={'motif': motif, 'variations': variations}
+        )
+        return Response({'quantites': quantites})
+
+    # Import d'un catalogue CSV/XLSX : création ou mise à jour par (boutique, reference)
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def importer(self, request):
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            raise ValidationError({'fichier': "Fichier CSV ou XLSX requis."})
+        boutique = request.data.get('boutique') or None
+        if boutique is not None:
+            if not str(boutique).isdigit():
+                raise ValidationError({'boutique': "Identifiant de boutique attendu."})
+            self.verifier_boutiques([int(boutique)])
+        try:
+            rapport = importer_produits(
+                lire_lignes(fichier, fichier.name),
+                boutique=boutique,
+                ajouter_quantite=request.data.get('quantite') == 'ajouter',
+                simulation=request.data.get('simulation') in ('1', 'true'),
+                user=request.user,
+                motif=f"Import {fichier.name}",
+                perimetre=request.user,
+            )
+        except (FichierInvalide, UnicodeDecodeError) as e:
+            raise ValidationError({'fichier': str(e)})
+
+        if not rapport['simulation'] and rapport['crees'] + rapport['mis_a_jour']:
+            create_journal_entry(
+                user=request.user,
+                type_operation='creation',
+                description=f"Import {fichier.name} : {rapport['crees']} produit(s) créé(s), {rapport['mis_a_jour']} mis à jour",
+                details={
+                    'fichier': fichier.name,
+                    'lignes': rapport['lignes'],
+                    'crees': rapport['crees'],
+                    'mis_a_jour': rapport['mis_a_jour'],
+                    'erreurs': len(rapport['erreurs']),
+                },
+            )
+        return Response(rapport)
+
+    # État du stock en CSV/XLSX, mêmes filtres que la liste
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        return reponse_export(request, 'stock', [
+            ('ID', 'id'),
+            ('Référence', 'reference'),
+            ('Nom', 'nom'),
+            ('Catégorie', 'category'),
+            ('Boutique', 'boutique__nom'),
+            ('Quantité', 'quantite'),
+            ("Prix d'achat", 'prix_achat'),
+            ('Prix', 'prix'),
+            ('Actif', 'actif'),
+            ('Mis à jour le', 'updated_at'),
+        ], self.filter_queryset(self.get_queryset()))
+
 # PrixProduit : visible uniquement par superadmin
-class PrixProduitViewSet(viewsets.ModelViewSet):
+class PrixProduitViewSet(PerimetreBoutiqueMixin, ModificationsJournalMixin,
+                         ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = PrixProduit.objects.all()
     serializer_class = PrixProduitSerializer
+    champ_boutique = 'produit__boutique'
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['produit']
     ordering_fields = ['date', 'prix_vente_yen']
 
 # Partenaire : lié à la boutique, modifiable par admin ou superadmin
-class PartenaireViewSet(viewsets.ModelViewSet):
+class PartenaireViewSet(CacheLectureMixin, ModificationsJournalMixin,
+                        ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Partenaire.objects.all()
     serializer_class = PartenaireSerializer
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['boutique']
     search_fields = ['nom']
+    ressource_cache = 'partenaire'
 
 # Facture : filtrable par type, boutique, status
-class FactureViewSet(viewsets.ModelViewSet):
+class FactureViewSet(PerimetreBoutiqueMixin, ConditionnelMixin, EnMasseMixin, SynchroMixin, ModificationsJournalMixin,
+                     ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Facture.objects.all()
     serializer_class = FactureSerializer
     permission_classes = [IsAdminOrSuperAdmin]
@@ -106,8 +537,11 @@ class FactureViewSet(viewsets.ModelViewSet):
     filterset_class = FactureFilter
     search_fields = ['created_by__username']
     ordering_fields = ['total', 'reste', 'created_at']
+    ordering = ['-created_at']
+    nom_ressource = 'facture'
 
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         instance = serializer.save()
         create_journal_entry(
             user=self.request.user,
@@ -124,6 +558,8 @@ class FactureViewSet(viewsets.ModelViewSet):
         )
 
     def perform_update(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
+        avant = self.valeurs_avant(serializer)
         instance = serializer.save()
         create_journal_entry(
             user=self.request.user,
@@ -136,19 +572,102 @@ class FactureViewSet(viewsets.ModelViewSet):
                 'type': instance.type,
                 'total': instance.total,
                 'reste': instance.reste,
-                'status': instance.status
+                'status': instance.status,
+                **self.noter_modifications(serializer, avant),
             }
         )
 
+    # bulk_create / bulk_update ne déclenchent pas les signaux du résumé journalier
+    def perform_bulk_create(self, serializer):
+        factures = serializer.save()
+        ventes_journalieres.appliquer_cumul(ventes_journalieres.contribution_facture(facture) for facture in factures)
+        return factures
+
+    def perform_bulk_update(self, serializer):
+        anciennes = [ventes_journalieres.contribution_facture(facture) for facture in serializer.instance]
+        factures = serializer.save()
+        ventes_journalieres.appliquer_cumul(
+            [ventes_journalieres.inverser(contribution) for contribution in anciennes]
+            + [ventes_journalieres.contribution_facture(facture) for facture in factures]
+        )
+        return factures
+
+    # Factures en CSV/XLSX, mêmes filtres que la liste (FactureFilter)
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        return reponse_export(request, 'factures', [
+            ('ID', 'id'),
+            ('Numéro', 'numero'),
+            ('Type', 'type'),
+            ('Nom', 'nom'),
+            ('Boutique', 'boutique__nom'),
+            ('Créée par', 'created_by__username'),
+            ('Total', 'total'),
+            ('Reste', 'reste'),
+            ('Statut', 'status'),
+            ('Date', 'created_at'),
+        ], self.filter_queryset(self.get_queryset()))
+
+# Lignes de commande : représentation du produit au choix du client
+#   ?produit_format=complet (défaut) : produit complet imbriqué dans chaque ligne
+#   ?produit_format=resume           : id, nom, référence et prix d'achat seulement
+#   ?produit_format=table            : identifiant dans la ligne + table `produits` par id dans la réponse
+class ProduitFormatMixin:
+    FORMATS_PRODUIT = ('complet', 'resume', 'table')
+    serializer_classes_produit = {}
+
+    def get_format_produit(self):
+        format_produit = self.request.query_params.get('produit_format', 'complet')
+        if self.request.method != 'GET' or format_produit not in self.FORMATS_PRODUIT:
+            return 'complet'
+        return format_produit
+
+    def get_serializer_class(self):
+        return self.serializer_classes_produit.get(self.get_format_produit(), self.serializer_class)
+
+    def joindre_produit(self, queryset):
+        format_produit = self.get_format_produit()
+        if format_produit == 'table':
+            return queryset
+        if format_produit == 'resume':
+            colonnes = [field.name for field in queryset.model._meta.concrete_fields]
+            colonnes += ['produit__%s' % field for field in ProduitResumeSerializer.Meta.fields]
+            return queryset.select_related('produit').only(*colonnes)
+        return queryset.select_related('produit')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.get_format_produit() == 'table':
+            lignes = response.data['results'] if isinstance(response.data, dict) else response.data
+            ids = {ligne['produit'] for ligne in lignes}
+            produits = Produit.objects.filter(id__in=ids).only(*ProduitResumeSerializer.Meta.fields)
+            table = {produit.id: ProduitResumeSerializer(produit).data for produit in produits}
+            if isinstance(response.data, dict):
+                response.data['produits'] = table
+            else:
+                response.data = {'results': response.data, 'produits': table}
+        return response
+
 # Commande Client
-class CommandeClientViewSet(viewsets.ModelViewSet):
+class CommandeClientViewSet(PerimetreBoutiqueMixin, ProduitFormatMixin, SynchroMixin, ModificationsJournalMixin,
+                            ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = CommandeClient.objects.all()
     serializer_class = CommandeClientSerializer
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['facture', 'produit']
+    champ_boutique = 'facture__boutique'
+    serializer_classes_produit = {
+        'resume': CommandeClientResumeSerializer,
+        'table': CommandeClientTableSerializer,
+    }
+
+    def get_queryset(self):
+        # Le produit est imbriqué dans chaque ligne : une jointure au lieu d'une requête par ligne
+        return self.joindre_produit(self.restreindre_a_boutique(CommandeClient.objects.all()))
 
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         instance = serializer.save()
         create_journal_entry(
             user=self.request.user,
@@ -165,14 +684,24 @@ class CommandeClientViewSet(viewsets.ModelViewSet):
         )
 
 # Commande Partenaire
-class CommandePartenaireViewSet(viewsets.ModelViewSet):
+class CommandePartenaireViewSet(PerimetreBoutiqueMixin, ProduitFormatMixin, SynchroMixin, ModificationsJournalMixin,
+                                ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = CommandePartenaire.objects.all()
     serializer_class = CommandePartenaireSerializer
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['facture', 'partenaire', 'produit']
+    champ_boutique = 'facture__boutique'
+    serializer_classes_produit = {
+        'resume': CommandePartenaireResumeSerializer,
+        'table': CommandePartenaireTableSerializer,
+    }
+
+    def get_queryset(self):
+        return self.joindre_produit(self.restreindre_a_boutique(CommandePartenaire.objects.all()))
 
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         instance = serializer.save()
         create_journal_entry(
             user=self.request.user,
@@ -189,15 +718,21 @@ class CommandePartenaireViewSet(viewsets.ModelViewSet):
         )
 
 # Versement : tous les versements d'une facture
-class VersementViewSet(viewsets.ModelViewSet):
+class VersementViewSet(PerimetreBoutiqueMixin, SynchroMixin, ModificationsJournalMixin,
+                       ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Versement.objects.all()
     serializer_class = VersementSerializer
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['facture']
+    champ_boutique = 'facture__boutique'
 
+    # verse / reste / status de la facture suivent chaque versement (core/soldes.py)
+    @transaction.atomic
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         instance = serializer.save()
+        soldes.appliquer_versement(instance.facture, instance.montant)
         create_journal_entry(
             user=self.request.user,
             type_operation='modification',
@@ -211,16 +746,87 @@ class VersementViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
+        facture, montant = serializer.instance.facture, serializer.instance.montant
+        super().perform_update(serializer)
+        instance = serializer.instance
+        if instance.facture_id != facture.id:
+            soldes.appliquer_versement(facture, -montant)
+            soldes.appliquer_versement(instance.facture, instance.montant)
+        else:
+            soldes.appliquer_versement(instance.facture, instance.montant - montant)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        facture, montant = instance.facture, instance.montant
+        super().perform_destroy(instance)
+        soldes.appliquer_versement(facture, -montant)
+
 # Historique des stocks : utile pour audit
-class HistoriqueStockViewSet(viewsets.ModelViewSet):
+class HistoriqueStockViewSet(PerimetreBoutiqueMixin, ModificationsJournalMixin,
+                             ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = HistoriqueStock.objects.all()
     serializer_class = HistoriqueStockSerializer
+    champ_boutique = 'produit__boutique'
     permission_classes = [IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['produit', 'user']
     search_fields = ['motif']
 
-class JournalViewSet(viewsets.ModelViewSet):
+# Transferts entre boutiques : création et consultation seulement, le stock ayant déjà bougé
+class TransfertViewSet(PerimetreBoutiqueMixin, ProfilageSerialisationMixin, mixins.CreateModelMixin,
+                       viewsets.ReadOnlyModelViewSet):
+    queryset = Transfert.objects.all()
+    serializer_class = TransfertSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['boutique_source', 'boutique_destination']
+    champ_boutique = ('boutique_source', 'boutique_destination')
+
+    def get_queryset(self):
+        return self.restreindre_a_boutique(Transfert.objects.all()).select_related('boutique_source', 'boutique_destination').prefetch_related('lignes')
+
+    def perform_create(self, serializer):
+        transfert = serializer.save()
+        source, destination = transfert.boutique_source, transfert.boutique_destination
+        quantites = serializer.validated_data['quantites']
+        create_journal_entry(
+            user=self.request.user,
+            type_operation='modification',
+            description=f"Transfert de {sum(quantites.values())} article(s) de {source.nom} vers {destination.nom}",
+            boutique=source,
+            details={
+                'transfert_id': transfert.id,
+                'boutique_destination': destination.id,
+                'lignes': [
+                    {'produit_source': ligne.produit_source_id, 'produit_destination': ligne.produit_destination_id,
+                     'quantite': ligne.quantite}
+                    for ligne in transfert.lignes.all()
+                ],
+            }
+        )
+
+# Résumé des ventes par jour : lecture seule, maintenu par core/ventes_journalieres.py
+class VenteJournaliereFilter(django_filters.FilterSet):
+    date_debut = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_fin = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = VenteJournaliere
+        fields = ['type', 'date_debut', 'date_fin']
+
+class VenteJournaliereViewSet(PerimetreBoutiqueMixin, ProfilageSerialisationMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = VenteJournaliere.objects.all()
+    serializer_class = VenteJournaliereSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = VenteJournaliereFilter
+    ordering_fields = ['date', 'chiffre_affaires', 'marge']
+    ordering = ['-date']
+
+class JournalViewSet(PerimetreBoutiqueMixin, ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = Journal.objects.all()
     serializer_class = JournalSerializer
     permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
@@ -229,17 +835,14 @@ class JournalViewSet(viewsets.ModelViewSet):
     ordering = ['-date_operation']
 
     def get_queryset(self):
-        queryset = Journal.objects.all()
-        
+        queryset = self.restreindre_a_boutique(Journal.objects.all())
+
         # Filtres
-        boutique = self.request.query_params.get('boutique', None)
         type_operation = self.request.query_params.get('type_operation', None)
         utilisateur = self.request.query_params.get('utilisateur', None)
         date_debut = self.request.query_params.get('date_debut', None)
         date_fin = self.request.query_params.get('date_fin', None)
 
-        if boutique:
-            queryset = queryset.filter(boutique_id=boutique)
         if type_operation:
             queryset = queryset.filter(type_operation=type_operation)
         if utilisateur:
@@ -249,9 +852,76 @@ class JournalViewSet(viewsets.ModelViewSet):
         if date_fin:
             queryset = queryset.filter(date_operation__lte=date_fin)
 
-        return queryset.select_related('utilisateur', 'boutique')
+        # Seules les colonnes affichées de l'utilisateur et de la boutique sont chargées ;
+        # details, potentiellement volumineux, est laissé en base pour la liste
+        queryset = queryset.select_related('utilisateur', 'boutique').only(
+            'id', 'type_operation', 'description', 'details', 'date_operation', 'ip_address',
+            'utilisateur__id', 'utilisateur__username', 'utilisateur__first_name', 'utilisateur__last_name',
+            'boutique__id', 'boutique__nom',
+        )
+        if self.action == 'list':
+            queryset = queryset.defer('details')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return JournalListeSerializer
+        return JournalSerializer
+
+    # Journal en CSV/XLSX, mêmes filtres que get_queryset
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        return reponse_export(request, 'journal', [
+            ('Date', 'date_operation'),
+            ('Type', 'type_operation'),
+            ('Utilisateur', 'utilisateur__username'),
+            ('Boutique', 'boutique__nom'),
+            ('Description', 'description'),
+            ('Adresse IP', 'ip_address'),
+            ('Détails', 'details'),
+        ], self.filter_queryset(self.get_queryset()))
+
+    # Mois archivés par `manage.py archiver_journal`
+    @action(detail=False, methods=['get'], url_path='archives')
+    def archives(self, request):
+        return Response(ArchiveJournalSerializer(ArchiveJournal.objects.all(), many=True).data)
+
+    # Relecture d'un mois archivé, mêmes filtres que la liste, par pages de ?limite= depuis ?depart=
+    @action(detail=False, methods=['get'], url_path=r'archives/(?P<mois>\d{4}-\d{2})')
+    def archive(self, request, mois):
+        if not ArchiveJournal.objects.filter(mois=mois).exists():
+            return Response({'detail': f"Aucune archive pour {mois}."}, status=status.HTTP_404_NOT_FOUND)
+
+        parametres = request.query_params
+        filtres = {nom: parametres.get(nom) for nom in ('boutique', 'type_operation', 'utilisateur')}
+        if request.user.role != 'superadmin':
+            # Même périmètre que la liste (PerimetreBoutiqueMixin) ; sans boutique, aucune entrée
+            filtres['boutique'] = request.user.boutique_id or '-'
+        for nom in ('date_debut', 'date_fin'):
+            if parametres.get(nom):
+                try:
+                    filtres[nom] = archives_journal.borne(parametres[nom], fin=nom == 'date_fin')
+                except ValueError:
+                    raise ValidationError({nom: "Date attendue (AAAA-MM-JJ ou ISO 8601)."})
+        try:
+            depart = max(int(parametres.get('depart', 0)), 0)
+            limite = min(max(int(parametres.get('limite', 100)), 1), 1000)
+        except ValueError:
+            raise ValidationError({'limite': "Entiers attendus pour depart et limite."})
+
+        resultats = []
+        suivant = None
+        for position, entree in enumerate(archives_journal.lire(mois, **filtres)):
+            if position < depart:
+                continue
+            if len(resultats) == limite:
+                suivant = position
+                break
+            resultats.append(entree)
+        return Response({'mois': mois, 'depart': depart, 'suivant': suivant, 'results': resultats})
 
     def perform_create(self, serializer):
+        self.verifier_ecriture(serializer.validated_data)
         try:
             serializer.save(utilisateur=self.request.user)
         except Exception as e:
@@ -261,22 +931,160 @@ class JournalViewSet(viewsets.ModelViewSet):
 # Fonction utilitaire pour créer des entrées de journal
 def create_journal_entry(user, type_operation, description, boutique=None, details=None):
     try:
-        # Créer l'entrée de journal sans essayer d'accéder à la requête
-        Journal.objects.create(
+        # Écriture différée ; pendant une requête, fusionnée avec l'entrée du middleware
+        journal.enregistrer(Journal(
             utilisateur=user,
             boutique=boutique,
             type_operation=type_operation,
             description=description,
             details=details,
-            ip_address=None  # On ne stocke plus l'IP pour éviter les problèmes
-        )
+            ip_address=None
+        ))
     except Exception as e:
         print(f"Erreur lors de la création du journal: {str(e)}")
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PerimetreBoutiqueMixin, CacheLectureMixin, ModificationsJournalMixin,
+                  ProfilageSerialisationMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['role', 'boutique']
-    search_fields = ['username', 'email']
\ No newline at end of file
+    filterset_fields = ['role']
+    search_fields = ['username', 'email']
+    ressource_cache = 'user'
+    boutique_cache = True
+
+# Vente complète (facture + lignes + versement + stock) en une seule requête
+class CheckoutView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        facture = serializer.save()
+        lignes = serializer.validated_data['lignes']
+        create_journal_entry(
+            user=request.user,
+            type_operation='vente' if facture.type == 'client' else 'achat',
+            description=f"Facture {facture.numero} : {len(lignes)} ligne(s)",
+            boutique=facture.boutique,
+            details={
+                'facture_id': facture.id,
+                'numero': facture.numero,
+                'type': facture.type,
+                'total': facture.total,
+                'reste': facture.reste,
+                'lignes': [
+                    {'produit_id': ligne['produit_id'], 'quantite': ligne['quantite'], 'prix_unitaire': ligne['prix_unitaire_fcfa']}
+                    for ligne in lignes
+                ],
+            }
+        )
+        return Response(FactureSerializer(facture).data, status=status.HTTP_201_CREATED)
+
+# Métriques de ProfilageMiddleware au format texte Prometheus
+class MetriquesView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+
+    def get(self, request):
+        return HttpResponse(profilage.metriques.format_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Tableau de bord : indicateurs agrégés côté base de données
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+
+    CATEGORIES_ACCESSOIRES = ['accessoire', 'clavier', 'cleusb', 'souris']
+
+    def get(self, request):
+        boutique = request.query_params.get('boutique', None)
+        if boutique and not boutique.isdigit():
+            raise ValidationError({'boutique': "Identifiant de boutique invalide."})
+        if request.user.role != 'superadmin':
+            # Même périmètre que PerimetreBoutiqueMixin : la boutique de l'appelant (0 : aucune)
+            boutique = str(request.user.boutique_id or 0)
+        date_debut = self._parse_date_param('date_debut')
+        date_fin = self._parse_date_param('date_fin')
+
+        produits = Produit.objects.all()
+        factures = Facture.objects.all()
+        if boutique:
+            produits = produits.filter(boutique_id=boutique)
+            factures = factures.filter(boutique_id=boutique)
+        # Intervalle semi-ouvert [date_debut, date_fin + 1 jour[ pour garder l'index sur created_at
+        if date_debut:
+            factures = factures.filter(created_at__gte=debut_journee(date_debut))
+        if date_fin:
+            factures = factures.filter(created_at__lt=debut_journee(date_fin + timedelta(days=1)))
+
+        stats_produits = produits.aggregate(
+            total=Count('id'),
+            ordinateurs=Count('id', filter=Q(category='ordinateur')),
+            telephones=Count('id', filter=Q(category='telephone')),
+            accessoires=Count('id', filter=Q(category__in=self.CATEGORIES_ACCESSOIRES)),
+            quantite_stock=Coalesce(Sum('quantite'), 0),
+            valeur_stock=Coalesce(
+                Sum(F('quantite') * F('prix_achat'), output_field=FloatField()), Value(0.0)
+            ),
+        )
+        par_categorie = {
+            ligne['category']: ligne['nombre']
+            for ligne in produits.order_by().values('category').annotate(nombre=Count('id'))
+        }
+
+        stats_factures = factures.aggregate(
+            nombre=Count('id'),
+            clients=Count('id', filter=Q(type='client')),
+            partenaires=Count('id', filter=Q(type='partenaire')),
+            total=Coalesce(Sum('total'), Value(0.0)),
+            dette=Coalesce(Sum('reste'), Value(0.0)),
+        )
+
+        # Marge = (prix de vente - prix d'achat à la vente) * quantité, sur les lignes des factures
+        # retenues ; même calcul que VenteJournaliere
+        marge = Coalesce(
+            Sum(
+                (F('prix_unitaire_fcfa') - Coalesce('prix_achat_fcfa', Value(0.0))) * F('quantite'),
+                output_field=FloatField(),
+            ),
+            Value(0.0),
+        )
+        marge_clients = CommandeClient.objects.filter(facture__in=factures).aggregate(marge=marge)['marge']
+        marge_partenaires = CommandePartenaire.objects.filter(facture__in=factures).aggregate(marge=marge)['marge']
+
+        return Response({
+            'boutique': int(boutique) if boutique else None,
+            'date_debut': date_debut,
+            'date_fin': date_fin,
+            'produits': {
+                'total': stats_produits['total'],
+                'ordinateurs': stats_produits['ordinateurs'],
+                'telephones': stats_produits['telephones'],
+                'accessoires': stats_produits['accessoires'],
+                'quantite_stock': stats_produits['quantite_stock'],
+                'valeur_stock': stats_produits['valeur_stock'],
+                'par_categorie': par_categorie,
+            },
+            'factures': {
+                'total': stats_factures['nombre'],
+                'client': stats_factures['clients'],
+                'partenaire': stats_factures['partenaires'],
+            },
+            'chiffre_affaires': {
+                'total': stats_factures['total'],
+                'encaisse': stats_factures['total'] - stats_factures['dette'],
+                'dette': stats_factures['dette'],
+            },
+            'marge_totale': marge_clients + marge_partenaires,
+        })
+
+    def _parse_date_param(self, name):
+        value = self.request.query_params.get(name, None)
+        if not value:
+            return None
+        try:
+            date = parse_date(value)
+        except ValueError:  # bien formée mais impossible (30 février...)
+            date = None
+        if date is None:
+            raise ValidationError({name: "Format de date invalide (AAAA-MM-JJ attendu)."})
+        return date
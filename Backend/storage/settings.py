@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from corsheaders.defaults import default_headers
 from datetime import timedelta
@@ -50,6 +51,7 @@ AUTH_USER_MODEL = 'core.User'
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.ProfilageMiddleware',  # inactif sauf PROFILAGE['ACTIF']
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,13 +74,83 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication avec cache de l'utilisateur par processus (core/authentification.py)
+        'core.authentification.JWTAuthentificationCache',
     ],
+    # Pagination par curseur sur toutes les listes (?page_size=, ?count=true)
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CursorPagination',
+    'PAGE_SIZE': 50,
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # Example: Require authentication for all views
     ],
 }
 
+# Journal d'activité : écriture différée par lots (voir core/journal.py)
+JOURNAL = {
+    'ASYNCHRONE': True,
+    'TAILLE_LOT': 100,
+    'INTERVALLE_VIDAGE': 2.0,  # secondes
+    'TAILLE_FILE': 10000,
+    'SATURATION': 'synchrone',  # ou 'ignorer'
+    # Corps de requête conservés dans details : CHAMPS_DETAILS (liste blanche par
+    # ressource) et CHAMPS_MASQUES par défaut dans core/journal.py
+    'DIFF_MODIFICATIONS': True,
+    'TAILLE_MAX_TEXTE': 200,
+    'TAILLE_MAX_LISTE': 20,
+    'TAILLE_MAX_DETAILS': 4000,  # caractères JSON
+}
+# Durée de conservation du journal par type d'opération (jours, None = sans limite) ;
+# au-delà, `manage.py archiver_journal` déplace les entrées dans des archives
+# mensuelles gzip (core/archives_journal.py)
+ARCHIVES_JOURNAL = {
+    'REPERTOIRE': os.environ.get('JOURNAL_ARCHIVES', BASE_DIR / 'archives' / 'journal'),
+    'RETENTION_JOURS': {
+        'connexion': 30,
+        'deconnexion': 30,
+        'creation': 180,
+        'modification': 180,
+        'suppression': 365,
+        'vente': 730,
+        'achat': 730,
+        'retour': 730,
+    },
+    'RETENTION_PAR_DEFAUT': 365,
+}
+# Instrumentation par vue (core/middleware.py, /api/_metrics/)
+PROFILAGE = {
+    'ACTIF': False,
+    'SEUIL_REQUETE_LENTE_MS': 200,
+    'EN_TETE_SERVER_TIMING': True,
+}
+# Cache des lectures de l'API (core/cache_api.py). Mémoire locale par défaut, avec
+# éviction des entrées les moins récemment lues au-delà de MAX_ENTRIES. Avec plusieurs
+# processus, fournir un backend partagé par CACHE_BACKEND / CACHE_LOCATION (ex.
+# django.core.cache.backends.redis.RedisCache, redis://...) pour que les invalidations
+# soient vues par tous.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'walner-durel',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+if os.environ.get('CACHE_BACKEND'):
+    CACHES['default'] = {
+        'BACKEND': os.environ['CACHE_BACKEND'],
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'TIMEOUT': 300,
+    }
+CACHE_API = {
+    'ACTIF': True,
+    'ALIAS': 'default',
+    'DUREE': 300,  # secondes
+}
+# Synchronisation incrémentale ?since= (core/synchro.py)
+SYNCHRO = {
+    'RETENTION_SUPPRESSIONS_JOURS': 30,
+    'MARGE_SECONDES': 5,
+}
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),  # 1h par exemple
@@ -87,6 +159,11 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": False,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+# Utilisateur du jeton gardé en mémoire par processus (core/authentification.py)
+AUTHENTIFICATION = {
+    'DUREE_CACHE': 60,  # secondes, 0 pour relire l'utilisateur à chaque appel
+    'TAILLE_CACHE': 10000,
+}
 #CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',  # nuxt app running on localhost:3000
@@ -95,7 +172,11 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "authorization",
+    "if-none-match",
+    "if-modified-since",
 ]
+# Validateurs des requêtes conditionnelles lisibles par le frontend
+CORS_EXPOSE_HEADERS = ["etag", "last-modified"]
 
 CORS_ALLOW_CREDENTIALS = True
 
@@ -132,11 +213,72 @@ WSGI_APPLICATION = 'storage.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Choix par variables d'environnement :
+#   DB_ENGINE        sqlite (défaut) ou postgresql
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE  durée de vie (s) des connexions persistantes PostgreSQL, 60 par défaut
+#   DB_POOL          vide (défaut), "django" (pool intégré de psycopg 3, psycopg[pool] dans
+#                    requirements.txt) ou "pgbouncer" (pooler externe en mode transaction)
+#
+# SQLite n'accepte qu'un écrivain à la fois : en production multi-processus, préférer
+# PostgreSQL. Si SQLite reste utilisé, core/base_de_donnees.py applique SQLITE_PRAGMAS à
+# chaque connexion (WAL : les lectures ne bloquent plus les écritures et inversement).
+# `manage.py charge_concurrente --comparer` mesure la différence sur une base de test ;
+# relevé sur 5 000 produits / 30 000 entrées de journal (generer_donnees), 8 threads,
+# 10 s, 30 % d'écritures, 1 vCPU :
+#   configuration               lectures/s  écritures/s  p95 lecture  p95 écriture  erreurs
+#   DELETE / synchronous=FULL          261          112      22.6 ms      187.0 ms        8
+#   SQLITE_PRAGMAS (WAL)               255          112      41.1 ms      120.5 ms        0
+# Le débit est borné par le GIL sur un seul cœur ; WAL supprime les « database is
+# locked » et réduit l'attente des écritures.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'walner_durel'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Connexion réutilisée d'une requête à l'autre, vérifiée avant réutilisation
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    DB_POOL = os.environ.get('DB_POOL', '')
+    if DB_POOL == 'django':
+        # Le pool remplace les connexions persistantes (incompatibles avec CONN_MAX_AGE)
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+        }
+    elif DB_POOL == 'pgbouncer':
+        # En mode transaction, un curseur serveur (.iterator() des exports) ne survit pas
+        # d'une transaction à l'autre
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Verrou d'écriture pris dès le début des transactions : pas d'échec
+                # immédiat « database is locked » lors du passage lecture -> écriture
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # sûr en WAL : seule la dernière transaction peut être perdue sur coupure
+    'busy_timeout': 5000,  # ms d'attente du verrou avant erreur
+    'mmap_size': 268435456,  # 256 Mo lus par projection mémoire
+    'foreign_keys': 'ON',
 }
 
 
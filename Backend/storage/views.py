@@ -3,7 +3,14 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import serializers
 from rest_framework.permissions import AllowAny
 
+from core.authentification import ajouter_claims
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Rôle et boutique signés dans le jeton (repris par /api/token/refresh/)
+        return ajouter_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -2,16 +2,58 @@
 import { useFetch } from '#app'
 import { useAuthStore } from '@/stores/auth'
 
-export async function useApi<T = unknown>(url: string, options = {}) {
+// Les listes de l'API sont paginées ({ next, previous, results }, 50 lignes par défaut,
+// ?page_size= jusqu'à 500). Par défaut, seule la première page est lue. Avec l'option
+// `toutesLesPages`, `next` est suivi jusqu'à la dernière page : à réserver aux écrans qui
+// ont réellement besoin de toute la liste (les agrégats passent par /api/dashboard/).
+//
+// Le résultat est le tableau `results`. Si la réponse porte d'autres clés (`count` avec
+// ?count=true, table `produits` avec ?produit_format=table), l'objet est conservé avec ses
+// clés et `results` complété ; les tables par id des pages suivantes y sont fusionnées.
+function estPaginee(reponse: any) {
+  return reponse && typeof reponse === 'object' && Array.isArray(reponse.results) && 'next' in reponse
+}
+
+function fusionnerPage(cumul: Record<string, any>, page: Record<string, any>) {
+  for (const [cle, valeur] of Object.entries(page)) {
+    if (cle === 'results' || cle === 'next' || cle === 'previous') continue
+    if (valeur && typeof valeur === 'object' && !Array.isArray(valeur) && typeof cumul[cle] === 'object') {
+      cumul[cle] = { ...cumul[cle], ...valeur }
+    } else if (!(cle in cumul)) {
+      cumul[cle] = valeur
+    }
+  }
+  cumul.results.push(...page.results)
+  return cumul
+}
+
+async function lirePages(reponse: any, headers: Record<string, string>, toutesLesPages: boolean) {
+  if (!estPaginee(reponse)) return reponse
+  const { next, previous, results, ...autres } = reponse
+  const cumul: Record<string, any> = { ...autres, results: [...results] }
+  let suivante = toutesLesPages ? next : null
+  while (suivante) {
+    const page: any = await $fetch(suivante, { headers })
+    fusionnerPage(cumul, page)
+    suivante = page.next
+  }
+  if (Object.keys(autres).length === 0) return cumul.results
+  return { ...cumul, next: toutesLesPages ? null : next, previous }
+}
+
+export async function useApi<T = unknown>(url: string, options: Record<string, any> = {}) {
   const auth = useAuthStore()
-  
+  const headers = {
+    'Content-Type': 'application/json',
+    ...(auth.token ? { Authorization: `Bearer ${auth.token}` } : {})
+  }
+  const { toutesLesPages = false, ...optionsFetch } = options
+
   try {
     const { data, error } = await useFetch<T>(url, {
-      headers: {
-        'Content-Type': 'application/json',
-        ...(auth.token ? { Authorization: `Bearer ${auth.token}` } : {})
-      },
-      ...options,
+      headers,
+      transform: (reponse: any) => lirePages(reponse, headers, toutesLesPages),
+      ...optionsFetch,
       onRequestError({ response }) {
         if (response?.status === 401) {
           auth.logout()
@@ -23,9 +65,9 @@ export async function useApi<T = unknown>(url: string, options = {}) {
     return { data, error }
   } catch (e) {
     console.error('API Error:', e)
-    return { 
+    return {
       data: ref(null),
       error: ref(e instanceof Error ? e : new Error('Une erreur est survenue'))
     }
   }
-}
\ No newline at end of file
+}